@@ -18,6 +18,7 @@ from app.models.models import (
 )
 from app.api.auth import get_current_user
 from app.core.webhooks import notify_n8n_content_change
+from app.core.local_vector_index import local_vector_index
 
 router = APIRouter(prefix="/api/rag", tags=["RAG Sync"])
 
@@ -125,6 +126,8 @@ async def rag_sync_callback(
     
     # Update RAG tracking fields
     if request.status == 'success':
+        # n8n just upserted the point: refresh this worker's fallback replica
+        local_vector_index.request_sync()
         entity.vector_id = request.vector_id
         entity.vectorized_at = datetime.now()
         entity.needs_reindex = False
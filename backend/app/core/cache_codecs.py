@@ -0,0 +1,228 @@
+"""
+Cache Codecs — Arunachala Backend
+=================================
+Serialization of values stored by `RedisCache`.
+
+Every value is written as one header byte followed by the payload:
+
+    header = 0x80 | codec << 3 | compression
+
+    codec        1 = JSON (orjson when installed), 2 = msgpack
+    compression  0 = none, 1 = zlib, 2 = zstd
+
+Payloads of CACHE_COMPRESS_MIN_BYTES or more are compressed (kept only if
+smaller). The header makes the format self-describing, so workers running
+different CACHE_CODEC settings can read each other's values, and values
+written before codecs existed (plain JSON, first byte < 0x80) still decode.
+
+The upgrade is one-way: workers older than this module json.loads every
+value and fail on header-prefixed ones. To roll it out while old workers
+still share the Redis, deploy with CACHE_LEGACY_WRITES=true (new workers
+read both formats but keep writing plain JSON), then drop the flag once
+every worker runs this code. Rolling back after that needs a cache flush.
+
+Datetimes and dates round-trip as the same types: JSON tags them as
+{"$dt": iso} / {"$date": iso}, msgpack uses extension types. Other
+non-native objects are stored as str(), as before.
+
+Usage:
+    from app.core.cache_codecs import encode_value, decode_value
+
+    raw = encode_value({"updated_at": datetime.now()})
+    value = decode_value(raw)   # datetime restored
+"""
+
+import os
+import json
+import zlib
+import logging
+from datetime import date, datetime
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Optional dependencies
+# ---------------------------------------------------------------------------
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+
+CODEC_JSON    = 1
+CODEC_MSGPACK = 2
+CODECS = {"json": CODEC_JSON, "msgpack": CODEC_MSGPACK}
+
+COMPRESSION_NONE = 0
+COMPRESSION_ZLIB = 1
+COMPRESSION_ZSTD = 2
+COMPRESSIONS = {"none": COMPRESSION_NONE, "zlib": COMPRESSION_ZLIB, "zstd": COMPRESSION_ZSTD}
+
+_HEADER_FLAG = 0x80
+
+CACHE_CODEC              = os.getenv("CACHE_CODEC", "json").lower()
+CACHE_COMPRESSION        = os.getenv("CACHE_COMPRESSION", "zstd" if ZSTD_AVAILABLE else "zlib").lower()
+CACHE_COMPRESS_MIN_BYTES = int(os.getenv("CACHE_COMPRESS_MIN_BYTES", 1024))  # smaller payloads stay raw
+CACHE_LEGACY_WRITES      = os.getenv("CACHE_LEGACY_WRITES", "false").lower() == "true"  # plain JSON during rollouts
+
+if CACHE_CODEC == "msgpack" and not MSGPACK_AVAILABLE:
+    logger.warning("msgpack not installed — CACHE_CODEC falls back to json")
+    CACHE_CODEC = "json"
+if CACHE_COMPRESSION == "zstd" and not ZSTD_AVAILABLE:
+    CACHE_COMPRESSION = "zlib"
+
+_EXT_DATETIME = 1
+_EXT_DATE     = 2
+
+_zstd_compressor = zstandard.ZstdCompressor(level=3) if ZSTD_AVAILABLE else None
+_zstd_decompressor = zstandard.ZstdDecompressor() if ZSTD_AVAILABLE else None
+
+
+class CodecError(ValueError):
+    """Raised when a cached payload cannot be decoded (unknown header, missing codec, corrupt data)."""
+
+
+# ---------------------------------------------------------------------------
+# JSON
+# ---------------------------------------------------------------------------
+def _json_default(obj: Any) -> Any:
+    if isinstance(obj, datetime):
+        return {"$dt": obj.isoformat()}
+    if isinstance(obj, date):
+        return {"$date": obj.isoformat()}
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    return str(obj)
+
+
+def _json_hook(obj: dict) -> Any:
+    if len(obj) == 1:
+        if "$dt" in obj:
+            return datetime.fromisoformat(obj["$dt"])
+        if "$date" in obj:
+            return date.fromisoformat(obj["$date"])
+    return obj
+
+
+def _json_encode(value: Any) -> bytes:
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(
+            value,
+            default=_json_default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+        )
+    return json.dumps(value, default=_json_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _json_decode(payload: bytes) -> Any:
+    if b'"$d' in payload:
+        return json.loads(payload, object_hook=_json_hook)  # tagged dates need the hook
+    return orjson.loads(payload) if ORJSON_AVAILABLE else json.loads(payload)
+
+
+# ---------------------------------------------------------------------------
+# msgpack
+# ---------------------------------------------------------------------------
+def _msgpack_default(obj: Any) -> Any:
+    if isinstance(obj, datetime):
+        return msgpack.ExtType(_EXT_DATETIME, obj.isoformat().encode("utf-8"))
+    if isinstance(obj, date):
+        return msgpack.ExtType(_EXT_DATE, obj.isoformat().encode("utf-8"))
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    return str(obj)
+
+
+def _msgpack_ext(code: int, data: bytes) -> Any:
+    if code == _EXT_DATETIME:
+        return datetime.fromisoformat(data.decode("utf-8"))
+    if code == _EXT_DATE:
+        return date.fromisoformat(data.decode("utf-8"))
+    return msgpack.ExtType(code, data)
+
+
+def _msgpack_encode(value: Any) -> bytes:
+    return msgpack.packb(value, default=_msgpack_default, use_bin_type=True)
+
+
+def _msgpack_decode(payload: bytes) -> Any:
+    if not MSGPACK_AVAILABLE:
+        raise CodecError("msgpack payload but msgpack is not installed")
+    return msgpack.unpackb(payload, ext_hook=_msgpack_ext, raw=False, strict_map_key=False)
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+def _compress(payload: bytes, compression: int) -> bytes:
+    if compression == COMPRESSION_ZSTD:
+        return _zstd_compressor.compress(payload)
+    return zlib.compress(payload, 1)
+
+
+def _decompress(payload: bytes, compression: int) -> bytes:
+    if compression == COMPRESSION_ZLIB:
+        return zlib.decompress(payload)
+    if compression == COMPRESSION_ZSTD:
+        if not ZSTD_AVAILABLE:
+            raise CodecError("zstd payload but zstandard is not installed")
+        return _zstd_decompressor.decompress(payload)
+    raise CodecError(f"unknown compression {compression}")
+
+
+def encode_value(value: Any, codec: Optional[str] = None, compression: Optional[str] = None) -> bytes:
+    """Header byte + serialized (and, above the threshold, compressed) value."""
+    if CACHE_LEGACY_WRITES and codec is None and compression is None:
+        return json.dumps(value, default=str).encode("utf-8")  # readable by pre-codec workers
+    codec_id = CODECS[codec or CACHE_CODEC]
+    payload = _msgpack_encode(value) if codec_id == CODEC_MSGPACK else _json_encode(value)
+
+    compression_id = COMPRESSIONS[compression or CACHE_COMPRESSION]
+    if compression_id and len(payload) >= CACHE_COMPRESS_MIN_BYTES:
+        compressed = _compress(payload, compression_id)
+        if len(compressed) < len(payload):
+            payload = compressed
+        else:
+            compression_id = COMPRESSION_NONE
+    else:
+        compression_id = COMPRESSION_NONE
+    return bytes([_HEADER_FLAG | codec_id << 3 | compression_id]) + payload
+
+
+def decode_value(raw: bytes) -> Any:
+    """Inverse of encode_value; legacy plain-JSON values are decoded as JSON."""
+    if isinstance(raw, str):
+        raw = raw.encode("utf-8")  # client created with decode_responses=True
+    if not raw:
+        raise CodecError("empty payload")
+    header = raw[0]
+    codec_id, compression_id = (header >> 3) & 0x07, header & 0x07
+    payload = raw[1:]
+    try:
+        if not header & _HEADER_FLAG:
+            return _json_decode(raw)  # written before codecs (json.dumps)
+        if compression_id:
+            payload = _decompress(payload, compression_id)
+        if codec_id == CODEC_JSON:
+            return _json_decode(payload)
+        if codec_id == CODEC_MSGPACK:
+            return _msgpack_decode(payload)
+    except CodecError:
+        raise
+    except Exception as exc:
+        raise CodecError(f"corrupt cache payload: {exc}") from exc
+    raise CodecError(f"unknown codec {codec_id}")
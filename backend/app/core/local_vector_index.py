@@ -0,0 +1,222 @@
+"""
+Local Vector Index — Arunachala Backend
+=======================================
+In-process read replica of the `arunachala_knowledge_base` Qdrant
+collection, so retrieval keeps working (and skips a network hop) when
+Qdrant is slow or down.
+
+A background job (LOCAL_INDEX_SYNC_SECONDS) scrolls every point with its
+vector and payload and writes:
+
+    {LOCAL_INDEX_DIR}/{collection}.npy    → float32 matrix, L2-normalized rows
+    {LOCAL_INDEX_DIR}/{collection}.json   → point ids + payloads (same order)
+
+Both files are replaced atomically and the matrix is opened memory-mapped,
+so every worker shares the same page cache and a restart serves from disk
+before the first sync completes. Search is brute-force cosine similarity
+(one matrix-vector product) — sub-millisecond for a few thousand points.
+
+By default the replica is a fallback: it answers only when Qdrant is
+missing or the query fails. A replica lags behind Qdrant (content edits,
+chunk deletes, n8n upserts) until its next sync, so LOCAL_INDEX_PREFER=true
+— serve every search locally — is only for deployments that accept up to
+LOCAL_INDEX_SYNC_SECONDS of staleness. Content changes seen by this worker
+(`request_sync`) resync it right away.
+
+Usage:
+    from app.core.local_vector_index import local_vector_index
+
+    await local_vector_index.sync()                  # scheduled job
+    local_vector_index.request_sync()                # after a content change
+    hits = local_vector_index.search(query_vector, limit=8, filters={"type": ["massage"]})
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+from typing import List, Optional
+
+import numpy as np
+from qdrant_client.http import models
+
+from app.core.vector_store import qdrant_client, collection_registry, payload_matches, COLLECTION_NAME
+
+logger = logging.getLogger(__name__)
+
+LOCAL_INDEX_ENABLED      = os.getenv("LOCAL_INDEX_ENABLED", "true").lower() == "true"
+LOCAL_INDEX_PREFER       = os.getenv("LOCAL_INDEX_PREFER", "false").lower() == "true"  # serve reads locally when loaded (stale!)
+LOCAL_INDEX_DIR          = os.getenv("LOCAL_INDEX_DIR", "/tmp/arunachala_vector_index")
+LOCAL_INDEX_SYNC_SECONDS = int(os.getenv("LOCAL_INDEX_SYNC_SECONDS", 300))              # background mirror interval
+LOCAL_INDEX_SCROLL_BATCH = int(os.getenv("LOCAL_INDEX_SCROLL_BATCH", 256))              # points per scroll page
+
+
+class LocalVectorIndex:
+    """Memory-mapped, brute-force cosine index mirroring one Qdrant collection."""
+
+    def __init__(self, collection: str = COLLECTION_NAME, directory: str = LOCAL_INDEX_DIR, client=qdrant_client):
+        self.collection = collection
+        self.directory = directory
+        self._client = client
+        self._matrix: Optional[np.ndarray] = None
+        self._ids: List = []
+        self._payloads: List[dict] = []
+        self._sync_lock = asyncio.Lock()
+        self._sync_task: Optional[asyncio.Task] = None
+        self.synced_at: Optional[float] = None
+        self.searches = 0
+        self.sync_failures = 0
+
+    @property
+    def _matrix_path(self) -> str:
+        return os.path.join(self.directory, f"{self.collection}.npy")
+
+    @property
+    def _payload_path(self) -> str:
+        return os.path.join(self.directory, f"{self.collection}.json")
+
+    @property
+    def ready(self) -> bool:
+        return self._matrix is not None
+
+    @property
+    def prefer_local(self) -> bool:
+        return LOCAL_INDEX_ENABLED and LOCAL_INDEX_PREFER and self.ready
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def load(self) -> bool:
+        """Open the persisted replica (memory-mapped). Returns False if there is none."""
+        try:
+            with open(self._payload_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            matrix = np.load(self._matrix_path, mmap_mode="r")
+        except FileNotFoundError:
+            return False
+        except Exception as exc:
+            logger.warning(f"Local vector index unreadable ({exc}) — waiting for the next sync")
+            return False
+        if matrix.ndim != 2 or matrix.shape[0] != len(meta.get("ids", [])):
+            logger.warning("Local vector index files are inconsistent — ignoring them")
+            return False
+        self._matrix, self._ids, self._payloads = matrix, meta["ids"], meta["payloads"]
+        self.synced_at = meta.get("synced_at")
+        return True
+
+    def _write(self, matrix: np.ndarray, ids: List, payloads: List[dict]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        suffix = f".{os.getpid()}.tmp"
+        tmp_matrix = self._matrix_path + suffix
+        tmp_payload = self._payload_path + suffix
+        with open(tmp_matrix, "wb") as f:
+            np.save(f, matrix)
+        with open(tmp_payload, "w", encoding="utf-8") as f:
+            json.dump({"ids": ids, "payloads": payloads, "synced_at": time.time()}, f, ensure_ascii=False, default=str)
+        # Matrix first: a reader seeing the new payloads always finds a matching matrix
+        os.replace(tmp_matrix, self._matrix_path)
+        os.replace(tmp_payload, self._payload_path)
+
+    # ------------------------------------------------------------------
+    # Mirroring
+    # ------------------------------------------------------------------
+
+    def _scroll_all(self):
+        ids, vectors, payloads = [], [], []
+        offset = None
+        while True:
+            points, offset = self._client.scroll(
+                collection_name=self.collection,
+                limit=LOCAL_INDEX_SCROLL_BATCH,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True,
+            )
+            for point in points:
+                if point.vector is None:
+                    continue
+                ids.append(point.id)
+                vectors.append(point.vector)
+                payloads.append(point.payload or {})
+            if offset is None:
+                return ids, vectors, payloads
+
+    def _sync_blocking(self) -> int:
+        if not collection_registry.exists():
+            return -1
+        ids, vectors, payloads = self._scroll_all()
+        dim = collection_registry.vector_size or collection_registry.default_vector_size
+        matrix = np.asarray(vectors, dtype=np.float32).reshape(len(vectors), -1 if vectors else dim)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self._write(matrix / norms, ids, payloads)
+        self.load()
+        return len(ids)
+
+    async def sync(self) -> None:
+        """Mirror the collection into the local files (runs the Qdrant scroll in a thread)."""
+        if not LOCAL_INDEX_ENABLED or not self._client or self._sync_lock.locked():
+            return
+        async with self._sync_lock:
+            started = time.perf_counter()
+            try:
+                count = await asyncio.to_thread(self._sync_blocking)
+            except Exception as exc:
+                self.sync_failures += 1
+                logger.warning(f"Local vector index sync failed: {exc}")
+                return
+            if count >= 0:
+                print(f"🧭 Local vector index synced: {count} points in {time.perf_counter() - started:.2f}s")
+
+    def request_sync(self) -> None:
+        """Start a background sync now (keeps a reference so the task is not garbage-collected)."""
+        if not LOCAL_INDEX_ENABLED or (self._sync_task and not self._sync_task.done()):
+            return
+        self._sync_task = asyncio.create_task(self.sync())
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+
+    def search(self, query_vector: List[float], limit: int = 8, filters: Optional[dict] = None) -> List[models.ScoredPoint]:
+        """Top-`limit` points by cosine similarity (empty if the replica is not loaded)."""
+        matrix = self._matrix
+        if matrix is None or matrix.shape[0] == 0 or query_vector is None:
+            return []
+        q = np.asarray(query_vector, dtype=np.float32)
+        norm = np.linalg.norm(q)
+        if norm == 0 or q.shape[0] != matrix.shape[1]:
+            return []
+        scores = matrix @ (q / norm)
+        if filters:
+            allowed = np.fromiter((payload_matches(p, filters) for p in self._payloads), dtype=bool, count=len(self._payloads))
+            scores = np.where(allowed, scores, -np.inf)
+            limit = min(limit, int(allowed.sum()))
+            if limit == 0:
+                return []
+        k = min(limit, scores.shape[0])
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        self.searches += 1
+        return [
+            models.ScoredPoint(id=self._ids[i], version=0, score=float(scores[i]), payload=self._payloads[i])
+            for i in top
+        ]
+
+    def stats(self) -> dict:
+        return {
+            "enabled": LOCAL_INDEX_ENABLED,
+            "prefer_local": self.prefer_local,
+            "points": 0 if self._matrix is None else int(self._matrix.shape[0]),
+            "synced_at": self.synced_at,
+            "searches": self.searches,
+            "sync_failures": self.sync_failures,
+        }
+
+
+# ---------------------------------------------------------------------------
+# Singleton instance — import this everywhere
+# ---------------------------------------------------------------------------
+local_vector_index = LocalVectorIndex()
@@ -5,6 +5,28 @@ Provides an async Redis cache layer with graceful fallback.
 If Redis is unavailable, all operations become no-ops so the
 application keeps running without cache (but without errors).
 
+Availability is a circuit breaker: any Redis error opens it (closed →
+open) and operations are skipped; a background monitor then probes with
+PING after an exponential backoff (half-open) and closes it again on
+success. Time spent degraded is reported by `cache.stats()` (/health).
+
+Values are serialized by app.core.cache_codecs (header byte + orjson or
+msgpack payload, compressed above a size threshold); datetimes round-trip.
+
+Hot keys (CACHE_L1_PREFIXES, e.g. `config:agent`) are also kept decoded in
+a small per-worker L1 (TTL + LRU), so repeated reads skip the network and
+JSON parsing. Every write/delete/invalidation publishes the affected keys
+on CACHE_INVALIDATION_CHANNEL and each worker drops them from its L1. The
+L1 is only used while that subscription is live; CACHE_L1_TTL bounds how
+stale an entry can get if a message is ever lost. Values returned from the
+L1 are shared objects — treat cached values as read-only.
+
+Expensive values (e.g. inventory sections) go through `get_or_compute`:
+exactly one worker recomputes a missing/expiring key under a `lock:{key}`
+lease (SET NX PX) while the others keep serving the previous value
+(stale-while-revalidate), and hot keys are refreshed slightly before they
+expire (probabilistic early expiration, "XFetch").
+
 Usage:
     from app.core.redis_cache import cache
 
@@ -17,14 +39,34 @@ Usage:
     # Invalidate a single key
     await cache.delete("my_key")
 
-    # Invalidate all keys matching a pattern
+    # Register keys under tags, then drop every key of a tag at once
+    await cache.set(key_agent_config(), config, ttl=600, tags=[TAG_CONFIG])
+    await cache.invalidate_tags(TAG_CONFIG)
+
+    # Legacy: invalidate all keys matching a pattern (incremental SCAN)
     await cache.invalidate_pattern("inventory:*")
+
+    # Compute once across workers, serve stale while refreshing
+    section = await cache.get_or_compute("inventory:section:yoga", build_yoga, ttl=300)
+    sections = await cache.get_or_compute_many({"inventory:section:yoga": build_yoga, ...}, ttl=300)
+
+    # Rebuild under the same leases after a write (no stale refresh can overwrite it)
+    await cache.recompute(["inventory:section:yoga"], rebuild_from_db, ttl=300)
 """
 
 import json
 import os
+import time
+import math
+import uuid
+import random
+import asyncio
+import fnmatch
 import logging
-from typing import Any, Optional
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.core.cache_codecs import encode_value, decode_value, CodecError, CACHE_CODEC, CACHE_COMPRESSION
 
 logger = logging.getLogger(__name__)
 
@@ -47,13 +89,41 @@ TTL_CONFIG      = int(os.getenv("CACHE_TTL_CONFIG",    600))    # 10 min
 TTL_CONTENT     = int(os.getenv("CACHE_TTL_CONTENT",   120))    # 2 min
 TTL_SCHEDULES   = int(os.getenv("CACHE_TTL_SCHEDULES", 300))    # 5 min
 TTL_SITE_CONFIG = int(os.getenv("CACHE_TTL_SITE_CONFIG", 300))  # 5 min
+TTL_EMBEDDING   = int(os.getenv("CACHE_TTL_EMBEDDING", 604800)) # 7 days
+TTL_INVENTORY_SECTION = int(os.getenv("CACHE_TTL_INVENTORY_SECTION", 86400))  # 1 day (refreshed on writes)
+TTL_QUIZ        = int(os.getenv("CACHE_TTL_QUIZ", 86400))       # 1 day
+TTL_CHAT_SESSION = int(os.getenv("CACHE_TTL_CHAT_SESSION", 172800))  # 2 days since last turn
+
+CACHE_SCAN_COUNT   = int(os.getenv("CACHE_SCAN_COUNT", 500))    # SCAN/SSCAN hint per round trip
+CACHE_UNLINK_BATCH = int(os.getenv("CACHE_UNLINK_BATCH", 500))  # keys per pipelined UNLINK
+
+CACHE_L1_ENABLED   = os.getenv("CACHE_L1_ENABLED", "true").lower() == "true"
+CACHE_L1_MAX_ITEMS = int(os.getenv("CACHE_L1_MAX_ITEMS", 1024))  # LRU entries per worker
+CACHE_L1_TTL       = int(os.getenv("CACHE_L1_TTL", 60))          # max seconds an L1 entry is served
+CACHE_L1_PREFIXES  = tuple(p for p in os.getenv("CACHE_L1_PREFIXES", "config:,inventory:section:").split(",") if p)
+CACHE_INVALIDATION_CHANNEL = os.getenv("CACHE_INVALIDATION_CHANNEL", "cache:invalidate")
+
+CACHE_STALE_TTL   = int(os.getenv("CACHE_STALE_TTL", 300))        # serve expired values this long while refreshing
+CACHE_EARLY_BETA  = float(os.getenv("CACHE_EARLY_BETA", 1.0))     # XFetch eagerness (0 disables early refresh)
+CACHE_LOCK_TTL_MS = int(os.getenv("CACHE_LOCK_TTL_MS", 10000))    # recompute lease
+CACHE_LOCK_WAIT   = float(os.getenv("CACHE_LOCK_WAIT", 5))        # max wait for another worker's recompute
+CACHE_LOCK_POLL   = float(os.getenv("CACHE_LOCK_POLL", 0.05))
+
+CACHE_HEALTH_INTERVAL = float(os.getenv("CACHE_HEALTH_INTERVAL", 15))  # PING period while healthy
+CACHE_RECONNECT_MIN   = float(os.getenv("CACHE_RECONNECT_MIN", 1))     # first retry after a failure
+CACHE_RECONNECT_MAX   = float(os.getenv("CACHE_RECONNECT_MAX", 60))    # backoff ceiling
+
+# Circuit breaker states
+BREAKER_CLOSED    = "closed"     # Redis in use
+BREAKER_OPEN      = "open"       # Redis skipped until the next probe
+BREAKER_HALF_OPEN = "half_open"  # probe in flight
 
 
 # ---------------------------------------------------------------------------
 # Cache key helpers
 # ---------------------------------------------------------------------------
-def key_inventory(lang: str = "es") -> str:
-    return f"inventory:{lang}"
+def key_inventory_section(section: str) -> str:
+    return f"inventory:section:{section}"
 
 def key_agent_config() -> str:
     return "config:agent"
@@ -67,6 +137,205 @@ def key_content_list(content_type: str, category: str = "", status: str = "") ->
 def key_schedules(week_offset: int = 0) -> str:
     return f"schedules:{week_offset}"
 
+def key_embedding(model: str, digest: str) -> str:
+    return f"embedding:{model}:{digest}"
+
+def key_quiz(lang: str, inventory_version: int, config_version: int, digest: str) -> str:
+    return f"quiz:{lang}:{inventory_version}:{config_version}:{digest}"
+
+def key_chat_session(session_id: str) -> str:
+    return f"chat:session:{session_id}"
+
+def key_rate_limit(scope: str) -> str:
+    return f"ratelimit:{scope}"
+
+def key_version(name: str) -> str:
+    return f"version:{name}"
+
+def key_tag(tag: str) -> str:
+    return f"tag:{tag}"
+
+def key_lock(key: str) -> str:
+    return f"lock:{key}"
+
+
+# ---------------------------------------------------------------------------
+# Invalidation tags — keys stored with tags=[...] are listed in the set tag:{name}.
+# Only tag keys that some write path invalidates with invalidate_tags();
+# versioned keys (inventory, quiz) go stale through their version counters.
+# ---------------------------------------------------------------------------
+TAG_CONFIG = "config"   # agent config: written by GET /config, dropped by POST /config
+
+
+# ---------------------------------------------------------------------------
+# Version counters — bumped on writes, embedded in derived cache keys
+# ---------------------------------------------------------------------------
+VERSION_AGENT_CONFIG = "agent_config"
+VERSION_INVENTORY    = "inventory"
+
+
+# ---------------------------------------------------------------------------
+# Token bucket (atomic, uses the Redis clock so every worker agrees)
+# ---------------------------------------------------------------------------
+_TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return allowed
+"""
+
+
+# ---------------------------------------------------------------------------
+# Tag registration: KEYS = tag sets, ARGV = ttl, cache keys...
+# A tag set lives at least as long as its longest-lived member. Each call
+# also checks a few random members and drops the ones that have expired, so
+# a tag written often but never invalidated does not grow without bound.
+# (Member keys are not declared in KEYS: fine on a single Redis node.)
+# ---------------------------------------------------------------------------
+_TAG_REGISTER_LUA = """
+local ttl = tonumber(ARGV[1])
+for _, tag in ipairs(KEYS) do
+    for _, member in ipairs(redis.call('SRANDMEMBER', tag, 3)) do
+        if redis.call('EXISTS', member) == 0 then
+            redis.call('SREM', tag, member)
+        end
+    end
+    for i = 2, #ARGV do
+        redis.call('SADD', tag, ARGV[i])
+    end
+    if redis.call('TTL', tag) < ttl then
+        redis.call('EXPIRE', tag, ttl)
+    end
+end
+return #KEYS
+"""
+
+
+# ---------------------------------------------------------------------------
+# Lock release: only the owner's token may delete the lease
+# ---------------------------------------------------------------------------
+_RELEASE_LOCK_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# ---------------------------------------------------------------------------
+# Lease-guarded write: KEYS = lock, key; ARGV = token, ttl, value.
+# A recompute whose lease expired (and was taken by someone else) is dropped.
+# ---------------------------------------------------------------------------
+_SET_IF_OWNER_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('SET', KEYS[2], ARGV[3], 'EX', ARGV[2])
+    return 1
+end
+return 0
+"""
+
+
+# ---------------------------------------------------------------------------
+# get_or_compute envelopes: {"swr": 1, "v": value, "exp": unix time, "delta": compute seconds}
+# ---------------------------------------------------------------------------
+def _wrap(value: Any, ttl: int, delta: float) -> dict:
+    return {"swr": 1, "v": value, "exp": time.time() + ttl, "delta": round(delta, 4)}
+
+
+def _unwrap(stored: Any) -> Optional[dict]:
+    return stored if isinstance(stored, dict) and stored.get("swr") == 1 else None
+
+
+def should_refresh(envelope: dict, beta: float = CACHE_EARLY_BETA) -> bool:
+    """Expired, or randomly early: now - delta * beta * ln(rand) >= exp (XFetch)."""
+    now = time.time()
+    if now >= envelope["exp"]:
+        return True
+    delta = envelope.get("delta") or 0.0
+    if delta <= 0 or beta <= 0:
+        return False
+    return now - delta * beta * math.log(random.random() or 1e-12) >= envelope["exp"]
+
+
+# ---------------------------------------------------------------------------
+# In-process L1 tier
+# ---------------------------------------------------------------------------
+_MISSING = object()
+
+
+class LocalTier:
+    """
+    Bounded per-worker map of decoded values with TTL and LRU eviction.
+
+    `generation` changes on every invalidation: a value read from Redis is
+    only stored if no invalidation arrived while the read was in flight.
+    """
+
+    def __init__(self, max_items: int = CACHE_L1_MAX_ITEMS, ttl: int = CACHE_L1_TTL):
+        self._items: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._max_items = max_items
+        self._ttl = ttl
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Any:
+        """Cached value, or _MISSING when absent or expired."""
+        entry = self._items.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._items[key]
+            self.misses += 1
+            return _MISSING
+        self._items.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: str, value: Any, ttl: int, generation: Optional[int] = None) -> None:
+        if generation is not None and generation != self.generation:
+            return  # invalidated while the value was being fetched
+        self._items[key] = (time.monotonic() + min(ttl, self._ttl), value)
+        self._items.move_to_end(key)
+        while len(self._items) > self._max_items:
+            self._items.popitem(last=False)
+            self.evictions += 1
+
+    def discard(self, keys: List[str]) -> None:
+        self.generation += 1
+        for key in keys:
+            self._items.pop(key, None)
+
+    def discard_pattern(self, pattern: str) -> None:
+        self.generation += 1
+        for key in [k for k in self._items if fnmatch.fnmatchcase(k, pattern)]:
+            del self._items[key]
+
+    def clear(self) -> None:
+        self.generation += 1
+        self._items.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._items),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
 
 # ---------------------------------------------------------------------------
 # RedisCache class
@@ -82,34 +351,60 @@ class RedisCache:
     def __init__(self):
         self._client: Optional[Any] = None
         self._healthy = False
+        # Circuit breaker (see _record_failure / _health_monitor)
+        self._state = BREAKER_OPEN
+        self._backoff = CACHE_RECONNECT_MIN
+        self._opened_at: Optional[float] = None
+        self._degraded_seconds = 0.0
+        self._monitor: Optional[asyncio.Task] = None
+        self._tripped = asyncio.Event()  # wakes the monitor as soon as a request fails
+        self.trips = 0
+        self.recoveries = 0
+        self.last_error: Optional[str] = None
+        # Fallback counters used while Redis is unavailable
+        self._local_versions: dict = {}
+        # L1 tier, trusted only while the invalidation subscription is live
+        self._l1 = LocalTier()
+        self._l1_live = False
+        self._instance_id = uuid.uuid4().hex
+        self._subscriber: Optional[asyncio.Task] = None
+        # get_or_compute: per-worker coalescing of misses and background refreshes
+        self._computing: Dict[str, asyncio.Future] = {}
+        self._refreshing: Dict[str, asyncio.Task] = {}
+
+    def _create_client(self) -> Any:
+        redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+        return aioredis.from_url(
+            redis_url,
+            encoding="utf-8",
+            decode_responses=False,  # raw bytes; values are decoded by cache_codecs
+            socket_connect_timeout=2,
+            socket_timeout=2,
+            retry_on_timeout=False,
+        )
 
     async def connect(self) -> None:
-        """Connect to Redis. Called from FastAPI startup event."""
+        """Connect to Redis and start the health monitor. Called from FastAPI startup event."""
         if not REDIS_AVAILABLE:
             logger.info("Redis library not installed — cache disabled")
             return
 
-        redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
-        try:
-            self._client = aioredis.from_url(
-                redis_url,
-                encoding="utf-8",
-                decode_responses=True,
-                socket_connect_timeout=2,
-                socket_timeout=2,
-                retry_on_timeout=False,
-            )
-            # Ping to validate connection
-            await self._client.ping()
-            self._healthy = True
-            logger.info(f"✅ Redis connected: {redis_url}")
-        except Exception as exc:
-            self._client = None
-            self._healthy = False
-            logger.warning(f"⚠️  Redis not available ({exc}) — running without cache")
+        self._client = self._create_client()
+        if not await self._probe():
+            logger.warning(f"⚠️  Redis not available ({self.last_error}) — running without cache, retrying in background")
+        self._monitor = asyncio.create_task(self._health_monitor())
 
     async def disconnect(self) -> None:
         """Close Redis connection. Called from FastAPI shutdown event."""
+        for task in (self._monitor, self._subscriber):
+            if task:
+                task.cancel()
+        self._monitor = self._subscriber = None
+        self._l1_live = False
+        self._l1.clear()
+        if self._opened_at is not None:
+            self._degraded_seconds += time.monotonic() - self._opened_at
+            self._opened_at = None
         if self._client:
             try:
                 await self._client.aclose()
@@ -117,43 +412,298 @@ class RedisCache:
                 pass
             self._client = None
             self._healthy = False
+            self._state = BREAKER_OPEN
             logger.info("Redis connection closed")
 
+    # ------------------------------------------------------------------
+    # Circuit breaker / self-healing
+    # ------------------------------------------------------------------
+
+    def _record_failure(self, exc: Exception) -> None:
+        """Open the breaker: operations are skipped until the monitor's probe succeeds."""
+        self.last_error = str(exc) or type(exc).__name__
+        if self._state == BREAKER_CLOSED:
+            self.trips += 1
+            logger.warning(f"⚠️  Redis error ({self.last_error}) — cache degraded, reconnecting in background")
+        if self._opened_at is None:
+            self._opened_at = time.monotonic()
+        self._state = BREAKER_OPEN
+        self._healthy = False
+        self._tripped.set()
+
+    def _close_breaker(self) -> None:
+        if self._opened_at is not None:
+            outage = time.monotonic() - self._opened_at
+            self._degraded_seconds += outage
+            self._opened_at = None
+            if self.trips:
+                self.recoveries += 1
+                logger.info(f"✅ Redis reconnected after {outage:.1f}s degraded")
+        else:
+            logger.info("✅ Redis connected")
+        self._state = BREAKER_CLOSED
+        self._healthy = True
+        self._tripped.clear()
+        self._backoff = CACHE_RECONNECT_MIN
+        if CACHE_L1_ENABLED and (self._subscriber is None or self._subscriber.done()):
+            self._subscriber = asyncio.create_task(self._listen_invalidations())
+
+    async def _probe(self) -> bool:
+        """Half-open: one PING decides whether the breaker closes."""
+        self._state = BREAKER_HALF_OPEN
+        try:
+            if self._client is None:
+                self._client = self._create_client()
+            await self._client.ping()
+        except Exception as exc:
+            self._record_failure(exc)
+            return False
+        self._close_breaker()
+        return True
+
+    async def _health_monitor(self) -> None:
+        """PING periodically while closed; retry with exponential backoff (+ jitter) while open."""
+        while True:
+            try:
+                if self._state == BREAKER_CLOSED:
+                    try:
+                        await asyncio.wait_for(self._tripped.wait(), CACHE_HEALTH_INTERVAL)
+                    except asyncio.TimeoutError:
+                        try:
+                            await self._client.ping()
+                        except Exception as exc:
+                            self._record_failure(exc)
+                    continue
+                await asyncio.sleep(self._backoff * (0.5 + random.random() / 2))
+                if not await self._probe():
+                    self._backoff = min(self._backoff * 2, CACHE_RECONNECT_MAX)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.debug(f"Cache health monitor error: {exc}")
+                await asyncio.sleep(CACHE_RECONNECT_MIN)
+
+    @property
+    def degraded_seconds(self) -> float:
+        """Total time with the breaker not closed (including the current outage)."""
+        current = time.monotonic() - self._opened_at if self._opened_at is not None else 0.0
+        return self._degraded_seconds + current
+
+    # ------------------------------------------------------------------
+    # L1 coherence (Redis pub/sub)
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _l1_candidate(key: str) -> bool:
+        return CACHE_L1_ENABLED and key.startswith(CACHE_L1_PREFIXES)
+
+    def _l1_usable(self, key: str) -> bool:
+        return self._l1_live and self._l1_candidate(key)
+
+    async def _listen_invalidations(self) -> None:
+        """Apply other workers' invalidations to the L1; resubscribe after errors."""
+        while True:
+            pubsub = None
+            try:
+                pubsub = self._client.pubsub()
+                await pubsub.subscribe(CACHE_INVALIDATION_CHANNEL)
+                self._l1_live = True
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message:
+                        self._apply_invalidation(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.debug(f"Cache invalidation subscriber error: {exc}")
+            finally:
+                # Messages may have been missed: nothing in the L1 can be trusted
+                self._l1_live = False
+                self._l1.clear()
+                if pubsub is not None:
+                    try:
+                        await pubsub.aclose()
+                    except Exception:
+                        pass
+            await asyncio.sleep(1)
+
+    def _apply_invalidation(self, data: Any) -> None:
+        try:
+            message = json.loads(data)
+        except Exception:
+            return
+        if message.get("origin") == self._instance_id:
+            return  # already applied locally
+        if message.get("pattern"):
+            self._l1.discard_pattern(message["pattern"])
+        else:
+            self._l1.discard(message.get("keys") or [])
+
+    async def _invalidate_l1(self, keys: Optional[List[Any]] = None, pattern: Optional[str] = None) -> None:
+        """Drop keys (or a pattern) from this worker's L1 and tell the other workers."""
+        if not CACHE_L1_ENABLED:
+            return
+        if pattern is not None:
+            self._l1.discard_pattern(pattern)
+            message = {"origin": self._instance_id, "pattern": pattern}
+        else:
+            keys = [k.decode() if isinstance(k, bytes) else k for k in keys or []]
+            keys = [k for k in keys if self._l1_candidate(k)]
+            if not keys:
+                return
+            self._l1.discard(keys)
+            message = {"origin": self._instance_id, "keys": keys}
+        try:
+            await self._client.publish(CACHE_INVALIDATION_CHANNEL, json.dumps(message))
+        except Exception as exc:
+            logger.debug(f"Cache invalidation publish error: {exc}")
+
     # ------------------------------------------------------------------
     # Read / Write / Delete
     # ------------------------------------------------------------------
 
     async def get(self, key: str) -> Optional[Any]:
         """
-        Retrieve a cached value (deserialized from JSON).
-        Returns None on cache miss or when Redis is unavailable.
+        Retrieve a cached value (decoded by cache_codecs).
+        Returns None on cache miss, undecodable payload or when Redis is unavailable.
         """
         if not self._healthy or not self._client:
             return None
+        use_l1 = self._l1_usable(key)
+        if use_l1:
+            value = self._l1.get(key)
+            if value is not _MISSING:
+                return value
+            generation = self._l1.generation
         try:
             raw = await self._client.get(key)
             if raw is None:
                 return None
-            return json.loads(raw)
+            value = decode_value(raw)
+            if use_l1:
+                self._l1.put(key, value, CACHE_L1_TTL, generation)
+            return value
+        except CodecError as exc:
+            logger.debug(f"Cache DECODE error for '{key}': {exc}")
+            return None
         except Exception as exc:
             logger.debug(f"Cache GET error for '{key}': {exc}")
-            self._healthy = False
+            self._record_failure(exc)
             return None
 
-    async def set(self, key: str, value: Any, ttl: int = 300) -> bool:
+    def _register_tags(self, pipe, keys: List[str], ttl: int, tags: Optional[List[str]]) -> None:
+        """Queue the tag-set registration of `keys` on a pipeline (no-op without tags)."""
+        if tags and keys:
+            tag_keys = [key_tag(tag) for tag in tags]
+            pipe.eval(_TAG_REGISTER_LUA, len(tag_keys), *tag_keys, ttl, *keys)
+
+    async def set(self, key: str, value: Any, ttl: int = 300, tags: Optional[List[str]] = None) -> bool:
         """
-        Store a value in the cache (serialized as JSON).
+        Store a value in the cache (encoded by cache_codecs), registered under `tags`.
         Returns True on success, False otherwise.
         """
         if not self._healthy or not self._client:
             return False
         try:
-            serialized = json.dumps(value, default=str)  # default=str handles datetime
-            await self._client.setex(key, ttl, serialized)
+            serialized = encode_value(value)
+            if not tags:
+                await self._client.setex(key, ttl, serialized)
+            else:
+                pipe = self._client.pipeline(transaction=False)
+                pipe.setex(key, ttl, serialized)
+                self._register_tags(pipe, [key], ttl, tags)
+                await pipe.execute()
+            await self._invalidate_l1([key])
             return True
         except Exception as exc:
             logger.debug(f"Cache SET error for '{key}': {exc}")
-            self._healthy = False
+            self._record_failure(exc)
+            return False
+
+    @staticmethod
+    def _decode_or_none(key: str, raw: Optional[bytes]) -> Optional[Any]:
+        if raw is None:
+            return None
+        try:
+            return decode_value(raw)
+        except CodecError as exc:
+            logger.debug(f"Cache DECODE error for '{key}': {exc}")
+            return None
+
+    async def get_many(self, keys: List[str]) -> List[Optional[Any]]:
+        """
+        Retrieve several values with one MGET (None for each miss).
+        Returns all None when Redis is unavailable.
+        """
+        if not keys or not self._healthy or not self._client:
+            return [None] * len(keys)
+        values: List[Any] = [_MISSING] * len(keys)
+        for i, key in enumerate(keys):
+            if self._l1_usable(key):
+                values[i] = self._l1.get(key)
+        remote = [i for i, value in enumerate(values) if value is _MISSING]
+        if not remote:
+            return values
+        generation = self._l1.generation
+        try:
+            raws = await self._client.mget([keys[i] for i in remote])
+            for i, raw in zip(remote, raws):
+                values[i] = self._decode_or_none(keys[i], raw)
+                if values[i] is not None and self._l1_usable(keys[i]):
+                    self._l1.put(keys[i], values[i], CACHE_L1_TTL, generation)
+            return values
+        except Exception as exc:
+            logger.debug(f"Cache MGET error for {len(keys)} keys: {exc}")
+            self._record_failure(exc)
+            return [None] * len(keys)
+
+    async def set_many(self, items: Dict[str, Any], ttl: int = 300, tags: Optional[List[str]] = None) -> bool:
+        """
+        Store several values (registered under `tags`) in one pipelined round-trip.
+        Returns True on success, False otherwise.
+        """
+        if not items or not self._healthy or not self._client:
+            return False
+        try:
+            pipe = self._client.pipeline(transaction=False)
+            for key, value in items.items():
+                pipe.setex(key, ttl, encode_value(value))
+            self._register_tags(pipe, list(items), ttl, tags)
+            await pipe.execute()
+            await self._invalidate_l1(list(items))
+            return True
+        except Exception as exc:
+            logger.debug(f"Cache SET_MANY error for {len(items)} keys: {exc}")
+            self._record_failure(exc)
+            return False
+
+    async def get_raw(self, key: str) -> Optional[bytes]:
+        """
+        Retrieve a raw binary value (no codec).
+        Returns None on cache miss or when Redis is unavailable.
+        """
+        if not self._healthy or not self._client:
+            return None
+        try:
+            return await self._client.get(key)
+        except Exception as exc:
+            logger.debug(f"Cache GET_RAW error for '{key}': {exc}")
+            self._record_failure(exc)
+            return None
+
+    async def set_raw(self, key: str, value: bytes, ttl: int = 300) -> bool:
+        """
+        Store a raw binary value as-is (e.g. packed float32 vectors).
+        Returns True on success, False otherwise.
+        """
+        if not self._healthy or not self._client:
+            return False
+        try:
+            await self._client.setex(key, ttl, value)
+            return True
+        except Exception as exc:
+            logger.debug(f"Cache SET_RAW error for '{key}': {exc}")
+            self._record_failure(exc)
             return False
 
     async def delete(self, key: str) -> bool:
@@ -162,28 +712,311 @@ class RedisCache:
             return False
         try:
             await self._client.delete(key)
+            await self._invalidate_l1([key])
             return True
         except Exception as exc:
             logger.debug(f"Cache DELETE error for '{key}': {exc}")
             return False
 
+    async def _unlink(self, keys: List[Any], tag_key: Optional[str] = None) -> int:
+        """UNLINK `keys` (and drop them from `tag_key`) in one pipelined round-trip."""
+        pipe = self._client.pipeline(transaction=False)
+        pipe.unlink(*keys)
+        if tag_key:
+            pipe.srem(tag_key, *keys)
+        results = await pipe.execute()
+        await self._invalidate_l1(keys)
+        return int(results[0])
+
+    async def invalidate_tags(self, *tags: str) -> int:
+        """
+        Delete every key registered under any of `tags` (SSCAN + batched UNLINK).
+        Cost is proportional to the tagged keys, not to the keyspace.
+        Returns the number of keys deleted.
+        """
+        if not tags or not self._healthy or not self._client:
+            return 0
+        deleted = 0
+        for tag in tags:
+            tag_key = key_tag(tag)
+            try:
+                batch: List[Any] = []
+                async for member in self._client.sscan_iter(tag_key, count=CACHE_SCAN_COUNT):
+                    batch.append(member)
+                    if len(batch) >= CACHE_UNLINK_BATCH:
+                        deleted += await self._unlink(batch, tag_key)
+                        batch = []
+                if batch:
+                    deleted += await self._unlink(batch, tag_key)
+            except Exception as exc:
+                logger.debug(f"Cache INVALIDATE error for tag '{tag}': {exc}")
+        logger.debug(f"Cache invalidated {deleted} keys tagged {list(tags)}")
+        return deleted
+
     async def invalidate_pattern(self, pattern: str) -> int:
         """
         Delete all cache keys matching a glob pattern (e.g. 'content:*').
+        Walks the keyspace with incremental SCAN, so Redis is never blocked;
+        prefer invalidate_tags() for anything written with tags.
         Returns the number of keys deleted.
         """
         if not self._healthy or not self._client:
             return 0
+        deleted = 0
         try:
-            keys = await self._client.keys(pattern)
-            if not keys:
-                return 0
-            deleted = await self._client.delete(*keys)
+            batch: List[Any] = []
+            async for key in self._client.scan_iter(match=pattern, count=CACHE_SCAN_COUNT):
+                batch.append(key)
+                if len(batch) >= CACHE_UNLINK_BATCH:
+                    deleted += await self._unlink(batch)
+                    batch = []
+            if batch:
+                deleted += await self._unlink(batch)
+            await self._invalidate_l1(pattern=pattern)
             logger.debug(f"Cache invalidated {deleted} keys matching '{pattern}'")
-            return deleted
         except Exception as exc:
             logger.debug(f"Cache INVALIDATE error for pattern '{pattern}': {exc}")
-            return 0
+        return deleted
+
+    # ------------------------------------------------------------------
+    # Compute-once with stale-while-revalidate
+    # ------------------------------------------------------------------
+
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: int = 300,
+        tags: Optional[List[str]] = None,
+        stale_ttl: int = CACHE_STALE_TTL,
+    ) -> Any:
+        """
+        Cached value for `key`, calling `compute()` (async) only when needed.
+
+        Fresh → returned as-is. Expired (or picked for early refresh) but
+        within `stale_ttl` → returned immediately while one worker refreshes
+        it in the background. Missing → computed by the lock holder; other
+        workers wait for its result (at most CACHE_LOCK_WAIT) and concurrent
+        callers in this worker share one computation. Without Redis every
+        worker simply computes.
+        """
+        envelope = _unwrap(await self.get(key))
+        if envelope is not None:
+            if should_refresh(envelope):
+                self._refresh_in_background(key, compute, ttl, tags, stale_ttl)
+            return envelope["v"]
+        return await self._compute_once(key, compute, ttl, tags, stale_ttl)
+
+    async def get_or_compute_many(
+        self,
+        computes: Dict[str, Callable[[], Awaitable[Any]]],
+        ttl: int = 300,
+        tags: Optional[List[str]] = None,
+        stale_ttl: int = CACHE_STALE_TTL,
+        return_exceptions: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        get_or_compute for several keys: one MGET for every envelope, then only
+        the missing keys are computed (concurrently). With `return_exceptions`
+        a failed compute is returned in place of its value, as asyncio.gather.
+        """
+        keys = list(computes)
+        results: Dict[str, Any] = {}
+        missing = []
+        for key, stored in zip(keys, await self.get_many(keys)):
+            envelope = _unwrap(stored)
+            if envelope is None:
+                missing.append(key)
+                continue
+            if should_refresh(envelope):
+                self._refresh_in_background(key, computes[key], ttl, tags, stale_ttl)
+            results[key] = envelope["v"]
+        computed = await asyncio.gather(
+            *(self._compute_once(key, computes[key], ttl, tags, stale_ttl) for key in missing),
+            return_exceptions=return_exceptions,
+        )
+        results.update(zip(missing, computed))
+        return {key: results[key] for key in keys}
+
+    async def _compute_once(self, key, compute, ttl, tags, stale_ttl) -> Any:
+        """Compute a missing key once per worker (concurrent callers share the result)."""
+        pending = self._computing.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        future = asyncio.get_running_loop().create_future()
+        self._computing[key] = future
+        try:
+            value = await self._compute_locked(key, compute, ttl, tags, stale_ttl, wait=True)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            future.exception()  # retrieved: no "never retrieved" warning without waiters
+            raise
+        finally:
+            self._computing.pop(key, None)
+
+    async def recompute(
+        self,
+        keys: List[str],
+        compute: Callable[[], Awaitable[Dict[str, Any]]],
+        ttl: int = 300,
+        tags: Optional[List[str]] = None,
+    ) -> bool:
+        """
+        Rebuild `keys` (read back with get_or_compute) after a write, e.g. an admin edit.
+
+        Takes the same `lock:{key}` leases as the stale-while-revalidate refresh,
+        waiting (at most CACHE_LOCK_WAIT) for a refresh already in flight, and only
+        then calls `compute()` → {key: value}. A refresh that read the old data can
+        therefore not overwrite the new values: it either finished before, or its
+        lease-guarded write is rejected.
+        """
+        tokens = {key: await self._acquire_lock(key) for key in keys}
+        try:
+            started = time.perf_counter()
+            items = await compute()
+            delta = time.perf_counter() - started
+            return await self.set_many(
+                {key: _wrap(value, ttl, delta) for key, value in items.items()},
+                ttl=ttl + CACHE_STALE_TTL,
+                tags=tags,
+            )
+        finally:
+            for key, token in tokens.items():
+                if token:
+                    await self._release_lock(key, token)
+
+    async def _acquire_lock(self, key: str) -> Optional[str]:
+        """Wait for the lease on `key`; None when Redis is down or the holder outlived CACHE_LOCK_WAIT."""
+        deadline = time.monotonic() + CACHE_LOCK_WAIT
+        while True:
+            acquired, token = await self._try_lock(key)
+            if acquired:
+                return token
+            if time.monotonic() >= deadline:
+                logger.warning(f"Lease on '{key}' still held after {CACHE_LOCK_WAIT}s: writing without it")
+                return None
+            await asyncio.sleep(CACHE_LOCK_POLL)
+
+    async def _compute_locked(self, key, compute, ttl, tags, stale_ttl, wait: bool) -> Any:
+        acquired, token = await self._try_lock(key)
+        if not acquired:
+            if not wait:
+                return None  # another worker is already refreshing
+            envelope = await self._wait_for_value(key)
+            if envelope is not None:
+                return envelope["v"]
+            # Lock holder is slow or gone: compute here rather than fail the request
+        try:
+            started = time.perf_counter()
+            value = await compute()
+            envelope = _wrap(value, ttl, time.perf_counter() - started)
+            if token:
+                await self._set_if_owner(key, token, envelope, ttl + stale_ttl, tags)
+            else:
+                await self.set(key, envelope, ttl=ttl + stale_ttl, tags=tags)
+            return value
+        finally:
+            if token:
+                await self._release_lock(key, token)
+
+    async def _set_if_owner(self, key: str, token: str, value: Any, ttl: int, tags: Optional[List[str]]) -> bool:
+        """SET `key` only while `token` still holds its lease (see _SET_IF_OWNER_LUA)."""
+        try:
+            pipe = self._client.pipeline(transaction=False)
+            pipe.eval(_SET_IF_OWNER_LUA, 2, key_lock(key), key, token, ttl, encode_value(value))
+            self._register_tags(pipe, [key], ttl, tags)
+            written = bool((await pipe.execute())[0])
+            if written:
+                await self._invalidate_l1([key])
+            else:
+                logger.debug(f"Cache write of '{key}' dropped: lease lost")
+            return written
+        except Exception as exc:
+            logger.debug(f"Cache SET error for '{key}': {exc}")
+            self._record_failure(exc)
+            return False
+
+    async def _try_lock(self, key: str) -> Tuple[bool, Optional[str]]:
+        """(acquired, token). Without Redis every caller counts as the owner (token None)."""
+        if not self._healthy or not self._client:
+            return True, None
+        token = uuid.uuid4().hex
+        try:
+            acquired = await self._client.set(key_lock(key), token, nx=True, px=CACHE_LOCK_TTL_MS)
+            return bool(acquired), token if acquired else None
+        except Exception as exc:
+            logger.debug(f"Cache LOCK error for '{key}': {exc}")
+            return True, None
+
+    async def _release_lock(self, key: str, token: str) -> None:
+        try:
+            await self._client.eval(_RELEASE_LOCK_LUA, 1, key_lock(key), token)
+        except Exception as exc:
+            logger.debug(f"Cache UNLOCK error for '{key}': {exc}")
+
+    async def _wait_for_value(self, key: str) -> Optional[dict]:
+        deadline = time.monotonic() + CACHE_LOCK_WAIT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(CACHE_LOCK_POLL)
+            envelope = _unwrap(await self.get(key))
+            if envelope is not None:
+                return envelope
+        return None
+
+    def _refresh_in_background(self, key, compute, ttl, tags, stale_ttl) -> None:
+        task = self._refreshing.get(key)
+        if task and not task.done():
+            return
+        task = asyncio.create_task(self._background_refresh(key, compute, ttl, tags, stale_ttl))
+        self._refreshing[key] = task
+        task.add_done_callback(lambda t: self._refreshing.pop(key) if self._refreshing.get(key) is t else None)
+
+    async def _background_refresh(self, key, compute, ttl, tags, stale_ttl) -> None:
+        try:
+            await self._compute_locked(key, compute, ttl, tags, stale_ttl, wait=False)
+        except Exception as exc:
+            logger.warning(f"Background refresh of '{key}' failed (stale value kept): {exc}")
+
+    async def get_version(self, name: str) -> int:
+        """
+        Current value of a version counter (0 if never bumped).
+        Falls back to a per-process counter when Redis is unavailable.
+        """
+        if self._healthy and self._client:
+            try:
+                raw = await self._client.get(key_version(name))
+                return int(raw) if raw is not None else 0
+            except Exception as exc:
+                logger.debug(f"Cache VERSION error for '{name}': {exc}")
+        return self._local_versions.get(name, 0)
+
+    async def bump_version(self, name: str) -> int:
+        """Increment a version counter so every key derived from it goes stale."""
+        self._local_versions[name] = self._local_versions.get(name, 0) + 1
+        if self._healthy and self._client:
+            try:
+                return int(await self._client.incr(key_version(name)))
+            except Exception as exc:
+                logger.debug(f"Cache BUMP error for '{name}': {exc}")
+        return self._local_versions[name]
+
+    async def take_token(self, key: str, rate: float, burst: int) -> Optional[bool]:
+        """
+        Take one token from the bucket at `key` (refilled at `rate`/s up to `burst`).
+        Returns None when Redis is unavailable so callers can fall back locally.
+        """
+        if not self._healthy or not self._client:
+            return None
+        try:
+            return bool(await self._client.eval(_TOKEN_BUCKET_LUA, 1, key, rate, burst))
+        except Exception as exc:
+            logger.debug(f"Cache TOKEN error for '{key}': {exc}")
+            return None
 
     async def exists(self, key: str) -> bool:
         """Check if a key exists in the cache."""
@@ -198,6 +1031,22 @@ class RedisCache:
     def is_healthy(self) -> bool:
         return self._healthy
 
+    def stats(self) -> dict:
+        return {
+            "healthy": self._healthy,
+            "breaker": self._state,
+            "trips": self.trips,
+            "recoveries": self.recoveries,
+            "degraded_seconds": round(self.degraded_seconds, 1),
+            "retry_backoff": self._backoff,
+            "last_error": self.last_error,
+            "codec": CACHE_CODEC,
+            "compression": CACHE_COMPRESSION,
+            "l1_enabled": CACHE_L1_ENABLED,
+            "l1_live": self._l1_live,
+            "l1": self._l1.stats(),
+        }
+
 
 # ---------------------------------------------------------------------------
 # Singleton instance — import this everywhere
@@ -0,0 +1,184 @@
+"""
+Vector Store Module — Arunachala Backend
+========================================
+Shared Qdrant client plus a small registry that caches metadata of the
+`arunachala_knowledge_base` collection (existence, vector size and
+payload indexes), so the chat hot path does not call `get_collections()`
+before every search.
+
+The collection is created together with keyword/integer payload indexes on
+PAYLOAD_INDEXES (type, entity_type, entity_id, language, category); missing
+ones are added to existing collections by `ensure_payload_indexes()`, which
+runs at startup (app.main) and before a bulk ingest (ingest_all.py) — never
+on the chat path, where `refresh()` only reads metadata.
+`payload_filter()` turns a plain dict such as {"type": ["massage", "therapy"]}
+into a Qdrant filter for filtered searches and deletes.
+
+The registry refreshes lazily:
+    - a positive result is kept until `invalidate()` is called
+      (after a Qdrant error or an explicit memory reset);
+    - a negative result is re-checked after COLLECTION_RECHECK_SECONDS,
+      because n8n may create the collection on its own.
+
+Usage:
+    from app.core.vector_store import qdrant_client, collection_registry
+
+    if collection_registry.exists():
+        qdrant_client.query_points(collection_name=COLLECTION_NAME, query_filter=payload_filter({"type": "massage"}), ...)
+"""
+
+import os
+import time
+import logging
+from typing import Any, Dict, Optional, Set
+
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+
+logger = logging.getLogger(__name__)
+
+# --- Configurations ---
+QDRANT_HOST = os.getenv("QDRANT_HOST", "localhost")
+QDRANT_PORT = int(os.getenv("QDRANT_PORT", 6333))
+QDRANT_URL = os.getenv("QDRANT_URL")
+QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
+
+COLLECTION_NAME = "arunachala_knowledge_base"
+VECTOR_SIZE = 1536
+COLLECTION_RECHECK_SECONDS = int(os.getenv("QDRANT_COLLECTION_RECHECK_SECONDS", 30))
+
+# Payload fields used in filters (searches by intent, deletes by type/entity)
+PAYLOAD_INDEXES = {
+    "type": models.PayloadSchemaType.KEYWORD,
+    "entity_type": models.PayloadSchemaType.KEYWORD,
+    "entity_id": models.PayloadSchemaType.INTEGER,
+    "language": models.PayloadSchemaType.KEYWORD,
+    "category": models.PayloadSchemaType.KEYWORD,
+}
+
+
+def payload_filter(filters: Optional[Dict[str, Any]]) -> Optional[models.Filter]:
+    """{"field": value or [values]} -> Qdrant filter (all fields must match), None if empty."""
+    if not filters:
+        return None
+    conditions = []
+    for key, value in filters.items():
+        if isinstance(value, (list, tuple, set)):
+            conditions.append(models.FieldCondition(key=key, match=models.MatchAny(any=list(value))))
+        else:
+            conditions.append(models.FieldCondition(key=key, match=models.MatchValue(value=value)))
+    return models.Filter(must=conditions)
+
+
+def payload_matches(payload: dict, filters: Optional[Dict[str, Any]]) -> bool:
+    """Same semantics as `payload_filter`, evaluated locally on one payload."""
+    for key, value in (filters or {}).items():
+        allowed = value if isinstance(value, (list, tuple, set)) else (value,)
+        if payload.get(key) not in allowed:
+            return False
+    return True
+
+# --- Client ---
+try:
+    if QDRANT_URL and QDRANT_API_KEY:
+        qdrant_client = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY)
+    else:
+        qdrant_client = QdrantClient(host=QDRANT_HOST, port=QDRANT_PORT)
+except Exception as e:
+    print(f"Warning: Could not connect to Qdrant: {e}")
+    qdrant_client = None
+
+
+class CollectionRegistry:
+    """Cached metadata for one Qdrant collection."""
+
+    def __init__(self, client: Optional[QdrantClient], name: str, vector_size: int = VECTOR_SIZE):
+        self._client = client
+        self.name = name
+        self.default_vector_size = vector_size
+        self._exists: Optional[bool] = None   # None = unknown
+        self._checked_at = 0.0
+        self.vector_size: Optional[int] = None
+        self.payload_indexes: Set[str] = set()
+
+    def refresh(self) -> bool:
+        """Reload metadata from Qdrant. Errors leave the state unknown."""
+        if not self._client:
+            return False
+        try:
+            if not self._client.collection_exists(self.name):
+                self._set_missing()
+                return False
+            info = self._client.get_collection(self.name)
+            vectors = info.config.params.vectors
+            self.vector_size = getattr(vectors, "size", None)
+            self.payload_indexes = set((info.payload_schema or {}).keys())
+            self._exists = True
+            self._checked_at = time.monotonic()
+            return True
+        except Exception as exc:
+            logger.warning(f"Qdrant metadata refresh failed for '{self.name}': {exc}")
+            self.invalidate()
+            return False
+
+    def _set_missing(self) -> None:
+        self._exists = False
+        self._checked_at = time.monotonic()
+        self.vector_size = None
+        self.payload_indexes = set()
+
+    def ensure_payload_indexes(self) -> None:
+        """Create the PAYLOAD_INDEXES that the collection does not have yet."""
+        if not self._client or not self.exists():
+            return
+        for field, schema in PAYLOAD_INDEXES.items():
+            if field in self.payload_indexes:
+                continue
+            try:
+                self._client.create_payload_index(collection_name=self.name, field_name=field, field_schema=schema)
+                self.payload_indexes.add(field)
+                logger.info(f"Qdrant payload index created: {self.name}.{field}")
+            except Exception as exc:
+                logger.warning(f"Qdrant payload index '{field}' could not be created: {exc}")
+                return
+
+    def exists(self) -> bool:
+        """Cached existence check (no network call on the common path)."""
+        if self._exists is None:
+            return self.refresh()
+        if self._exists is False and time.monotonic() - self._checked_at > COLLECTION_RECHECK_SECONDS:
+            return self.refresh()
+        return self._exists
+
+    def ensure(self) -> None:
+        """Create the collection if it does not exist yet."""
+        if self.exists() or not self._client:
+            return
+        self._client.create_collection(
+            collection_name=self.name,
+            vectors_config=models.VectorParams(size=self.default_vector_size, distance=models.Distance.COSINE),
+        )
+        if self.refresh():
+            self.ensure_payload_indexes()
+
+    def recreate(self) -> None:
+        """Drop and recreate the collection (memory reset 'all')."""
+        try:
+            self._client.delete_collection(self.name)
+        except Exception:
+            pass
+        self._set_missing()
+        self.ensure()
+
+    def invalidate(self) -> None:
+        """Forget cached metadata; the next call goes back to Qdrant."""
+        self._exists = None
+        self._checked_at = 0.0
+        self.vector_size = None
+        self.payload_indexes = set()
+
+
+# ---------------------------------------------------------------------------
+# Singleton instance — import this everywhere
+# ---------------------------------------------------------------------------
+collection_registry = CollectionRegistry(qdrant_client, COLLECTION_NAME)
@@ -5,10 +5,56 @@ from datetime import datetime
 from sqlalchemy.orm import Session
 from typing import Optional, Any
 from app.core.database import SessionLocal
-from app.core.redis_cache import cache
+from app.core.redis_cache import cache, VERSION_INVENTORY
+from app.services.semantic_cache import semantic_cache
+from app.services.inventory import schedule_refresh
+from app.core.local_vector_index import local_vector_index
+from app.services.chunking import split_into_chunks, build_chunk_points, delete_entity_chunks, reindex_operations
 
 N8N_WEBHOOK_URL = os.getenv("N8N_RAG_WEBHOOK_URL")
 
+# Background Qdrant syncs still running (a reference keeps them from being collected)
+_sync_tasks: set = set()
+
+
+async def _delete_chunks(content_type: str, content_id: int):
+    """Remove all chunk points of an entity from Qdrant (no-op if Qdrant is down)."""
+    from app.core.vector_store import qdrant_client, collection_registry, COLLECTION_NAME
+    if not qdrant_client or not collection_registry.exists():
+        return
+    try:
+        await asyncio.to_thread(delete_entity_chunks, qdrant_client, COLLECTION_NAME, content_type, content_id)
+        print(f"🗑️  Deleted all chunks of {content_type} #{content_id} from Qdrant")
+        local_vector_index.request_sync()
+    except Exception as e:
+        collection_registry.invalidate()
+        print(f"⚠️  Failed to delete chunks of {content_type} #{content_id}: {e}")
+
+
+async def _reindex_chunks(content_type: str, content_id: int, chunks: list, base_payload: dict):
+    """
+    Embed and write every chunk of an entity, removing all its previous chunks in
+    the same Qdrant request. This is the only writer of dashboard entities: the
+    n8n flow no longer upserts points, so chunk 0 keeps its chunk payload.
+    """
+    from app.core.vector_store import qdrant_client, collection_registry, COLLECTION_NAME
+    from app.services.embeddings import embed_texts
+    if not chunks or not qdrant_client or not collection_registry.exists():
+        return
+    try:
+        vectors = await embed_texts(chunks)
+        points = build_chunk_points(content_type, content_id, chunks, vectors, base_payload)
+        await asyncio.to_thread(
+            qdrant_client.batch_update_points,
+            collection_name=COLLECTION_NAME,
+            update_operations=reindex_operations(content_type, content_id, points),
+        )
+        print(f"🧩 Re-indexed {len(points)} chunks of {content_type} #{content_id}")
+        local_vector_index.request_sync()
+    except Exception as e:
+        collection_registry.invalidate()
+        print(f"⚠️  Failed to re-index chunks of {content_type} #{content_id}: {e}")
+
 async def notify_n8n_content_change(
     content_id: int, 
     content_type: str, 
@@ -27,6 +73,7 @@ async def notify_n8n_content_change(
     # Pre-fetch entity data to include in payload
     # Usaremos un diccionario plano para máxima compatibilidad con n8n
     flat_payload = {}
+    chunks = []
     
     try:
         from app.models.models import (
@@ -118,6 +165,9 @@ async def notify_n8n_content_change(
             if flat_payload.get('title') and flat_payload.get('content'):
                 flat_payload['content'] = f"# {flat_payload['title']}\n\n{flat_payload['content']}"
 
+            # Chunked indexing is done by the backend (see _reindex_chunks), not by n8n
+            chunks = split_into_chunks(flat_payload.get('content', ''))
+
         # Create Log
         log_entry = RAGSyncLog(
             entity_type=content_type,
@@ -228,14 +278,35 @@ async def notify_n8n_content_change(
     if entity and hasattr(entity, 'vector_id'):
         vector_id = entity.vector_id
 
-    # Invalidate Redis inventory cache on any content change —
-    # the next chat request will rebuild the inventory from DB.
-    await cache.invalidate_pattern("inventory:*")
-    print(f"🗑️  Redis inventory cache cleared after {action} on {content_type} #{content_id}")
+    # Rebuild only the affected inventory section(s) in the background; the
+    # previous snapshot keeps serving chat requests until the new one is written.
+    schedule_refresh(content_type)
+    # Bumping the inventory version orphans cached chatbot answers in every worker
+    await cache.bump_version(VERSION_INVENTORY)
+    semantic_cache.invalidate()
+    print(f"🔄 Inventory refresh scheduled after {action} on {content_type} #{content_id}")
+
+    base_payload = {
+        key: flat_payload[key] for key in ('title', 'slug', 'category') if flat_payload.get(key)
+    }
+    base_payload.update({"source": "dashboard", "type": content_type, "language": "es"})
+
+    async def _sync():
+        # Deletes remove every chunk of the entity in one batched Qdrant request;
+        # updates replace them all, so no chunk keeps the text of an older version.
+        # n8n is notified afterwards, so its success callback means "indexed".
+        if action == 'delete':
+            await _delete_chunks(content_type, content_id)
+        elif chunks:
+            await _reindex_chunks(content_type, content_id, chunks, base_payload)
+        await _send(log_id, vector_id, flat_payload)
 
-    # Execute async webhook to n8n
-    asyncio.create_task(_send(log_id, vector_id, flat_payload))
+    # Embedding + Qdrant writes + webhook run in the background: the admin save
+    # does not wait for the embedding provider
+    task = asyncio.create_task(_sync())
+    _sync_tasks.add(task)
+    task.add_done_callback(_sync_tasks.discard)
 
-    # n8n takes care of the actual vector management (creation, update, and multi-chunk deletion)
-    # the backend just notifies n8n about the change.
+    # The backend owns the vectors (chunked upserts and deletes); n8n only fetches
+    # the entity and reports back through /api/rag/sync-callback.
 
@@ -101,6 +101,22 @@ async def startup_event():
     from app.core.redis_cache import cache
     await cache.connect()
 
+    # --- Qdrant collection + payload indexes (kept off the chat hot path) ---
+    from app.core.vector_store import collection_registry
+    try:
+        collection_registry.ensure()
+        collection_registry.ensure_payload_indexes()
+    except Exception as e:
+        collection_registry.invalidate()
+        print(f"⚠️ Qdrant collection check failed: {e}")
+
+    # --- Local vector index (read replica of Qdrant) ---
+    from app.core.local_vector_index import local_vector_index, LOCAL_INDEX_ENABLED, LOCAL_INDEX_SYNC_SECONDS
+    if LOCAL_INDEX_ENABLED:
+        if local_vector_index.load():
+            print(f"🧭 Local vector index loaded from disk ({local_vector_index.stats()['points']} points)")
+        scheduler.add_job(local_vector_index.sync, 'interval', seconds=LOCAL_INDEX_SYNC_SECONDS, next_run_time=datetime.now())
+
     # --- Automation Scheduler ---
     print("🚀 Automation Scheduler (APScheduler) Started")
     scheduler.add_job(check_automation_tasks, 'cron', minute='*')
@@ -112,6 +128,10 @@ async def shutdown_event():
     from app.core.redis_cache import cache
     await cache.disconnect()
 
+    # --- LLM provider pools ---
+    from app.services.llm_providers import llm_providers
+    await llm_providers.aclose()
+
     # --- Scheduler ---
     if scheduler.running:
         scheduler.shutdown(wait=False)
@@ -179,7 +199,22 @@ def read_root():
 async def health_check():
     """Health check — includes Redis status."""
     from app.core.redis_cache import cache
+    from app.services.embeddings import embedding_cache
+    from app.services.semantic_cache import semantic_cache
+    from app.services.single_flight import single_flight
+    from app.services.quiz_cache import quiz_cache
+    from app.services.chat_sessions import chat_sessions
+    from app.services.admission import chat_admission
+    from app.core.local_vector_index import local_vector_index
     return {
         "status": "ok",
         "redis": "connected" if cache.is_healthy else "unavailable (degraded mode)",
+        "cache": cache.stats(),
+        "embedding_cache": embedding_cache.stats(),
+        "semantic_cache": semantic_cache.stats(),
+        "single_flight": single_flight.stats(),
+        "quiz_cache": quiz_cache.stats(),
+        "chat_sessions": chat_sessions.stats(),
+        "chat_admission": chat_admission.stats(),
+        "local_vector_index": local_vector_index.stats(),
     }
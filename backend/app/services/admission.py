@@ -0,0 +1,261 @@
+"""
+Chat Admission Control — Arunachala Backend
+===========================================
+Bounds how many `/api/chat` generations hit the LLM providers at once, so
+a traffic spike degrades gracefully instead of turning into provider 429s
+and cascading timeouts.
+
+Two layers:
+
+    1. Rate — token buckets in Redis (shared by every worker): one global,
+       one per client IP. Falls back to in-process buckets without Redis.
+    2. Concurrency — per-worker slots (CHAT_MAX_CONCURRENT) with a bounded
+       FIFO wait queue (CHAT_QUEUE_SIZE). Queued streaming requests get
+       "queued, position N" SSE events while they wait.
+
+Requests rejected by either layer (or waiting longer than
+CHAT_QUEUE_TIMEOUT) get a canned degraded answer right away.
+
+Usage:
+    from app.services.admission import chat_admission, AdmissionRejected
+
+    reason = await chat_admission.check_rate(client_ip)    # None if allowed
+    ticket = chat_admission.enter()                       # raises AdmissionRejected when full
+    try:
+        async for position in ticket.wait():
+            ...                                           # emit "queued" event
+        ...                                               # call the LLM
+    finally:
+        ticket.release()
+"""
+
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, Optional
+
+from app.core.redis_cache import cache, key_rate_limit
+
+logger = logging.getLogger(__name__)
+
+CHAT_MAX_CONCURRENT = int(os.getenv("CHAT_MAX_CONCURRENT", 8))       # generations per worker
+CHAT_QUEUE_SIZE     = int(os.getenv("CHAT_QUEUE_SIZE", 16))          # waiting requests per worker
+CHAT_QUEUE_TIMEOUT  = float(os.getenv("CHAT_QUEUE_TIMEOUT", 20))     # seconds before giving up
+CHAT_GLOBAL_RATE    = float(os.getenv("CHAT_GLOBAL_RATE", 5))        # requests/s, all workers
+CHAT_GLOBAL_BURST   = int(os.getenv("CHAT_GLOBAL_BURST", 30))
+CHAT_IP_RATE        = float(os.getenv("CHAT_IP_RATE", 0.2))          # requests/s per client IP
+CHAT_IP_BURST       = int(os.getenv("CHAT_IP_BURST", 6))
+
+DEGRADED_ANSWERS = {
+    "es": "Ahora mismo estamos atendiendo muchas consultas 🙏 Por favor, inténtalo de nuevo en unos minutos. "
+          "Mientras tanto puedes consultar nuestros [horarios de yoga](/clases-de-yoga) y [terapias](/terapias).",
+    "ca": "Ara mateix estem atenent moltes consultes 🙏 Si us plau, torna-ho a provar d'aquí a uns minuts. "
+          "Mentrestant pots consultar els nostres [horaris de ioga](/clases-de-yoga) i [teràpies](/terapias).",
+    "en": "We are handling a lot of questions right now 🙏 Please try again in a few minutes. "
+          "Meanwhile you can check our [yoga schedule](/clases-de-yoga) and [therapies](/terapias).",
+}
+
+
+def degraded_answer(lang: str) -> str:
+    return DEGRADED_ANSWERS.get(lang, DEGRADED_ANSWERS["es"])
+
+
+class AdmissionRejected(Exception):
+    """The request cannot be served now (rate limited, queue full or waited too long)."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class _LocalBucket:
+    """In-process token bucket used while Redis is unavailable."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def take(self, now: float) -> bool:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class Ticket:
+    """One request's place in the concurrency limiter."""
+
+    def __init__(self, admission: "ChatAdmission", waiter: Optional[asyncio.Future]):
+        self._admission = admission
+        self._waiter = waiter
+        self._released = False
+
+    @property
+    def queued(self) -> bool:
+        return self._waiter is not None and not self._waiter.done()
+
+    async def wait(self, timeout: float = CHAT_QUEUE_TIMEOUT) -> AsyncIterator[int]:
+        """Yield the queue position each time it changes; return once a slot is ours."""
+        deadline = time.monotonic() + timeout
+        last_position = None
+        while self.queued:
+            position = self._admission.position(self._waiter)
+            if position != last_position:
+                last_position = position
+                yield position
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._admission.abandon(self._waiter)
+                raise AdmissionRejected(self._admission._reject("queue_timeout"))
+            # Grab the current event synchronously so a release right now is not missed
+            changed = asyncio.ensure_future(self._admission.changed_event().wait())
+            try:
+                await asyncio.wait({self._waiter, changed}, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            except asyncio.CancelledError:
+                self._admission.abandon(self._waiter)
+                raise
+            finally:
+                changed.cancel()
+
+    def release(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        if self._waiter is None or (self._waiter.done() and not self._waiter.cancelled()):
+            self._admission.release()
+        else:
+            self._admission.abandon(self._waiter)
+
+
+class ChatAdmission:
+    """Rate limiting (Redis token buckets) + per-worker slots with a bounded FIFO queue."""
+
+    def __init__(
+        self,
+        max_concurrent: int = CHAT_MAX_CONCURRENT,
+        queue_size: int = CHAT_QUEUE_SIZE,
+        global_rate: float = CHAT_GLOBAL_RATE,
+        global_burst: int = CHAT_GLOBAL_BURST,
+        ip_rate: float = CHAT_IP_RATE,
+        ip_burst: int = CHAT_IP_BURST,
+    ):
+        self.max_concurrent = max(1, max_concurrent)
+        self.queue_size = max(0, queue_size)
+        self.global_rate, self.global_burst = global_rate, global_burst
+        self.ip_rate, self.ip_burst = ip_rate, ip_burst
+        self._active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._changed: Optional[asyncio.Event] = None
+        self._local_buckets: Dict[str, _LocalBucket] = {}
+        self.admitted = 0
+        self.queued_total = 0
+        self.rejected: Dict[str, int] = {}
+
+    # ------------------------------------------------------------------
+    # Rate (token buckets)
+    # ------------------------------------------------------------------
+
+    async def _take(self, scope: str, rate: float, burst: int) -> bool:
+        if rate <= 0:
+            return True
+        allowed = await cache.take_token(key_rate_limit(scope), rate, burst)
+        if allowed is not None:
+            return allowed
+        bucket = self._local_buckets.get(scope)
+        if bucket is None:
+            if len(self._local_buckets) > 10000:
+                self._local_buckets.clear()
+            bucket = self._local_buckets[scope] = _LocalBucket(rate, burst)
+        return bucket.take(time.monotonic())
+
+    async def check_rate(self, client_ip: str) -> Optional[str]:
+        """Rejection reason ('rate_ip' / 'rate_global'), or None if the request may proceed."""
+        if not await self._take(f"ip:{client_ip}", self.ip_rate, self.ip_burst):
+            return self._reject("rate_ip")
+        if not await self._take("global", self.global_rate, self.global_burst):
+            return self._reject("rate_global")
+        return None
+
+    def _reject(self, reason: str) -> str:
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+        print(f"🚦 Chat request shed ({reason})")
+        return reason
+
+    # ------------------------------------------------------------------
+    # Concurrency (slots + FIFO queue)
+    # ------------------------------------------------------------------
+
+    def enter(self) -> Ticket:
+        """Take a slot, or a place in the queue. Raises AdmissionRejected when the queue is full."""
+        if self._active < self.max_concurrent and not self._waiters:
+            self._active += 1
+            self.admitted += 1
+            return Ticket(self, None)
+        if len(self._waiters) >= self.queue_size:
+            raise AdmissionRejected(self._reject("queue_full"))
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued_total += 1
+        return Ticket(self, waiter)
+
+    def position(self, waiter: asyncio.Future) -> int:
+        try:
+            return self._waiters.index(waiter) + 1
+        except ValueError:
+            return 0
+
+    def changed_event(self) -> asyncio.Event:
+        if self._changed is None:
+            self._changed = asyncio.Event()
+        return self._changed
+
+    def _notify(self) -> None:
+        # Wake current waiters and arm a fresh event for the next change
+        if self._changed is not None:
+            self._changed.set()
+        self._changed = asyncio.Event()
+
+    def release(self) -> None:
+        """Hand the freed slot to the first waiter (FIFO), or give it back."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(True)
+                self.admitted += 1
+                self._notify()
+                return
+        self._active = max(0, self._active - 1)
+        self._notify()
+
+    def abandon(self, waiter: asyncio.Future) -> None:
+        """A queued request gave up (timeout or client disconnect)."""
+        if waiter in self._waiters:
+            self._waiters.remove(waiter)
+            waiter.cancel()
+            self._notify()
+        elif waiter.done() and not waiter.cancelled():
+            # The slot was handed over just before giving up: pass it on
+            self.release()
+
+    def stats(self) -> dict:
+        return {
+            "active": self._active,
+            "queued": len(self._waiters),
+            "max_concurrent": self.max_concurrent,
+            "queue_size": self.queue_size,
+            "admitted": self.admitted,
+            "queued_total": self.queued_total,
+            "rejected": dict(self.rejected),
+        }
+
+
+# ---------------------------------------------------------------------------
+# Singleton instance — import this everywhere
+# ---------------------------------------------------------------------------
+chat_admission = ChatAdmission()
@@ -0,0 +1,200 @@
+"""
+Bulk Ingest Engine — Arunachala Backend
+=======================================
+Batched embedding + Qdrant upsert for full re-indexes (`ingest_all.py`).
+
+    1. Every item is split into chunks (see app.services.chunking).
+    2. Items are grouped into batches of up to EMBED_BATCH_SIZE chunks
+       (OpenAI accepts up to 2048 inputs per embeddings call).
+    3. Each batch is embedded with ONE API call and written with ONE
+       `batch_update_points` request (delete old chunks + upsert new ones
+       for every entity in the batch).
+    4. Batches run on a bounded thread pool (INGEST_CONCURRENCY).
+    5. Finished entities are recorded in a JSON checkpoint, so an
+       interrupted run can be resumed without re-embedding them.
+
+Usage:
+    engine = BulkIngestEngine(openai_client, qdrant_client, COLLECTION_NAME,
+                              checkpoint_path=".ingest_checkpoint.json")
+    stats = engine.run(items, resume=True)
+"""
+
+import os
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterable, List, Optional
+
+from app.services.chunking import split_into_chunks, build_chunk_points, replace_operations
+
+EMBED_BATCH_SIZE     = int(os.getenv("INGEST_EMBED_BATCH_SIZE", 256))       # inputs per embeddings call (max 2048)
+EMBED_BATCH_MAX_CHARS = int(os.getenv("INGEST_EMBED_BATCH_MAX_CHARS", 600000))  # keeps requests under the token cap
+INGEST_CONCURRENCY   = int(os.getenv("INGEST_CONCURRENCY", 4))              # batches in flight
+EMBEDDING_MODEL      = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+
+OPENAI_MAX_INPUTS = 2048
+
+
+class IngestItem:
+    """One entity to index (it may produce several chunks)."""
+
+    def __init__(self, item_type: str, item_id: int, content: str, source: str,
+                 title: Optional[str] = None, metadata: Optional[dict] = None):
+        self.item_type = item_type
+        self.item_id = item_id
+        self.content = content or ""
+        self.source = source
+        self.title = title
+        self.metadata = metadata or {}
+        self.chunks: List[str] = []
+
+    @property
+    def key(self) -> str:
+        return f"{self.item_type}:{self.item_id}"
+
+    def payload(self) -> dict:
+        # Indexed texts are the Spanish base fields (translations live in Postgres)
+        payload = {"source": self.source, "type": self.item_type, "language": "es", "updated_at": time.time()}
+        if self.title:
+            payload["title"] = self.title
+        payload.update(self.metadata)
+        return payload
+
+
+class Checkpoint:
+    """Set of finished entity keys persisted as JSON (atomic writes)."""
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.done = set()
+        self._lock = threading.Lock()
+
+    def load(self) -> None:
+        if self.path and os.path.exists(self.path):
+            with open(self.path) as f:
+                self.done = set(json.load(f).get("done", []))
+
+    def clear(self) -> None:
+        self.done = set()
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def mark(self, keys: Iterable[str]) -> None:
+        with self._lock:
+            self.done.update(keys)
+            if not self.path:
+                return
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w") as f:
+                json.dump({"done": sorted(self.done), "updated_at": time.time()}, f)
+            os.replace(tmp, self.path)
+
+
+class BulkIngestEngine:
+    """Embeds and upserts items in batches with bounded concurrency."""
+
+    def __init__(self, openai_client, qdrant_client, collection_name: str,
+                 embed_batch_size: int = EMBED_BATCH_SIZE,
+                 concurrency: int = INGEST_CONCURRENCY,
+                 checkpoint_path: Optional[str] = None,
+                 embedding_model: str = EMBEDDING_MODEL):
+        self.openai_client = openai_client
+        self.qdrant_client = qdrant_client
+        self.collection_name = collection_name
+        self.embed_batch_size = max(1, min(embed_batch_size, OPENAI_MAX_INPUTS))
+        self.concurrency = max(1, concurrency)
+        self.embedding_model = embedding_model
+        self.checkpoint = Checkpoint(checkpoint_path)
+
+    # ------------------------------------------------------------------
+    # Batching
+    # ------------------------------------------------------------------
+    def _batches(self, items: List[IngestItem]) -> List[List[IngestItem]]:
+        batches, current, n_chunks, n_chars = [], [], 0, 0
+        for item in items:
+            size = len(item.chunks)
+            chars = sum(len(c) for c in item.chunks)
+            if current and (n_chunks + size > self.embed_batch_size or n_chars + chars > EMBED_BATCH_MAX_CHARS):
+                batches.append(current)
+                current, n_chunks, n_chars = [], 0, 0
+            current.append(item)
+            n_chunks += size
+            n_chars += chars
+        if current:
+            batches.append(current)
+        return batches
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        vectors = []
+        # An oversize single entity can still exceed the per-call limit
+        for start in range(0, len(texts), self.embed_batch_size):
+            inputs = [t.replace("\n", " ") for t in texts[start:start + self.embed_batch_size]]
+            data = self.openai_client.embeddings.create(input=inputs, model=self.embedding_model).data
+            vectors.extend(d.embedding for d in sorted(data, key=lambda d: d.index))
+        return vectors
+
+    def _process_batch(self, batch: List[IngestItem]) -> int:
+        texts = [chunk for item in batch for chunk in item.chunks]
+        vectors = self._embed(texts)
+
+        operations, offset = [], 0
+        for item in batch:
+            item_vectors = vectors[offset:offset + len(item.chunks)]
+            offset += len(item.chunks)
+            points = build_chunk_points(item.item_type, item.item_id, item.chunks, item_vectors, item.payload())
+            operations.extend(replace_operations(item.item_type, item.item_id, points))
+
+        self.qdrant_client.batch_update_points(collection_name=self.collection_name, update_operations=operations)
+        self.checkpoint.mark(item.key for item in batch)
+        return len(texts)
+
+    # ------------------------------------------------------------------
+    # Run
+    # ------------------------------------------------------------------
+    def run(self, items: Iterable[IngestItem], resume: bool = False) -> dict:
+        """Index every item; returns counters and throughput."""
+        if resume:
+            self.checkpoint.load()
+        else:
+            self.checkpoint.clear()
+
+        items = list(items)
+        pending = [item for item in items if item.key not in self.checkpoint.done]
+        skipped_resume = len(items) - len(pending)
+        for item in pending:
+            item.chunks = split_into_chunks(item.content, title=item.title)
+        pending = [item for item in pending if item.chunks]
+
+        batches = self._batches(pending)
+        print(f"📦 Bulk ingest: {len(pending)} items in {len(batches)} batches "
+              f"(concurrency={self.concurrency}, resumed={skipped_resume})")
+
+        started = time.perf_counter()
+        done_items, done_chunks, failed = 0, 0, 0
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            futures = {pool.submit(self._process_batch, batch): batch for batch in batches}
+            for future in as_completed(futures):
+                batch = futures[future]
+                try:
+                    done_chunks += future.result()
+                    done_items += len(batch)
+                except Exception as e:
+                    failed += len(batch)
+                    print(f"❌ Batch failed ({len(batch)} items, first={batch[0].key}): {e}")
+                    continue
+                elapsed = time.perf_counter() - started
+                print(f"   ✅ {done_items}/{len(pending)} items — {done_items / elapsed:.1f} items/s")
+
+        elapsed = time.perf_counter() - started
+        stats = {
+            "items": done_items,
+            "chunks": done_chunks,
+            "failed": failed,
+            "resumed": skipped_resume,
+            "seconds": round(elapsed, 2),
+            "items_per_second": round(done_items / elapsed, 2) if elapsed else 0.0,
+            "chunks_per_second": round(done_chunks / elapsed, 2) if elapsed else 0.0,
+        }
+        print(f"🏁 Bulk ingest finished: {stats}")
+        return stats
@@ -0,0 +1,176 @@
+"""
+Chat Sessions — Arunachala Backend
+==================================
+Server-side conversation memory for the chatbot, so long conversations keep
+their context (rolling summary) beyond the few turns the client sends.
+
+Each session lives in Redis under `chat:session:{id}`:
+
+    {"summary": "<rolling summary of older turns>",
+     "turns":   [{"role": "user"|"assistant", "content": "..."}, ...]}
+
+The prompt gets the summary (as an extra system message, after the cached
+system prompt) plus the last SESSION_MAX_TURNS messages. When more turns
+pile up, the overflow is folded into the summary by a cheap model in a
+background task, after the answer has already been streamed.
+
+The session id travels as the `session_id` request field and/or the
+SESSION_COOKIE cookie. The client always sends its last few turns too:
+they are ignored while the session is known, and used (and stored again)
+when it is not — new, evicted, expired, or written by a worker whose
+Redis was down. Sessions are only issued while Redis is healthy; without
+it the client-sent history is used as before.
+
+Usage:
+    from app.services.chat_sessions import chat_sessions
+
+    session = await chat_sessions.load(session_id)
+    history = chat_sessions.history(session, client_messages)
+    await chat_sessions.record(session_id, session, client_messages, answer)
+"""
+
+import os
+import re
+import asyncio
+import secrets
+import logging
+from typing import List, Optional, Set
+
+from app.core.redis_cache import cache, key_chat_session, TTL_CHAT_SESSION
+from app.services.llm_router import llm_router
+
+logger = logging.getLogger(__name__)
+
+CHAT_SESSIONS_ENABLED = os.getenv("CHAT_SESSIONS_ENABLED", "true").lower() == "true"
+SESSION_COOKIE        = os.getenv("CHAT_SESSION_COOKIE", "arunachala_chat")
+SESSION_MAX_TURNS     = int(os.getenv("CHAT_SESSION_MAX_TURNS", 6))        # messages kept verbatim
+SESSION_HARD_LIMIT    = int(os.getenv("CHAT_SESSION_HARD_LIMIT", 24))      # cap if summarizing keeps failing
+SESSION_SUMMARY_MODEL = os.getenv("CHAT_SESSION_SUMMARY_MODEL", "groq")    # cheap provider for summaries
+SESSION_SUMMARY_CHARS = int(os.getenv("CHAT_SESSION_SUMMARY_CHARS", 1200)) # max summary length
+
+_SESSION_ID = re.compile(r"^[A-Za-z0-9_-]{16,64}$")
+
+SUMMARY_PROMPT = (
+    "Resume la conversación entre un usuario y el asistente del centro 'Arunachala Yoga y Terapias'. "
+    "Conserva los datos útiles para seguir la conversación: intereses, necesidades, preferencias, "
+    "clases o terapias mencionadas y preguntas pendientes. Máximo 5 frases, sin saludos, "
+    "en el idioma de la conversación."
+)
+
+
+def _empty() -> dict:
+    return {"summary": "", "turns": []}
+
+
+class ChatSessionStore:
+    """Redis-backed rolling summary + recent turns per chat session."""
+
+    def __init__(self, max_turns: int = SESSION_MAX_TURNS, enabled: bool = CHAT_SESSIONS_ENABLED):
+        self.max_turns = max(2, max_turns)
+        self.enabled = enabled
+        self._summarizing: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self.summaries = 0
+        self.summary_failures = 0
+
+    @staticmethod
+    def new_id() -> str:
+        return secrets.token_urlsafe(18)
+
+    @staticmethod
+    def valid_id(session_id: Optional[str]) -> bool:
+        return bool(session_id) and bool(_SESSION_ID.match(session_id))
+
+    async def load(self, session_id: str) -> dict:
+        stored = await cache.get(key_chat_session(session_id))
+        if not isinstance(stored, dict):
+            return _empty()
+        return {"summary": stored.get("summary") or "", "turns": list(stored.get("turns") or [])}
+
+    async def save(self, session_id: str, session: dict) -> None:
+        await cache.set(key_chat_session(session_id), session, ttl=TTL_CHAT_SESSION)
+
+    @staticmethod
+    def is_new(session: dict) -> bool:
+        return not session["summary"] and not session["turns"]
+
+    def history(self, session: dict, messages: List[dict]) -> List[dict]:
+        """LLM messages (without the main system prompt) for this turn."""
+        if self.is_new(session):
+            # First turn, or a session lost in Redis: the client's recent turns
+            return messages[-5:]
+        history = []
+        if session["summary"]:
+            history.append({"role": "system", "content": f"RESUMEN DE LA CONVERSACIÓN ANTERIOR:\n{session['summary']}"})
+        history.extend(session["turns"][-self.max_turns:])
+        history.append(messages[-1])
+        return history
+
+    async def record(self, session_id: str, session: dict, messages: List[dict], answer: str) -> None:
+        """Append the user message + answer; schedule summarization if turns overflow."""
+        if not answer:
+            return
+        if self.is_new(session):
+            new_turns = [m for m in messages[-(self.max_turns + 1):] if m["role"] in ("user", "assistant")]
+        else:
+            new_turns = [messages[-1]]
+        new_turns.append({"role": "assistant", "content": answer})
+
+        session = {"summary": session["summary"], "turns": (session["turns"] + new_turns)[-SESSION_HARD_LIMIT:]}
+        await self.save(session_id, session)
+        if len(session["turns"]) > self.max_turns:
+            self._schedule_summary(session_id)
+
+    def _schedule_summary(self, session_id: str) -> None:
+        if session_id in self._summarizing:
+            return
+        self._summarizing.add(session_id)
+        task = asyncio.create_task(self._summarize(session_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _summarize(self, session_id: str) -> None:
+        try:
+            session = await self.load(session_id)
+            overflow = session["turns"][:-self.max_turns]
+            if not overflow:
+                return
+            transcript = "\n".join(f"{m['role']}: {m['content']}" for m in overflow)
+            if session["summary"]:
+                transcript = f"Resumen previo: {session['summary']}\n\n{transcript}"
+            try:
+                summary = await llm_router.complete(
+                    [{"role": "system", "content": SUMMARY_PROMPT}, {"role": "user", "content": transcript}],
+                    preferred=SESSION_SUMMARY_MODEL,
+                    temperature=0.2,
+                )
+            except Exception as exc:
+                self.summary_failures += 1
+                logger.warning(f"Chat session summary failed: {exc}")
+                return
+
+            # Re-read: another turn may have been appended meanwhile
+            latest = await self.load(session_id)
+            if latest["turns"][:len(overflow)] == overflow:
+                latest["turns"] = latest["turns"][len(overflow):]
+            latest["summary"] = (summary or "").strip()[:SESSION_SUMMARY_CHARS]
+            await self.save(session_id, latest)
+            self.summaries += 1
+            print(f"📝 Chat session summarized ({len(overflow)} messages folded)")
+        finally:
+            self._summarizing.discard(session_id)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "max_turns": self.max_turns,
+            "summaries": self.summaries,
+            "summary_failures": self.summary_failures,
+            "summarizing": len(self._summarizing),
+        }
+
+
+# ---------------------------------------------------------------------------
+# Singleton instance — import this everywhere
+# ---------------------------------------------------------------------------
+chat_sessions = ChatSessionStore()
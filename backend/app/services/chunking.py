@@ -0,0 +1,252 @@
+"""
+Chunked Indexing — Arunachala Backend
+=====================================
+Splits long entity texts (articles, meditations, ...) into overlapping,
+heading-aware chunks and stores them as N Qdrant points per entity.
+
+Every point carries `entity_type`, `entity_id`, `chunk_no` and
+`chunk_count` in its payload, and its ID is derived deterministically
+from `get_qdrant_id`, so re-indexing an entity overwrites the same
+points. Chunk 0 keeps the plain `get_qdrant_id` value, which is the ID
+the n8n flow and older single-vector points already use.
+
+Updates and deletes go through `replace_entity_chunks` /
+`delete_entity_chunks`, which remove *all* chunks of the entity (by
+payload filter) in the same batched Qdrant request as the upsert.
+Dashboard edits are re-indexed by the backend only
+(`notify_n8n_content_change`): the n8n "CHATBOT RAG Sync" flow no longer
+writes to Qdrant on create/update, so chunk 0's ID is never overwritten
+with a whole-document point.
+
+`ingest_all.py` indexes every `contents` row as type `content`, while the
+dashboard notifies `article` / `meditation` / ...; `indexed_entity_types`
+lists both so an edit also clears the chunks written by a full re-index.
+
+Usage:
+    from app.services.chunking import split_into_chunks, build_chunk_points, replace_entity_chunks
+
+    chunks = split_into_chunks(article.body, title=article.title)
+    points = build_chunk_points("article", article.id, chunks, vectors, base_payload)
+    replace_entity_chunks(qdrant_client, COLLECTION_NAME, "article", article.id, points)
+"""
+
+import os
+import re
+import html
+import hashlib
+from typing import List, Optional
+
+from qdrant_client.http import models
+
+CHUNK_SIZE    = int(os.getenv("RAG_CHUNK_SIZE", 1200))    # characters per chunk
+CHUNK_OVERLAP = int(os.getenv("RAG_CHUNK_OVERLAP", 200))  # characters repeated from the previous chunk
+
+_HEADING_HTML = re.compile(r"<h([1-6])[^>]*>(.*?)</h\1>", re.IGNORECASE | re.DOTALL)
+_BLOCK_END    = re.compile(r"</(p|div|li|ul|ol|blockquote)>|<br\s*/?>", re.IGNORECASE)
+_TAG          = re.compile(r"<[^>]+>")
+_MD_HEADING   = re.compile(r"^\s{0,3}#{1,6}\s+(.*)$")
+
+
+# ---------------------------------------------------------------------------
+# IDs
+# ---------------------------------------------------------------------------
+def get_qdrant_id(item_type: str, item_id: int) -> str:
+    """Genera el mismo ID que n8n usando hash MD5."""
+    seed = f"{item_type}_{item_id}"
+    return hashlib.md5(seed.encode()).hexdigest()
+
+
+def get_chunk_id(item_type: str, item_id: int, chunk_no: int) -> str:
+    """Deterministic point ID for one chunk (chunk 0 == get_qdrant_id)."""
+    base = get_qdrant_id(item_type, item_id)
+    if chunk_no == 0:
+        return base
+    return hashlib.md5(f"{base}_{chunk_no}".encode()).hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Splitting
+# ---------------------------------------------------------------------------
+def html_to_text(text: str) -> str:
+    """Flatten rich-text HTML into plain text, turning <hN> into markdown headings."""
+    if not text:
+        return ""
+    text = _HEADING_HTML.sub(lambda m: f"\n{'#' * int(m.group(1))} {m.group(2)}\n", text)
+    text = _BLOCK_END.sub("\n", text)
+    text = _TAG.sub("", text)
+    text = html.unescape(text)
+    return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+
+def _sections(text: str) -> List[tuple]:
+    """Split plain text into (heading, body) sections."""
+    sections = []
+    heading, lines = None, []
+    for line in text.splitlines():
+        match = _MD_HEADING.match(line)
+        if match:
+            if any(l.strip() for l in lines):
+                sections.append((heading, "\n".join(lines).strip()))
+            heading, lines = match.group(1).strip(), []
+        else:
+            lines.append(line)
+    if any(l.strip() for l in lines) or heading:
+        sections.append((heading, "\n".join(lines).strip()))
+    return sections
+
+
+def _split_long(text: str, size: int) -> List[str]:
+    """Split one oversize paragraph at sentence, then word boundaries."""
+    pieces, current = [], ""
+    for sentence in re.split(r"(?<=[.!?…])\s+", text):
+        while len(sentence) > size:
+            cut = sentence.rfind(" ", 0, size)
+            cut = cut if cut > size // 2 else size
+            pieces.append((current + " " + sentence[:cut]).strip() if current else sentence[:cut])
+            current, sentence = "", sentence[cut:].strip()
+        if len(current) + len(sentence) + 1 > size and current:
+            pieces.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}".strip()
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def _tail(text: str, overlap: int) -> str:
+    if overlap <= 0 or len(text) <= overlap:
+        return text if overlap > 0 else ""
+    tail = text[-overlap:]
+    space = tail.find(" ")
+    return tail[space + 1:] if 0 <= space < overlap // 2 else tail
+
+
+def split_into_chunks(
+    text: str,
+    title: Optional[str] = None,
+    size: int = CHUNK_SIZE,
+    overlap: int = CHUNK_OVERLAP,
+) -> List[str]:
+    """
+    Heading-aware chunking with overlap.
+
+    Paragraphs are packed into chunks of at most ~`size` characters without
+    crossing section headings; each chunk starts with the document title and
+    its section heading, plus the last `overlap` characters of the previous
+    chunk of the same section.
+    """
+    plain = html_to_text(text)
+    if not plain:
+        return [f"# {title}"] if title else []
+
+    chunks = []
+    for heading, body in _sections(plain):
+        prefix = "\n".join(p for p in [f"# {title}" if title else "", f"## {heading}" if heading else ""] if p)
+        paragraphs = [p.strip() for p in re.split(r"\n\s*\n", body) if p.strip()]
+        if not paragraphs and heading:
+            paragraphs = [heading]
+
+        budget = max(size - len(prefix), size // 2)
+        # Leave room for the overlap carried into each new chunk
+        unit_budget = max(budget - overlap, budget // 2)
+        units = []
+        for p in paragraphs:
+            units.extend(_split_long(p, unit_budget) if len(p) > unit_budget else [p])
+
+        current = ""
+        for unit in units:
+            if current and len(current) + len(unit) + 2 > budget:
+                chunks.append(f"{prefix}\n\n{current}" if prefix else current)
+                carry = _tail(current, overlap)
+                current = f"{carry}\n\n{unit}" if carry else unit
+            else:
+                current = f"{current}\n\n{unit}" if current else unit
+        if current:
+            chunks.append(f"{prefix}\n\n{current}" if prefix else current)
+
+    return chunks
+
+
+# ---------------------------------------------------------------------------
+# Qdrant points
+# ---------------------------------------------------------------------------
+# Dashboard content types stored in the `contents` table (indexed as "content" by ingest_all)
+CONTENT_ENTITY_TYPES = {"content", "article", "meditation", "announcement"}
+
+
+def indexed_entity_types(item_type: str) -> List[str]:
+    """Entity types whose chunks may belong to this entity (notified type first)."""
+    if item_type in CONTENT_ENTITY_TYPES and item_type != "content":
+        return [item_type, "content"]
+    return [item_type]
+
+
+def entity_filter(item_type: str, item_id: int) -> models.Filter:
+    return models.Filter(
+        must=[
+            models.FieldCondition(key="entity_type", match=models.MatchValue(value=item_type)),
+            models.FieldCondition(key="entity_id", match=models.MatchValue(value=item_id)),
+        ]
+    )
+
+
+def build_chunk_points(
+    item_type: str,
+    item_id: int,
+    chunks: List[str],
+    vectors: List[List[float]],
+    base_payload: Optional[dict] = None,
+) -> List[models.PointStruct]:
+    """One PointStruct per chunk, with entity/chunk metadata in the payload."""
+    points = []
+    for chunk_no, (chunk, vector) in enumerate(zip(chunks, vectors)):
+        payload = dict(base_payload or {})
+        payload.update({
+            "content": chunk,
+            "type": payload.get("type", item_type),
+            "entity_type": item_type,
+            "entity_id": item_id,
+            "chunk_no": chunk_no,
+            "chunk_count": len(chunks),
+        })
+        points.append(models.PointStruct(id=get_chunk_id(item_type, item_id, chunk_no), vector=vector, payload=payload))
+    return points
+
+
+def replace_operations(item_type: str, item_id: int, points: List[models.PointStruct]) -> list:
+    """Delete-all-chunks + upsert, as operations for `batch_update_points`."""
+    operations = [models.DeleteOperation(delete=models.FilterSelector(filter=entity_filter(item_type, item_id)))]
+    if points:
+        operations.append(models.UpsertOperation(upsert=models.PointsList(points=points)))
+    return operations
+
+
+def replace_entity_chunks(client, collection_name: str, item_type: str, item_id: int, points: List[models.PointStruct]) -> None:
+    """Replace every chunk of an entity in a single batched Qdrant request."""
+    client.batch_update_points(
+        collection_name=collection_name,
+        update_operations=replace_operations(item_type, item_id, points),
+    )
+
+
+def delete_operations(item_type: str, item_id: int) -> list:
+    """Delete every chunk of an entity (under all its indexed types) plus the legacy single points."""
+    operations = []
+    for entity_type in indexed_entity_types(item_type):
+        operations.append(models.DeleteOperation(delete=models.FilterSelector(filter=entity_filter(entity_type, item_id))))
+        operations.append(models.DeleteOperation(delete=models.PointIdsList(points=[get_qdrant_id(entity_type, item_id)])))
+    return operations
+
+
+def delete_entity_chunks(client, collection_name: str, item_type: str, item_id: int) -> None:
+    """Remove every chunk of an entity (plus the legacy single point) in one request."""
+    client.batch_update_points(collection_name=collection_name, update_operations=delete_operations(item_type, item_id))
+
+
+def reindex_operations(item_type: str, item_id: int, points: List[models.PointStruct]) -> list:
+    """Delete all existing chunks of the entity (any indexed type), then upsert `points`."""
+    operations = delete_operations(item_type, item_id)
+    if points:
+        operations.append(models.UpsertOperation(upsert=models.PointsList(points=points)))
+    return operations
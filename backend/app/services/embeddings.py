@@ -0,0 +1,134 @@
+"""
+Query Embeddings — Arunachala Backend
+=====================================
+Cached embeddings for chatbot queries.
+
+Repeated questions ("horarios de yoga", "precio masaje", ...) are served
+from a two-tier cache instead of calling OpenAI every turn:
+
+    1. In-process LRU (per worker, microseconds)
+    2. Redis via `RedisCache` (shared across workers)
+
+Vectors are stored as packed little-endian float32 bytes, which is about
+5x smaller than a JSON list and needs no parsing.
+
+Usage:
+    from app.services.embeddings import embedding_cache, embed_texts
+
+    vector = await embedding_cache.get_embedding("¿Horarios de yoga?")
+    vectors = await embed_texts(["doc 1", "doc 2"])   # uncached, for ingestion
+"""
+
+import os
+import re
+import struct
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import List, Optional
+
+from app.core.redis_cache import cache, key_embedding, TTL_EMBEDDING
+from app.services.llm_providers import llm_providers, EMBEDDING_MODEL
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", 2048))  # LRU entries per worker
+
+_PUNCTUATION_EDGES = "¿?¡!.,;: \"'"
+
+
+class EmbeddingsUnavailable(Exception):
+    """Raised when no OpenAI provider is configured for embeddings."""
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+def normalize_query(text: str) -> str:
+    """Lowercase, collapse whitespace and strip surrounding punctuation."""
+    text = re.sub(r"\s+", " ", text or "").strip().casefold()
+    return text.strip(_PUNCTUATION_EDGES)
+
+
+def pack_vector(vector: List[float]) -> bytes:
+    return struct.pack(f"<{len(vector)}f", *vector)
+
+
+def unpack_vector(raw: bytes) -> List[float]:
+    return list(struct.unpack(f"<{len(raw) // 4}f", raw))
+
+
+async def embed_texts(texts: List[str], model: str = EMBEDDING_MODEL) -> List[List[float]]:
+    """Embed texts with OpenAI (no caching — meant for documents)."""
+    provider = llm_providers.get("openai")
+    if not provider:
+        raise EmbeddingsUnavailable("OpenAI API Key not configured")
+    return await provider.embed([t.replace("\n", " ") for t in texts], model=model)
+
+
+# ---------------------------------------------------------------------------
+# EmbeddingCache class
+# ---------------------------------------------------------------------------
+class EmbeddingCache:
+    """Normalized-query embedding cache: in-process LRU + Redis tier."""
+
+    def __init__(self, max_entries: int = EMBEDDING_CACHE_SIZE, model: str = EMBEDDING_MODEL):
+        self.model = model
+        self._max_entries = max_entries
+        self._lru: "OrderedDict[str, bytes]" = OrderedDict()
+        self.hits_local = 0
+        self.hits_redis = 0
+        self.misses = 0
+
+    def _digest(self, normalized: str) -> str:
+        return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+    def _remember(self, digest: str, packed: bytes) -> None:
+        self._lru[digest] = packed
+        self._lru.move_to_end(digest)
+        while len(self._lru) > self._max_entries:
+            self._lru.popitem(last=False)
+
+    async def get_embedding(self, text: str) -> List[float]:
+        """Return the embedding for a user query, computing it only on a full miss."""
+        normalized = normalize_query(text)
+        digest = self._digest(normalized)
+
+        packed: Optional[bytes] = self._lru.get(digest)
+        if packed is not None:
+            self._lru.move_to_end(digest)
+            self.hits_local += 1
+            return unpack_vector(packed)
+
+        redis_key = key_embedding(self.model, digest)
+        packed = await cache.get_raw(redis_key)
+        if packed:
+            self.hits_redis += 1
+            self._remember(digest, packed)
+            return unpack_vector(packed)
+
+        self.misses += 1
+        vector = (await embed_texts([normalized or text], model=self.model))[0]
+        packed = pack_vector(vector)
+        self._remember(digest, packed)
+        await cache.set_raw(redis_key, packed, ttl=TTL_EMBEDDING)
+        return vector
+
+    def stats(self) -> dict:
+        lookups = self.hits_local + self.hits_redis + self.misses
+        return {
+            "hits_local": self.hits_local,
+            "hits_redis": self.hits_redis,
+            "misses": self.misses,
+            "hit_rate": round((lookups - self.misses) / lookups, 3) if lookups else 0.0,
+            "local_entries": len(self._lru),
+        }
+
+    def clear_local(self) -> None:
+        self._lru.clear()
+
+
+# ---------------------------------------------------------------------------
+# Singleton instance — import this everywhere
+# ---------------------------------------------------------------------------
+embedding_cache = EmbeddingCache()
@@ -0,0 +1,187 @@
+"""
+Hybrid Search — Arunachala Backend
+==================================
+Lexical retrieval with Postgres full-text search, fused with the Qdrant
+(vector) results by reciprocal rank fusion (RRF).
+
+Embeddings are good at paraphrases but often miss exact terms: class names
+("Hatha", "Kundalini"), Sanskrit words, codes. The lexical side searches
+`contents`, `yoga_classes`, `massage_types`, `therapy_types` and
+`activities` with the text-search configuration of the user's language
+(Spanish base fields, plus the translated fields for ca/en).
+
+The tsvector expressions below are exactly the ones indexed by
+`migrations/002_add_fulltext_search_indexes.sql` (GIN, one per table and
+language), so each lookup is an index scan. Keep both in sync.
+
+Usage:
+    from app.services.hybrid_search import lexical_search, rrf_fuse
+
+    lexical = await lexical_search("clases de kundalini", "es")
+    results = rrf_fuse(vector_results, lexical)
+"""
+
+import os
+import re
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from qdrant_client.http import models
+
+from app.core.database import SessionLocal
+from app.services.rag_context import ContextDocument, RAG_MIN_SCORE, RAG_TOP_K
+
+logger = logging.getLogger(__name__)
+
+HYBRID_SEARCH_ENABLED = os.getenv("HYBRID_SEARCH_ENABLED", "true").lower() == "true"
+HYBRID_LEXICAL_TOP_K  = int(os.getenv("HYBRID_LEXICAL_TOP_K", 8))   # Postgres candidates per query
+HYBRID_RRF_K          = int(os.getenv("HYBRID_RRF_K", 60))          # RRF damping constant
+HYBRID_SNIPPET_CHARS  = int(os.getenv("HYBRID_SNIPPET_CHARS", 4000))
+
+# Text-search configuration per language (arunachala_ca is created by the migration)
+TEXT_SEARCH_CONFIGS = {
+    "es": "spanish",
+    "ca": "arunachala_ca",
+    "en": "english",
+}
+
+# entity type (as in the Qdrant payload) -> (table, title column, indexed fields, row filter)
+SEARCH_TABLES: Dict[str, Tuple[str, str, List[str], Optional[str]]] = {
+    "content":    ("contents", "title", ["title", "excerpt", "body"], "status = 'published'"),
+    "yoga_class": ("yoga_classes", "name", ["name", "description"], None),
+    "massage":    ("massage_types", "name", ["name", "excerpt", "description", "benefits"], "is_active"),
+    "therapy":    ("therapy_types", "name", ["name", "excerpt", "description", "benefits"], "is_active"),
+    "activity":   ("activities", "title", ["title", "description", "location"], "is_active"),
+}
+
+# Tables whose rows carry their own payload type (contents → article / meditation / announcement),
+# so lexical hits fuse with the Qdrant points of the same entity
+TYPE_COLUMNS = {
+    "content": "contents.type",
+}
+
+_WORD = re.compile(r"\w{2,}")
+
+
+def search_language(lang: Optional[str]) -> str:
+    """
+    Whitelisted language for the SQL text. `lang` comes from the client, and
+    only indexed languages have a GIN index, so anything else searches Spanish.
+    """
+    return lang if lang in TEXT_SEARCH_CONFIGS else "es"
+
+
+def text_search_config(lang: str) -> str:
+    return TEXT_SEARCH_CONFIGS[search_language(lang)]
+
+
+def document_expression(fields: List[str], lang: str) -> str:
+    """tsvector expression for one table and language (must match the GIN index)."""
+    lang = search_language(lang)
+    parts = [f"coalesce({field}, '')" for field in fields]
+    if lang != "es":
+        parts += [f"coalesce(translations->'{lang}'->>'{field}', '')" for field in fields]
+    joined = " || ' ' || ".join(parts)
+    return f"to_tsvector('{text_search_config(lang)}'::regconfig, {joined})"
+
+
+def query_terms(query: str) -> str:
+    """OR-query of the user's words for to_tsquery (any matching term counts, more terms rank higher)."""
+    return " | ".join(dict.fromkeys(word.lower() for word in _WORD.findall(query or "")))
+
+
+def _translated(field: str, lang: str) -> str:
+    if lang == "es":
+        return field
+    return f"coalesce(nullif(translations->'{lang}'->>'{field}', ''), {field})"
+
+
+def build_search_sql(lang: str) -> str:
+    """One UNION ALL over every searchable table, ranked by ts_rank_cd."""
+    lang = search_language(lang)
+    config = text_search_config(lang)
+    selects = []
+    for entity_type, (table, title_col, fields, row_filter) in SEARCH_TABLES.items():
+        document = document_expression(fields, lang)
+        body = " || ' ' || ".join(f"coalesce({_translated(f, lang)}, '')" for f in fields if f != title_col)
+        where = f"{document} @@ q" + (f" AND {row_filter}" if row_filter else "")
+        type_expr = TYPE_COLUMNS.get(entity_type, f"'{entity_type}'")
+        selects.append(
+            f"SELECT {type_expr} AS type, id, {_translated(title_col, lang)} AS title, "
+            f"left(regexp_replace({body}, '<[^>]+>', ' ', 'g'), {HYBRID_SNIPPET_CHARS}) AS content, "
+            f"ts_rank_cd({document}, q) AS rank "
+            f"FROM {table}, to_tsquery('{config}'::regconfig, :terms) q WHERE {where}"
+        )
+    return "SELECT * FROM (" + " UNION ALL ".join(selects) + ") hits ORDER BY rank DESC LIMIT :limit"
+
+
+def _search_blocking(query: str, lang: str, limit: int) -> List[models.ScoredPoint]:
+    terms = query_terms(query)
+    if not terms:
+        return []
+    db = SessionLocal()
+    try:
+        rows = db.execute(text(build_search_sql(lang)), {"terms": terms, "limit": limit}).fetchall()
+    finally:
+        db.close()
+    return [
+        models.ScoredPoint(
+            id=f"{row.type}_{row.id}",
+            version=0,
+            score=float(row.rank),
+            payload={
+                "type": row.type,
+                "entity_id": row.id,
+                "title": row.title,
+                "content": row.content,
+                "source": "fulltext",
+            },
+        )
+        for row in rows
+    ]
+
+
+async def lexical_search(query: str, lang: str, limit: int = HYBRID_LEXICAL_TOP_K) -> List[models.ScoredPoint]:
+    """Postgres full-text hits, best first ([] on any error, e.g. migration not applied)."""
+    lang = search_language(lang)
+    try:
+        return await asyncio.to_thread(_search_blocking, query, lang, limit)
+    except Exception as exc:
+        logger.warning(f"Lexical search failed: {exc}")
+        return []
+
+
+def rrf_fuse(
+    vector_results: List[Any],
+    lexical_results: List[Any],
+    k: int = HYBRID_RRF_K,
+    limit: int = RAG_TOP_K,
+    min_score: float = RAG_MIN_SCORE,
+) -> List[models.ScoredPoint]:
+    """
+    Reciprocal rank fusion by entity: score = sum(1 / (k + rank)) over both lists.
+    Vector hits below `min_score` are dropped first (lexical hits are real matches);
+    each entity keeps the payload of its first-seen hit (the vector chunk if any).
+    """
+    vector_results = [res for res in vector_results or [] if (getattr(res, "score", None) or 0.0) >= min_score]
+    fused: Dict[tuple, float] = {}
+    payloads: Dict[tuple, Any] = {}
+    for results in (vector_results, lexical_results or []):
+        rank = 0
+        seen = set()
+        for res in results:
+            key = ContextDocument(res).entity_key
+            if key in seen:
+                continue  # another chunk of an entity already ranked in this list
+            seen.add(key)
+            rank += 1
+            fused[key] = fused.get(key, 0.0) + 1.0 / (k + rank)
+            payloads.setdefault(key, res)
+
+    ranked = sorted(fused, key=fused.get, reverse=True)[:limit]
+    return [
+        models.ScoredPoint(id=getattr(payloads[key], "id", 0), version=0, score=fused[key], payload=payloads[key].payload)
+        for key in ranked
+    ]
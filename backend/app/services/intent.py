@@ -0,0 +1,84 @@
+"""
+Query Intent — Arunachala Backend
+=================================
+Rules-based (no LLM) classifier that narrows the knowledge-base search to
+the payload types a question is about, e.g. "¿qué masajes tenéis?" only
+needs `massage` points.
+
+Keywords are matched accent-insensitively on word prefixes in es/ca/en.
+A question matching several intents searches the union of their types;
+one matching none is not filtered. The caller widens the search again
+when the filtered query returns too few hits (INTENT_MIN_RESULTS).
+
+Usage:
+    from app.services.intent import classify_intent
+
+    filters = classify_intent("¿Hacéis reiki los sábados?")   # {"type": ["therapy"]}
+    hits = await search_knowledge_base(query, filters=filters)
+"""
+
+import os
+import re
+import unicodedata
+from typing import Dict, List, Optional
+
+INTENT_ENABLED     = os.getenv("INTENT_FILTER_ENABLED", "true").lower() == "true"
+INTENT_MIN_RESULTS = int(os.getenv("INTENT_MIN_RESULTS", 2))  # fewer filtered hits → unfiltered search
+
+# intent -> (payload types, keyword prefixes)
+INTENT_RULES: Dict[str, tuple] = {
+    "yoga": (
+        ["yoga_class", "static"],
+        ["yoga", "ioga", "hatha", "vinyasa", "kundalini", "asana", "pranayama", "clase", "classe", "class",
+         "horari", "schedule"],
+    ),
+    "massage": (
+        ["massage"],
+        ["masaj", "massatg", "massage", "ayurved", "tailandes", "thai", "quiromasaj", "drenaj"],
+    ),
+    "therapy": (
+        ["therapy"],
+        ["terapi", "therap", "reiki", "bach", "holistic", "sanacion", "sanacio", "healing"],
+    ),
+    "meditation": (
+        ["content", "meditation"],
+        ["medita", "mantra", "mindfulness", "relajacion", "relaxacio", "relaxation"],
+    ),
+    "activity": (
+        ["activity"],
+        ["taller", "curso", "curs", "course", "retiro", "retir", "retreat", "evento", "event", "workshop"],
+    ),
+    "article": (
+        ["content", "article"],
+        ["articul", "article", "blog"],
+    ),
+}
+
+_WORD = re.compile(r"\w+")
+
+
+def _words(text: str) -> List[str]:
+    text = unicodedata.normalize("NFKD", (text or "").casefold())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _WORD.findall(text)
+
+
+def detect_intents(query: str) -> List[str]:
+    """Names of the intents whose keywords appear in the query (rule order)."""
+    words = _words(query)
+    return [
+        intent for intent, (_, prefixes) in INTENT_RULES.items()
+        if any(word.startswith(prefix) for word in words for prefix in prefixes)
+    ]
+
+
+def classify_intent(query: str) -> Optional[dict]:
+    """Payload filters for the knowledge-base search, or None to search everything."""
+    if not INTENT_ENABLED:
+        return None
+    types: List[str] = []
+    for intent in detect_intents(query):
+        for payload_type in INTENT_RULES[intent][0]:
+            if payload_type not in types:
+                types.append(payload_type)
+    return {"type": types} if types else None
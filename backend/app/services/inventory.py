@@ -0,0 +1,395 @@
+"""
+Chatbot Inventory — Arunachala Backend
+======================================
+Builds the `INVENTARIO DETALLADO` block of the chatbot prompt.
+
+The inventory is kept as one structured snapshot per section (yoga,
+massage, therapy, articles, ...) in Redis, shared by every language: each
+item stores its Spanish fields plus the titles/details found in the
+model's `translations` JSON, and `render_inventory(snapshot, lang)` picks
+the requested language (falling back to Spanish), so the LLM no longer
+has to translate the catalog on every turn.
+
+When an entity changes, `notify_n8n_content_change` calls
+`schedule_refresh(content_type)`, which rebuilds ONLY the affected
+section(s) in the background and overwrites their keys — nothing is
+deleted, so the chat hot path never has to do a cold rebuild after an
+admin edit. The rebuild holds the same per-section leases as the
+background refresh, so a refresh that read the old rows cannot overwrite
+it. Reads go through `cache.get_or_compute_many` (one MGET for every
+section): a missing section is built by one worker while the others wait
+for it, and an expired one keeps being served while a single worker
+rebuilds it in the background.
+
+For regular chat turns `get_inventory_text(db, lang, query, query_vector)`
+renders only a count header plus the items relevant to the question (see
+app.services.inventory_index); the quiz still receives the full catalog.
+
+Usage:
+    from app.services.inventory import get_inventory_text, schedule_refresh
+
+    inventory_text = await get_inventory_text(db, "es")                      # full catalog
+    inventory_text = await get_inventory_text(db, "es", query, query_vector)  # relevant items only
+    schedule_refresh("massage")   # after a massage was created/updated/deleted
+"""
+
+import os
+import re
+import json
+import asyncio
+import hashlib
+from functools import partial
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session, selectinload
+
+from app.core.database import SessionLocal
+from app.core.redis_cache import cache, key_inventory_section, TTL_INVENTORY_SECTION, VERSION_INVENTORY
+from app.models.models import (
+    Content, YogaClassDefinition, MassageType, TherapyType, Activity, Promotion
+)
+from app.services.inventory_index import inventory_index
+
+INVENTORY_LANGUAGES = ["ca", "en"]  # besides the base (Spanish) fields
+INVENTORY_REFRESH_DELAY = float(os.getenv("INVENTORY_REFRESH_DELAY", 0.5))  # coalesces bursts of writes
+INVENTORY_SELECTION_ENABLED = os.getenv("INVENTORY_SELECTION_ENABLED", "true").lower() == "true"
+INVENTORY_RELEVANT_ITEMS    = int(os.getenv("INVENTORY_RELEVANT_ITEMS", 8))       # items per chat prompt
+INVENTORY_FALLBACK_ITEMS    = int(os.getenv("INVENTORY_FALLBACK_ITEMS", 2))       # per section when nothing matches
+
+# section -> (Model, content type filter, sample limit, count label)
+SECTIONS = {
+    "yoga":          (YogaClassDefinition, None, 5, "YOGA: {n} clases"),
+    "massage":       (MassageType, None, 5, "MASAJES: {n} tipos"),
+    "therapy":       (TherapyType, None, 5, "TERAPIAS: {n} tipos"),
+    "articles":      (Content, "article", 8, "{n} artículos en el blog"),
+    "meditations":   (Content, "meditation", 10, "{n} meditaciones guiadas"),
+    "activities":    (Activity, None, 5, "{n} actividades"),
+    "promotions":    (Promotion, None, 5, "{n} promociones activas"),
+    "announcements": (Content, "announcement", 5, "{n} noticias"),
+}
+SECTION_ORDER = list(SECTIONS.keys())
+
+# Short headings used when only the relevant items are listed
+SECTION_TITLES = {
+    "yoga": "YOGA", "massage": "MASAJES", "therapy": "TERAPIAS", "articles": "ARTÍCULOS",
+    "meditations": "MEDITACIONES", "activities": "ACTIVIDADES", "promotions": "PROMOCIONES",
+    "announcements": "NOTICIAS",
+}
+
+# notify_n8n_content_change content_type -> affected sections
+SECTIONS_BY_CONTENT_TYPE = {
+    "yoga_class":   ["yoga"],
+    "massage":      ["massage"],
+    "therapy":      ["therapy"],
+    "article":      ["articles"],
+    "meditation":   ["meditations"],
+    "announcement": ["announcements"],
+    "content":      ["articles", "meditations", "announcements"],
+    "activity":     ["activities"],
+    "promotion":    ["promotions"],
+    "tag":          [],
+}
+
+
+def sections_for(content_type: Optional[str]) -> List[str]:
+    return SECTIONS_BY_CONTENT_TYPE.get(content_type, SECTION_ORDER)
+
+
+# ---------------------------------------------------------------------------
+# Building (DB -> structured snapshot)
+# ---------------------------------------------------------------------------
+def _active_query(db: Session, Model, entity_type=None):
+    query = db.query(Model)
+    if hasattr(Model, 'is_active'):
+        query = query.filter(Model.is_active == True)
+    elif hasattr(Model, 'status'):
+        query = query.filter(Model.status == 'published')
+    if entity_type and hasattr(Model, 'type'):
+        query = query.filter(Model.type == entity_type)
+    return query
+
+
+def _item_url(Model, entity_type, item, slug: str) -> str:
+    if Model == YogaClassDefinition:
+        return "/clases-de-yoga"
+    if Model == MassageType:
+        return f"/terapias/masajes?item={slug}"
+    if Model == TherapyType:
+        return f"/terapias/terapias-holisticas?item={slug}"
+    if entity_type == 'article':
+        return f"/blog/{slug}"
+    if entity_type == 'meditation':
+        return f"/meditaciones/{slug}"
+    if entity_type == 'announcement':
+        return "/#noticias"
+    if Model == Promotion:
+        return "/"
+    if Model == Activity:
+        return f"/actividades?activity={item.id}"
+    return ""
+
+
+def _translated(item, lang: str) -> dict:
+    """Fields stored for `lang` in the item's translations JSON ({} if none)."""
+    translations = getattr(item, 'translations', None) or {}
+    fields = translations.get(lang) if isinstance(translations, dict) else None
+    return fields if isinstance(fields, dict) else {}
+
+
+def _item_detail(Model, entity_type, item, fields: Optional[dict] = None) -> str:
+    """
+    Extra info for Promotions and Announcements to help the bot explain them.
+    `fields` overrides the item's text attributes (translated values).
+    """
+    def field(name):
+        if fields and fields.get(name):
+            return fields[name]
+        return getattr(item, name, '')
+
+    if Model == Promotion:
+        d_text = field('description')
+        d_code = getattr(item, 'discount_code', '')
+        d_pct = getattr(item, 'discount_percentage', '')
+        extras = []
+        if d_pct: extras.append(f"{d_pct}% dto")
+        if d_code: extras.append(f"Código: {d_code}")
+        if d_text: extras.append(d_text[:60] + "..." if len(d_text) > 60 else d_text)
+        return f"Info: {', '.join(extras)}" if extras else ""
+
+    if entity_type == 'announcement':
+        body = field('body') or field('description') or ''
+        clean_body = re.sub('<[^<]+?>', '', body)  # Basic strip tags
+        if clean_body:
+            trunc = clean_body[:80] + "..." if len(clean_body) > 80 else clean_body
+            return f"Detalle: {trunc}"
+    return ""
+
+
+def build_section(db: Session, section: str) -> dict:
+    """Query one section: active count plus the most recent samples."""
+    Model, entity_type, limit, _ = SECTIONS[section]
+    query = _active_query(db, Model, entity_type)
+    count = query.count()
+
+    if hasattr(Model, 'created_at'):
+        query = query.order_by(Model.created_at.desc())
+    elif hasattr(Model, 'id'):
+        query = query.order_by(Model.id.desc())
+    if Model == YogaClassDefinition:
+        # Avoid one lazy-load query per class
+        query = query.options(selectinload(YogaClassDefinition.schedules))
+
+    items = []
+    for item in (query.limit(limit).all() if count else []):
+        title = getattr(item, 'title', None) or getattr(item, 'name', None)
+        if not title:
+            continue
+        slug = getattr(item, 'slug', None)
+        if not slug:
+            # If no slug, generate one for linking (Massages/Therapies)
+            slug = title.lower().replace(" ", "-").replace("á", "a").replace("é", "e").replace("í", "i").replace("ó", "o").replace("ú", "u").replace("ñ", "n")
+
+        entry = {"title": title, "url": _item_url(Model, entity_type, item, slug)}
+        if Model == YogaClassDefinition and item.schedules:
+            times = [f"{s.day_of_week} {s.start_time}" for s in item.schedules if s.is_active]
+            if times:
+                entry["schedule"] = ", ".join(times)
+        detail = _item_detail(Model, entity_type, item)
+        if detail:
+            entry["detail"] = detail
+
+        i18n = {}
+        for lang in INVENTORY_LANGUAGES:
+            fields = _translated(item, lang)
+            if not fields:
+                continue
+            localized = {}
+            localized_title = fields.get('title') or fields.get('name')
+            if localized_title and localized_title != title:
+                localized["title"] = localized_title
+            localized_detail = _item_detail(Model, entity_type, item, fields)
+            if localized_detail and localized_detail != detail:
+                localized["detail"] = localized_detail
+            if localized:
+                i18n[lang] = localized
+        if i18n:
+            entry["i18n"] = i18n
+        items.append(entry)
+
+    return {"count": count, "items": items}
+
+
+def _build_sections_with_session(sections: List[str]) -> Dict[str, dict]:
+    db = SessionLocal()
+    try:
+        return {s: build_section(db, s) for s in sections}
+    finally:
+        db.close()
+
+
+# ---------------------------------------------------------------------------
+# Rendering (structured snapshot -> prompt text)
+# ---------------------------------------------------------------------------
+def _section_label(section: str, data: Optional[dict]) -> str:
+    if not data or not data.get("count"):
+        return ""
+    return SECTIONS[section][3].format(n=data["count"])
+
+
+def render_entry(entry: dict, lang: str = "es") -> str:
+    localized = entry.get("i18n", {}).get(lang, {})
+    title = localized.get("title") or entry["title"]
+    detail = localized.get("detail") or entry.get("detail")
+    info = f"'{title}' (URL: {entry['url']})" if entry.get("url") else f"'{title}'"
+    if entry.get("schedule"):
+        info += f" [Horario: {entry['schedule']}]"
+    if detail:
+        info += f" [{detail}]"
+    return info
+
+
+def render_section(section: str, data: dict, lang: str = "es") -> str:
+    label = _section_label(section, data)
+    if not label:
+        return ""
+    details = [render_entry(entry, lang) for entry in data.get("items", [])]
+    return label + (" (ITEMS DISPONIBLES: " + ", ".join(details) + ")" if details else "")
+
+
+def render_inventory(snapshot: Dict[str, dict], lang: str = "es") -> str:
+    parts = [render_section(s, snapshot.get(s), lang) for s in SECTION_ORDER]
+    return "INVENTARIO DETALLADO: " + "; ".join(p for p in parts if p) + "."
+
+
+def render_relevant_inventory(snapshot: Dict[str, dict], keys: List[Tuple[str, int]], lang: str = "es") -> str:
+    """Count header for every section + only the selected items, grouped by section."""
+    labels = [_section_label(s, snapshot.get(s)) for s in SECTION_ORDER]
+    header = "INVENTARIO (totales): " + "; ".join(l for l in labels if l) + "."
+
+    grouped: Dict[str, List[str]] = {}
+    for section, position in keys:
+        items = (snapshot.get(section) or {}).get("items", [])
+        if position < len(items):
+            grouped.setdefault(section, []).append(render_entry(items[position], lang))
+    if not grouped:
+        return header
+    parts = [f"{SECTION_TITLES[s]}: " + ", ".join(grouped[s]) for s in SECTION_ORDER if s in grouped]
+    return header + " ITEMS RELEVANTES: " + "; ".join(parts) + "."
+
+
+def _index_items(snapshot: Dict[str, dict]) -> List[Tuple[Tuple[str, int], str]]:
+    """(section, position) keys and the text matched against the query (all languages)."""
+    items = []
+    for section in SECTION_ORDER:
+        for position, entry in enumerate((snapshot.get(section) or {}).get("items", [])):
+            texts = [SECTION_TITLES[section], entry["title"], entry.get("detail", "")]
+            for localized in entry.get("i18n", {}).values():
+                texts.extend([localized.get("title", ""), localized.get("detail", "")])
+            items.append(((section, position), " | ".join(t for t in texts if t)))
+    return items
+
+
+def _fallback_keys(snapshot: Dict[str, dict]) -> List[Tuple[str, int]]:
+    """A few recent items per section for generic questions ("¿qué ofrecéis?")."""
+    keys = []
+    for section in SECTION_ORDER:
+        n_items = len((snapshot.get(section) or {}).get("items", []))
+        keys.extend((section, position) for position in range(min(n_items, INVENTORY_FALLBACK_ITEMS)))
+    return keys
+
+
+# ---------------------------------------------------------------------------
+# Cache access
+# ---------------------------------------------------------------------------
+async def _build_section_async(section: str) -> dict:
+    print(f"💾 Inventory MISS for '{section}' — building from DB")
+    built = await asyncio.to_thread(_build_sections_with_session, [section])
+    return built[section]
+
+
+async def get_snapshot(db: Session) -> Dict[str, dict]:
+    """
+    All sections (every language). Sections are built with their own DB session
+    (`db` is unused) because a stale section may be rebuilt after the request ends.
+    """
+    results = await cache.get_or_compute_many(
+        {key_inventory_section(s): partial(_build_section_async, s) for s in SECTION_ORDER},
+        ttl=TTL_INVENTORY_SECTION,
+        return_exceptions=True,
+    )
+    snapshot = {}
+    for section, result in zip(SECTION_ORDER, results.values()):
+        if isinstance(result, Exception):
+            print(f"Error building inventory section '{section}': {result}")
+        else:
+            snapshot[section] = result
+    return snapshot
+
+
+def _snapshot_signature(snapshot: Dict[str, dict], version: int) -> str:
+    """
+    Index key for a snapshot: the inventory version counter (bumped after every
+    rebuild) plus the sections present, so the snapshot is not re-serialized on
+    each request. Without Redis the counter is per-process, so hash the content.
+    """
+    if cache.is_healthy:
+        return f"v{version}:{','.join(sorted(snapshot))}"
+    return hashlib.sha1(json.dumps(snapshot, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+async def get_inventory_text(
+    db: Session,
+    lang: str,
+    query: Optional[str] = None,
+    query_vector: Optional[List[float]] = None,
+) -> str:
+    """Full inventory, or header + relevant items when a `query` is given."""
+    selecting = query is not None and INVENTORY_SELECTION_ENABLED
+    # Read before the snapshot: a refresh writes its sections, then bumps the version
+    version = await cache.get_version(VERSION_INVENTORY) if selecting else None
+    snapshot = await get_snapshot(db)
+    if not selecting:
+        return render_inventory(snapshot, lang)
+
+    inventory_index.sync(_snapshot_signature(snapshot, version), _index_items(snapshot))
+    keys = inventory_index.select(query, query_vector, limit=INVENTORY_RELEVANT_ITEMS)
+    return render_relevant_inventory(snapshot, keys or _fallback_keys(snapshot), lang)
+
+
+async def refresh_sections(sections: List[str]) -> None:
+    """Rebuild the given sections from the DB and overwrite their cache keys."""
+    async def rebuild() -> Dict[str, dict]:
+        # Read the DB only once the leases are held (see cache.recompute)
+        built = await asyncio.to_thread(_build_sections_with_session, sections)
+        return {key_inventory_section(s): data for s, data in built.items()}
+
+    await cache.recompute(
+        [key_inventory_section(s) for s in sections],
+        rebuild,
+        ttl=TTL_INVENTORY_SECTION,
+    )
+    # Answers generated from the previous inventory must not be reused
+    await cache.bump_version(VERSION_INVENTORY)
+    print(f"🔄 Inventory sections refreshed: {sections}")
+
+
+_pending_refresh: Dict[str, asyncio.Task] = {}
+
+
+async def _refresh_later(section: str) -> None:
+    await asyncio.sleep(INVENTORY_REFRESH_DELAY)
+    # Clear before reading the DB so writes made during the rebuild schedule a new one
+    _pending_refresh.pop(section, None)
+    try:
+        await refresh_sections([section])
+    except Exception as e:
+        print(f"⚠️  Inventory refresh failed for '{section}': {e}")
+
+
+def schedule_refresh(content_type: Optional[str]) -> None:
+    """Queue a background rebuild of the sections affected by `content_type`."""
+    for section in sections_for(content_type):
+        task = _pending_refresh.get(section)
+        if task and not task.done():
+            continue
+        _pending_refresh[section] = asyncio.create_task(_refresh_later(section))
@@ -0,0 +1,130 @@
+"""
+Inventory Item Index — Arunachala Backend
+=========================================
+Picks the inventory items relevant to the current chat question, so the
+prompt carries a short count header plus a handful of items instead of
+the whole catalog.
+
+The index is rebuilt in-process whenever the inventory snapshot changes
+(detected by a content signature). Scoring uses:
+
+    1. Cosine similarity against a precomputed float32 matrix of item
+       embeddings (one batched OpenAI call per snapshot, done in the
+       background), when the query embedding is available.
+    2. Keyword overlap (accent-insensitive, light plural stripping) as the
+       fallback while embeddings are not ready or OpenAI is unavailable.
+
+Usage:
+    from app.services.inventory_index import inventory_index
+
+    inventory_index.sync(signature, items)          # items: [(key, text), ...]
+    keys = inventory_index.select(query, query_vector, limit=8)
+"""
+
+import os
+import re
+import asyncio
+import logging
+import unicodedata
+from typing import List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.services.embeddings import embed_texts
+
+logger = logging.getLogger(__name__)
+
+INVENTORY_MIN_SIMILARITY = float(os.getenv("INVENTORY_MIN_SIMILARITY", 0.3))  # cosine similarity
+INVENTORY_MIN_OVERLAP    = float(os.getenv("INVENTORY_MIN_OVERLAP", 0.2))     # share of query keywords
+
+_WORD = re.compile(r"\w+")
+# Very common words that would make every item "relevant"
+_STOPWORDS = {
+    "que", "cual", "cuales", "como", "donde", "cuando", "para", "por", "con", "una", "uno", "los", "las",
+    "del", "hay", "teneis", "tienes", "quiero", "puedo", "sobre", "mas", "esta", "este", "estos",
+    "quin", "quins", "quines", "com", "teniu", "amb", "per", "les", "dels",
+    "what", "which", "how", "where", "when", "the", "and", "for", "with", "you", "have", "are", "about",
+}
+
+
+def keywords(text: str) -> Set[str]:
+    """Accent-insensitive keyword set (words of 3+ letters, trailing plural 's' removed)."""
+    text = unicodedata.normalize("NFKD", (text or "").casefold())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    words = set()
+    for word in _WORD.findall(text):
+        if len(word) < 3 or word in _STOPWORDS or word.isdigit():
+            continue
+        words.add(word[:-1] if len(word) > 4 and word.endswith("s") else word)
+    return words
+
+
+class InventoryIndex:
+    """In-memory item matrix + keyword sets for one inventory snapshot."""
+
+    def __init__(self):
+        self._signature: Optional[str] = None
+        self._keys: List[Tuple[str, int]] = []
+        self._keywords: List[Set[str]] = []
+        self._matrix: Optional[np.ndarray] = None
+        self._embedding_task: Optional[asyncio.Task] = None
+
+    def sync(self, signature: str, items: List[Tuple[Tuple[str, int], str]]) -> None:
+        """(Re)build the index if the snapshot changed; embeddings load in the background."""
+        if signature == self._signature:
+            return
+        self._signature = signature
+        self._keys = [key for key, _ in items]
+        self._keywords = [keywords(text) for _, text in items]
+        self._matrix = None
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return  # no running loop (scripts/tests): keyword matching only
+        if items:
+            self._embedding_task = asyncio.create_task(self._embed(signature, [text for _, text in items]))
+
+    async def _embed(self, signature: str, texts: List[str]) -> None:
+        try:
+            vectors = np.asarray(await embed_texts(texts), dtype=np.float32)
+        except Exception as exc:
+            logger.info(f"Inventory index: embeddings unavailable ({exc}) — keyword matching only")
+            return
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        if signature == self._signature:
+            self._matrix = vectors / norms
+
+    def select(self, query: str, query_vector: Optional[List[float]] = None, limit: int = 8) -> List[Tuple[str, int]]:
+        """Keys of the items relevant to `query`, best first (may be empty)."""
+        if not self._keys:
+            return []
+        scores = np.zeros(len(self._keys), dtype=np.float32)
+        relevant = np.zeros(len(self._keys), dtype=bool)
+
+        if self._matrix is not None and query_vector is not None:
+            q = np.asarray(query_vector, dtype=np.float32)
+            norm = np.linalg.norm(q)
+            if norm > 0 and q.shape[0] == self._matrix.shape[1]:
+                sims = self._matrix @ (q / norm)
+                scores += sims
+                relevant |= sims >= INVENTORY_MIN_SIMILARITY
+
+        query_words = keywords(query)
+        if query_words:
+            overlap = np.array([len(query_words & words) / len(query_words) for words in self._keywords], dtype=np.float32)
+            scores += overlap
+            relevant |= overlap >= INVENTORY_MIN_OVERLAP
+
+        ranked = [i for i in np.argsort(-scores) if relevant[i]]
+        return [self._keys[i] for i in ranked[:limit]]
+
+    @property
+    def embeddings_ready(self) -> bool:
+        return self._matrix is not None
+
+
+# ---------------------------------------------------------------------------
+# Singleton instance — import this everywhere
+# ---------------------------------------------------------------------------
+inventory_index = InventoryIndex()
@@ -0,0 +1,257 @@
+"""
+LLM Providers — Arunachala Backend
+==================================
+Async provider layer used by the chatbot (`/api/chat`).
+
+Every provider wraps an *async* SDK client (AsyncOpenAI, AsyncGroq and
+the async Gemini API), so a completion in flight never blocks the
+uvicorn event loop. Each provider owns exactly one client — and therefore
+one connection pool — for the whole process, with explicit timeouts.
+
+Usage:
+    from app.services.llm_providers import llm_providers
+
+    provider = llm_providers.first_available("groq")
+    text = await provider.complete(messages)
+
+    async for piece in provider.stream(messages):
+        ...
+"""
+
+import os
+import logging
+from typing import AsyncIterator, Dict, List, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Optional SDKs — a missing package simply disables that provider
+# ---------------------------------------------------------------------------
+try:
+    from openai import AsyncOpenAI
+except ImportError:
+    AsyncOpenAI = None
+
+try:
+    from groq import AsyncGroq
+except ImportError:
+    AsyncGroq = None
+
+try:
+    import google.generativeai as genai
+except ImportError:
+    genai = None
+
+
+# ---------------------------------------------------------------------------
+# Settings
+# ---------------------------------------------------------------------------
+LLM_TIMEOUT          = float(os.getenv("LLM_TIMEOUT", 60))          # total seconds per request
+LLM_CONNECT_TIMEOUT  = float(os.getenv("LLM_CONNECT_TIMEOUT", 5))   # seconds to open a connection
+LLM_MAX_CONNECTIONS  = int(os.getenv("LLM_MAX_CONNECTIONS", 100))   # pool size per provider
+LLM_MAX_KEEPALIVE    = int(os.getenv("LLM_MAX_KEEPALIVE", 20))
+LLM_MAX_RETRIES      = int(os.getenv("LLM_MAX_RETRIES", 1))
+
+OPENAI_CHAT_MODEL = os.getenv("OPENAI_CHAT_MODEL", "gpt-4o-mini")
+GROQ_CHAT_MODEL   = os.getenv("GROQ_CHAT_MODEL", "llama-3.3-70b-versatile")
+GEMINI_CHAT_MODEL = os.getenv("GEMINI_CHAT_MODEL", "gemini-1.5-flash")
+EMBEDDING_MODEL   = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+
+# Order used after the model selected in AgentConfig
+DEFAULT_FALLBACK_ORDER = ["groq", "openai", "gemini"]
+
+
+def _http_client() -> httpx.AsyncClient:
+    """Dedicated connection pool for one provider."""
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_KEEPALIVE,
+        ),
+    )
+
+
+# ---------------------------------------------------------------------------
+# Providers
+# ---------------------------------------------------------------------------
+class LLMProvider:
+    """Common interface: one-shot completion and token streaming."""
+
+    name: str = ""
+    model: str = ""
+
+    async def complete(self, messages: List[dict], temperature: float = 0.7) -> str:
+        raise NotImplementedError
+
+    def stream(self, messages: List[dict], temperature: float = 0.7) -> AsyncIterator[str]:
+        raise NotImplementedError
+
+    async def aclose(self) -> None:
+        pass
+
+
+class _OpenAICompatibleProvider(LLMProvider):
+    """OpenAI and Groq share the same chat.completions API shape."""
+
+    def __init__(self, client, model: str):
+        self._client = client
+        self.model = model
+
+    async def complete(self, messages: List[dict], temperature: float = 0.7) -> str:
+        completion = await self._client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+        )
+        return completion.choices[0].message.content or ""
+
+    async def stream(self, messages: List[dict], temperature: float = 0.7) -> AsyncIterator[str]:
+        response = await self._client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            stream=True,
+        )
+        async for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    async def aclose(self) -> None:
+        try:
+            await self._client.close()
+        except Exception:
+            pass
+
+
+class OpenAIProvider(_OpenAICompatibleProvider):
+    name = "openai"
+
+    def __init__(self, api_key: str, model: str = OPENAI_CHAT_MODEL):
+        client = AsyncOpenAI(
+            api_key=api_key,
+            max_retries=LLM_MAX_RETRIES,
+            http_client=_http_client(),
+        )
+        super().__init__(client, model)
+
+    async def embed(self, texts: List[str], model: str = EMBEDDING_MODEL) -> List[List[float]]:
+        """Embed a batch of texts, preserving input order."""
+        response = await self._client.embeddings.create(input=texts, model=model)
+        return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+
+
+class GroqProvider(_OpenAICompatibleProvider):
+    name = "groq"
+
+    def __init__(self, api_key: str, model: str = GROQ_CHAT_MODEL):
+        client = AsyncGroq(
+            api_key=api_key,
+            max_retries=LLM_MAX_RETRIES,
+            http_client=_http_client(),
+        )
+        super().__init__(client, model)
+
+
+class GeminiProvider(LLMProvider):
+    """
+    Gemini through `generate_content_async`. The SDK keeps a single
+    grpc.aio channel per process, which acts as the provider's pool.
+    """
+
+    name = "gemini"
+
+    def __init__(self, api_key: str, model: str = GEMINI_CHAT_MODEL):
+        genai.configure(api_key=api_key)
+        self._model = genai.GenerativeModel(model)
+        self.model = model
+
+    @staticmethod
+    def _to_prompt(messages: List[dict]) -> str:
+        return "\n".join([f"{m['role']}: {m['content']}" for m in messages])
+
+    def _options(self, temperature: float) -> dict:
+        return {
+            "generation_config": {"temperature": temperature},
+            "request_options": {"timeout": LLM_TIMEOUT},
+        }
+
+    async def complete(self, messages: List[dict], temperature: float = 0.7) -> str:
+        response = await self._model.generate_content_async(
+            self._to_prompt(messages), **self._options(temperature)
+        )
+        return response.text
+
+    async def stream(self, messages: List[dict], temperature: float = 0.7) -> AsyncIterator[str]:
+        response = await self._model.generate_content_async(
+            self._to_prompt(messages), stream=True, **self._options(temperature)
+        )
+        async for chunk in response:
+            if chunk.text:
+                yield chunk.text
+
+
+# ---------------------------------------------------------------------------
+# Registry
+# ---------------------------------------------------------------------------
+class ProviderRegistry:
+    """Holds the configured providers and resolves the fallback order."""
+
+    def __init__(self):
+        self._providers: Dict[str, LLMProvider] = {}
+
+    def register(self, provider: LLMProvider) -> None:
+        self._providers[provider.name] = provider
+
+    def get(self, name: Optional[str]) -> Optional[LLMProvider]:
+        return self._providers.get(name) if name else None
+
+    def resolve_order(self, preferred: Optional[str] = None) -> List[LLMProvider]:
+        """Preferred provider first, then the default fallbacks (configured ones only)."""
+        order = []
+        for name in [preferred, *DEFAULT_FALLBACK_ORDER]:
+            provider = self.get(name)
+            if provider and provider not in order:
+                order.append(provider)
+        return order
+
+    def first_available(self, preferred: Optional[str] = None) -> Optional[LLMProvider]:
+        order = self.resolve_order(preferred)
+        return order[0] if order else None
+
+    @property
+    def has_any(self) -> bool:
+        return bool(self._providers)
+
+    async def aclose(self) -> None:
+        """Close every provider pool. Called from FastAPI shutdown event."""
+        for provider in self._providers.values():
+            await provider.aclose()
+
+
+def build_registry() -> ProviderRegistry:
+    registry = ProviderRegistry()
+
+    openai_key = os.getenv("OPENAI_API_KEY")
+    groq_key = os.getenv("GROQ_API_KEY")
+    gemini_key = os.getenv("GEMINI_API_KEY")
+
+    if openai_key and AsyncOpenAI is not None:
+        registry.register(OpenAIProvider(openai_key))
+    if groq_key and AsyncGroq is not None:
+        registry.register(GroqProvider(groq_key))
+    if gemini_key and genai is not None:
+        try:
+            registry.register(GeminiProvider(gemini_key))
+        except Exception as exc:
+            logger.warning(f"Gemini provider disabled: {exc}")
+
+    return registry
+
+
+# ---------------------------------------------------------------------------
+# Singleton instance — import this everywhere
+# ---------------------------------------------------------------------------
+llm_providers = build_registry()
@@ -0,0 +1,365 @@
+"""
+LLM Router — Arunachala Backend
+===============================
+Health-aware routing on top of the provider registry.
+
+For every provider the router keeps rolling statistics of the last
+ROUTER_WINDOW calls (latency, time-to-first-token, error rate) and a
+circuit breaker:
+
+    closed     → requests flow normally
+    open       → ROUTER_FAILURE_THRESHOLD consecutive failures; the provider
+                 is skipped for ROUTER_OPEN_SECONDS
+    half_open  → after the cooldown one probe request is let through;
+                 success closes the circuit, failure re-opens it
+
+The provider chosen in AgentConfig stays first while it is healthy; the
+fallbacks are ordered by their recent latency. Streams that do not yield
+a first token within ROUTER_FIRST_TOKEN_TIMEOUT fail over to the next
+provider before anything has been sent to the client. With
+ROUTER_HEDGING_ENABLED, a stream slower than the provider's p95 TTFT is
+hedged: the next healthy provider gets the same prompt, the first one to
+produce a token wins and the other is cancelled.
+
+Usage:
+    from app.services.llm_router import llm_router
+
+    text = await llm_router.complete(messages, preferred="groq")
+
+    async for piece in llm_router.stream(messages, preferred="groq"):
+        ...
+
+    llm_router.stats()   # exposed on GET /api/chat/providers
+"""
+
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import AsyncIterator, Dict, List, Optional
+
+from app.services.llm_providers import LLMProvider, ProviderRegistry, llm_providers
+
+logger = logging.getLogger(__name__)
+
+ROUTER_WINDOW              = int(os.getenv("ROUTER_WINDOW", 50))                   # calls kept per provider
+ROUTER_FAILURE_THRESHOLD   = int(os.getenv("ROUTER_FAILURE_THRESHOLD", 3))         # consecutive failures to open
+ROUTER_OPEN_SECONDS        = float(os.getenv("ROUTER_OPEN_SECONDS", 30))           # cooldown before a probe
+ROUTER_FIRST_TOKEN_TIMEOUT = float(os.getenv("ROUTER_FIRST_TOKEN_TIMEOUT", 8))     # seconds, streaming only
+
+# Hedged streaming: if the first token is later than the provider's usual
+# TTFT percentile, the same prompt is also sent to the next healthy provider
+ROUTER_HEDGING_ENABLED     = os.getenv("ROUTER_HEDGING_ENABLED", "false").lower() == "true"
+ROUTER_HEDGE_PERCENTILE    = float(os.getenv("ROUTER_HEDGE_PERCENTILE", 95))
+ROUTER_HEDGE_MIN_SAMPLES   = int(os.getenv("ROUTER_HEDGE_MIN_SAMPLES", 10))        # TTFTs needed before using the percentile
+ROUTER_HEDGE_DEFAULT_DELAY = float(os.getenv("ROUTER_HEDGE_DEFAULT_DELAY", 2.0))   # seconds, until enough samples
+ROUTER_HEDGE_MIN_DELAY     = float(os.getenv("ROUTER_HEDGE_MIN_DELAY", 0.3))       # never hedge earlier than this
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class NoHealthyProvider(Exception):
+    """Raised when every configured provider failed or has an open circuit."""
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+# ---------------------------------------------------------------------------
+# ProviderHealth class
+# ---------------------------------------------------------------------------
+class ProviderHealth:
+    """Rolling stats + circuit breaker for one provider."""
+
+    def __init__(self, window: int = ROUTER_WINDOW):
+        self.latencies: deque = deque(maxlen=window)
+        self.ttfts: deque = deque(maxlen=window)
+        self.outcomes: deque = deque(maxlen=window)  # True = success
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._probe_started = 0.0
+        self.hedges_fired = 0  # times this provider was slow and got hedged
+        self.hedge_wins = 0    # times this provider won as the hedge
+
+    def allow_request(self, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and now - self.opened_at >= ROUTER_OPEN_SECONDS:
+            self.state = HALF_OPEN
+            self._probe_in_flight = False
+        # A probe abandoned by its caller (e.g. client disconnect) must not block forever
+        if self.state == HALF_OPEN and (not self._probe_in_flight or now - self._probe_started >= ROUTER_OPEN_SECONDS):
+            self._probe_in_flight = True
+            self._probe_started = now
+            return True
+        return False
+
+    def record_success(self, latency: float, ttft: Optional[float] = None) -> None:
+        self.latencies.append(latency)
+        if ttft is not None:
+            self.ttfts.append(ttft)
+        self.outcomes.append(True)
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self._probe_in_flight = False
+
+    def record_failure(self, now: Optional[float] = None) -> None:
+        self.outcomes.append(False)
+        self.consecutive_failures += 1
+        self._probe_in_flight = False
+        if self.state == HALF_OPEN or self.consecutive_failures >= ROUTER_FAILURE_THRESHOLD:
+            if self.state != OPEN:
+                logger.warning(f"Circuit OPEN after {self.consecutive_failures} failures")
+            self.state = OPEN
+            self.opened_at = time.monotonic() if now is None else now
+
+    @property
+    def error_rate(self) -> float:
+        return round(self.outcomes.count(False) / len(self.outcomes), 3) if self.outcomes else 0.0
+
+    def expected_latency(self) -> float:
+        """Routing score: median TTFT (or latency), penalised by the error rate."""
+        base = _percentile(list(self.ttfts), 50) or _percentile(list(self.latencies), 50) or 0.0
+        return base * (1 + 4 * self.error_rate)
+
+    def ttft_percentile(self, pct: float) -> Optional[float]:
+        return _percentile(list(self.ttfts), pct)
+
+    def snapshot(self) -> dict:
+        latencies, ttfts = list(self.latencies), list(self.ttfts)
+        return {
+            "state": self.state,
+            "calls": len(self.outcomes),
+            "error_rate": self.error_rate,
+            "consecutive_failures": self.consecutive_failures,
+            "latency_p50": _round(_percentile(latencies, 50)),
+            "latency_p95": _round(_percentile(latencies, 95)),
+            "ttft_p50": _round(_percentile(ttfts, 50)),
+            "ttft_p95": _round(_percentile(ttfts, 95)),
+            "hedges_fired": self.hedges_fired,
+            "hedge_wins": self.hedge_wins,
+        }
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 3) if value is not None else None
+
+
+# ---------------------------------------------------------------------------
+# LLMRouter class
+# ---------------------------------------------------------------------------
+class LLMRouter:
+    """Chooses providers by health and fails over between them."""
+
+    def __init__(self, registry: ProviderRegistry):
+        self.registry = registry
+        self._health: Dict[str, ProviderHealth] = {}
+
+    def health(self, name: str) -> ProviderHealth:
+        if name not in self._health:
+            self._health[name] = ProviderHealth()
+        return self._health[name]
+
+    def order(self, preferred: Optional[str] = None) -> List[LLMProvider]:
+        """Configured providers, best first (circuits are checked when each is tried)."""
+        providers = self.registry.resolve_order(preferred)
+        # Keep the admin's choice first; order the fallbacks by recent latency
+        head = providers[:1] if providers and providers[0].name == preferred else []
+        rest = providers[len(head):]
+        return head + sorted(rest, key=lambda p: self.health(p.name).expected_latency())
+
+    def _attempts(self, preferred: Optional[str]):
+        """Yield (provider, health) for every provider whose circuit admits a request."""
+        for provider in self.order(preferred):
+            health = self.health(provider.name)
+            if health.allow_request():
+                yield provider, health
+
+    async def complete(self, messages: List[dict], preferred: Optional[str] = None, temperature: float = 0.7) -> str:
+        last_error: Optional[Exception] = None
+        for provider, health in self._attempts(preferred):
+            started = time.perf_counter()
+            try:
+                text = await provider.complete(messages, temperature=temperature)
+            except Exception as exc:
+                health.record_failure()
+                logger.warning(f"LLM {provider.name} failed ({exc}) — trying next provider")
+                last_error = exc
+                continue
+            health.record_success(time.perf_counter() - started)
+            return text
+        raise NoHealthyProvider(str(last_error) if last_error else "No hay proveedores de IA disponibles")
+
+    def hedge_delay(self, name: str, first_token_timeout: float = ROUTER_FIRST_TOKEN_TIMEOUT) -> float:
+        """Seconds to wait for `name`'s first token before hedging (its TTFT percentile)."""
+        health = self.health(name)
+        delay = ROUTER_HEDGE_DEFAULT_DELAY
+        if len(health.ttfts) >= ROUTER_HEDGE_MIN_SAMPLES:
+            delay = health.ttft_percentile(ROUTER_HEDGE_PERCENTILE)
+        return min(max(delay, ROUTER_HEDGE_MIN_DELAY), first_token_timeout)
+
+    async def _first_token(self, attempts, messages: List[dict], temperature: float,
+                           first_token_timeout: float, hedge: bool):
+        """
+        Start providers from `attempts` until one yields its first token.
+
+        Returns (winner, first_piece, last_error); winner is None when every
+        provider failed. With `hedge`, a second provider is started when the
+        primary is slower than its hedge delay; the loser is cancelled.
+        """
+        in_flight: List[_Attempt] = []
+        last_error: Optional[Exception] = None
+        hedged = False
+
+        def launch() -> bool:
+            for provider, health in attempts:
+                iterator = provider.stream(messages, temperature=temperature).__aiter__()
+                in_flight.append(_Attempt(provider, health, iterator))
+                return True
+            return False
+
+        async def drop(attempt: "_Attempt", error: Optional[Exception] = None) -> None:
+            in_flight.remove(attempt)
+            await attempt.cancel()
+            if error is not None:
+                attempt.health.record_failure()
+                reason = "no first token in time" if isinstance(error, asyncio.TimeoutError) else error
+                logger.warning(f"LLM {attempt.provider.name} stream failed ({reason}) — trying next provider")
+
+        if not launch():
+            return None, None, None
+        try:
+            while in_flight:
+                now = time.perf_counter()
+                timeout = min(a.started + first_token_timeout for a in in_flight) - now
+                hedge_at = None
+                if hedge and not hedged and len(in_flight) == 1:
+                    primary = in_flight[0]
+                    hedge_at = primary.started + self.hedge_delay(primary.provider.name, first_token_timeout)
+                    timeout = min(timeout, hedge_at - now)
+
+                done, _ = await asyncio.wait(
+                    [a.task for a in in_flight], timeout=max(timeout, 0), return_when=asyncio.FIRST_COMPLETED
+                )
+                now = time.perf_counter()
+
+                for attempt in [a for a in in_flight if a.task in done]:
+                    try:
+                        first = attempt.task.result()
+                    except StopAsyncIteration:
+                        first = None  # empty answer, still a success
+                    except Exception as exc:
+                        last_error = exc
+                        await drop(attempt, exc)
+                        continue
+                    in_flight.remove(attempt)
+                    for loser in list(in_flight):
+                        await drop(loser)
+                    if hedged and attempt is not primary:
+                        attempt.health.hedge_wins += 1
+                    return attempt, first, last_error
+
+                for attempt in [a for a in in_flight if now - a.started >= first_token_timeout]:
+                    last_error = asyncio.TimeoutError()
+                    await drop(attempt, last_error)
+
+                if hedge_at is not None and now >= hedge_at and in_flight:
+                    hedged = True
+                    if launch():
+                        primary.health.hedges_fired += 1
+                        logger.info(f"LLM {primary.provider.name} slow to start — hedging with {in_flight[-1].provider.name}")
+
+                if not in_flight and not launch():
+                    break
+        finally:
+            for attempt in list(in_flight):
+                await drop(attempt)
+        return None, None, last_error
+
+    async def stream(
+        self,
+        messages: List[dict],
+        preferred: Optional[str] = None,
+        temperature: float = 0.7,
+        first_token_timeout: float = ROUTER_FIRST_TOKEN_TIMEOUT,
+        hedge: Optional[bool] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Stream from the first provider that produces a token in time.
+        Failover happens only before the first token; a failure after that
+        is recorded and re-raised (the client already has partial text).
+        With `hedge` (default ROUTER_HEDGING_ENABLED) a slow start fires the
+        same prompt at the next healthy provider and the first stream wins.
+        """
+        hedge = ROUTER_HEDGING_ENABLED if hedge is None else hedge
+        winner, first, last_error = await self._first_token(
+            self._attempts(preferred), messages, temperature, first_token_timeout, hedge
+        )
+        if winner is None:
+            raise NoHealthyProvider(str(last_error) if last_error else "No hay proveedores de IA disponibles")
+
+        ttft = time.perf_counter() - winner.started
+        if first is None:
+            winner.health.record_success(ttft)
+            return
+        yield first
+        try:
+            async for piece in winner.iterator:
+                yield piece
+        except Exception:
+            winner.health.record_failure()
+            raise
+        finally:
+            await _aclose(winner.iterator)
+        winner.health.record_success(time.perf_counter() - winner.started, ttft=ttft)
+
+    def stats(self) -> dict:
+        names = [p.name for p in self.registry.resolve_order()]
+        return {name: self.health(name).snapshot() for name in names}
+
+
+class _Attempt:
+    """One provider stream being started: its iterator and first-token task."""
+
+    def __init__(self, provider: LLMProvider, health: ProviderHealth, iterator):
+        self.provider = provider
+        self.health = health
+        self.iterator = iterator
+        self.started = time.perf_counter()
+        self.task = asyncio.ensure_future(iterator.__anext__())
+
+    async def cancel(self) -> None:
+        if not self.task.done():
+            self.task.cancel()
+        try:
+            await self.task
+        except (asyncio.CancelledError, Exception) as exc:
+            current = asyncio.current_task()
+            if isinstance(exc, asyncio.CancelledError) and current is not None and current.cancelling():
+                raise  # the caller itself is being cancelled
+            logger.debug(f"LLM {self.provider.name} attempt cancelled ({exc!r})")
+        await _aclose(self.iterator)
+
+
+async def _aclose(iterator) -> None:
+    aclose = getattr(iterator, "aclose", None)
+    if aclose:
+        try:
+            await aclose()
+        except Exception:
+            pass
+
+
+# ---------------------------------------------------------------------------
+# Singleton instance — import this everywhere
+# ---------------------------------------------------------------------------
+llm_router = LLMRouter(llm_providers)
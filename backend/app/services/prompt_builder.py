@@ -0,0 +1,259 @@
+"""
+Prompt Builder — Arunachala Backend
+===================================
+Compiles the chatbot / quiz system prompts once per
+(AgentConfig version, language, mode) instead of on every request.
+
+A compiled prompt is split in two:
+
+    prefix   → every static instruction (tone, length, emojis, focus, URL
+               rules, quiz structure...). Byte-identical across requests
+               with the same config and language, so provider-side prompt
+               caching (e.g. OpenAI cached input tokens) can hit.
+    dynamic  → only the inventory and the retrieved web context, appended
+               after the prefix per request.
+
+Compiled prompts are kept per worker and re-built when the AgentConfig
+version changes (see `update_agent_config`) or after PROMPT_CACHE_TTL.
+
+Usage:
+    from app.services.prompt_builder import prompt_builder
+
+    compiled = await prompt_builder.get(db, config_version, "es", is_quiz=False)
+    system_prompt = compiled.render(inventory_summary, context_text)
+    preferred = compiled.preferred_model
+"""
+
+import os
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.redis_cache import cache, key_agent_config, TTL_CONFIG
+from app.models.models import AgentConfig
+
+PROMPT_CACHE_TTL  = int(os.getenv("PROMPT_CACHE_TTL", TTL_CONFIG))  # seconds, bounds staleness without Redis
+PROMPT_CACHE_SIZE = int(os.getenv("PROMPT_CACHE_SIZE", 64))         # compiled prompts per worker
+
+DEFAULT_AGENT_CONFIG = {
+    "tone": "Asistente Amable",
+    "response_length": "balanced",
+    "emoji_style": "moderate",
+    "focus_area": "info",
+    "system_instructions": "",
+    "quiz_model": None,
+    "chatbot_model": None,
+}
+
+LENGTH_INSTRUCTIONS = {
+    "concise": "Tus respuestas deben ser breves, directas y al grano (máximo 2-3 frases).",
+    "balanced": "Tus respuestas deben ser equilibradas, ni muy cortas ni muy largas.",
+    "detailed": "Tus respuestas deben ser explicativas, detalladas y ricas en información."
+}
+
+EMOJI_INSTRUCTIONS = {
+    "none": "NO uses ningún emoji en tu respuesta. Solo texto plano.",
+    "moderate": "Usa uno o dos emojis como máximo para dar calidez.",
+    "high": "Usa emojis de forma alegre y frecuente para decorar tu mensaje."
+}
+
+FOCUS_INSTRUCTIONS = {
+    "info": "INFORMAR y resolver dudas con precisión.",
+    "booking": "PERSUADIR al usuario para que reserve una clase o terapia.",
+    "coaching": "Actuar como un COACH de bienestar, dando consejos y motivando."
+}
+
+# Map language codes
+LANGUAGE_NAMES = {
+    "es": "Español",
+    "en": "English",
+    "ca": "Català (Catalán)",
+    "fr": "Français",
+    "de": "Deutsch"
+}
+
+# Multi-language headers for the quiz
+QUIZ_HEADERS = {
+    "Español": {
+        "h1": "Sobre lo que nos has compartido",
+        "h2": "Nuestra propuesta para ti",
+        "h3": "Un recurso para profundizar",
+        "h4": "Un pequeño apoyo para ahora",
+        "btn_more": "Saber más",
+        "btn_content": "Ver ahora"
+    },
+    "English": {
+        "h1": "About what you shared",
+        "h2": "Our proposal for you",
+        "h3": "A resource to deepen",
+        "h4": "A little support for now",
+        "btn_more": "Learn more",
+        "btn_content": "See now"
+    },
+    "Català (Catalán)": {
+        "h1": "Sobre el que ens has compartit",
+        "h2": "La nostra proposta per a tu",
+        "h3": "Un recurs per aprofundir",
+        "h4": "Un petit suport per ara",
+        "btn_more": "Saber-ne més",
+        "btn_content": "Veure ara"
+    }
+}
+
+
+def focus_instruction(focus: Optional[str]) -> str:
+    """Focus area logic (multi-select, comma separated)."""
+    parts = []
+    for f in (focus.split(',') if focus else []):
+        clean_f = f.strip()
+        if clean_f in FOCUS_INSTRUCTIONS:
+            parts.append(FOCUS_INSTRUCTIONS[clean_f])
+        else:
+            parts.append(f"Centrarse en: {clean_f}")
+    return "Tus objetivos son: " + " Y TAMBIÉN ".join(parts) + "."
+
+
+class CompiledPrompt:
+    """Static system-prompt prefix + the per-request dynamic tail."""
+
+    def __init__(self, prefix: str, is_quiz: bool, preferred_model: Optional[str]):
+        self.prefix = prefix
+        self.is_quiz = is_quiz
+        self.preferred_model = preferred_model
+        self.compiled_at = time.monotonic()
+
+    def render(self, inventory_summary: str, context_text: str = "") -> str:
+        if self.is_quiz:
+            return f"{self.prefix}\nINVENTARIO REAL:\n{inventory_summary}\n"
+        return (
+            f"{self.prefix}\n"
+            f"INVENTARIO (Cantidades REALES):\n{inventory_summary}\n"
+            f"(Usa esto si preguntan \"cuántos hay\").\n\n"
+            f"CONTEXTO WEB:\n{context_text}\n"
+        )
+
+
+def compile_chat_prefix(config: dict, target_lang: str) -> str:
+    extra_instructions = config.get("system_instructions") or ""
+    return f"""Eres Arunachala Bot, asistente de 'Arunachala Yoga y Terapias' en Cornellà.
+
+CONFIGURACIÓN DE RESPUESTA:
+ - IDIOMA: {target_lang}. (Si el usuario habla otro idioma, TRADUCE TODO el contenido al idioma del usuario).
+ - SALUDO: Apropiado en {target_lang} (ej: 'Namasté').
+ - TONO: {config.get("tone")} / {LENGTH_INSTRUCTIONS.get(config.get("response_length"), "")}
+ - EMOJIS: {EMOJI_INSTRUCTIONS.get(config.get("emoji_style"), "")}
+ - OBJETIVO: {focus_instruction(config.get("focus_area"))}
+
+INSTRUCCIONES EXTRA:
+{extra_instructions}
+
+REGLAS DE URLS:
+ - NUNCA muestres la URL en texto plano literal como "(URL: /ruta)".
+ - OBLIGATORIO: Si mencionas un artículo, terapia o servicio con ruta, hazlo SIEMPRE en formato Markdown: [Nombre de la terapia](/ruta)
+ - Yoga: /clases-de-yoga (SIEMPRE).
+ - Masaje: /terapias/masajes?item=SLUG
+ - Terapia Holística: /terapias/terapias-holisticas?item=SLUG
+ - Blog/Artículos: /blog/SLUG
+ - Meditación: /meditaciones/SLUG
+ - Actividades/Eventos: /actividades?activity=ID
+
+PROHIBIDO USAR URLs COMPLETAS: Usa solo rutas relativas (ej: /blog/mi-slug). NUNCA escribas "http://...".
+
+DIRECTRICES:
+ - Responde dudas usando el CONTEXTO WEB.
+ - Si el contexto está en otro idioma, TRADÚCELO al {target_lang}.
+ - Sé preciso con horarios/precios del contexto.
+ - Si no sabes, usa conocimiento general de yoga/bienestar (prioriza el centro).
+ - NUNCA cites textualmente en un idioma distinto al del usuario. Traduce las citas.
+ - NO mezcles idiomas (salvo nombres propios/sánscrito).
+ - NO digas "según el documento". Integra la info.
+"""
+
+
+def compile_quiz_prefix(target_lang: str) -> str:
+    h = QUIZ_HEADERS.get(target_lang, QUIZ_HEADERS["Español"])
+    return f"""Eres un terapeuta experto y compasivo del centro 'Arunachala'.
+Analiza el cuestionario para ofrecer una hoja de ruta de bienestar personalizada.
+RESPONDE SIEMPRE EN EL IDIOMA: {target_lang}.
+
+VARIEDAD (REGLA DE ORO): Tienes libertad para elegir entre todo el INVENTARIO REAL. No te limites siempre a los mismos items. Rota entre diferentes meditaciones, artículos y clases según el matiz de las respuestas del usuario.
+
+ESTRUCTURA DE RESPUESTA OBLIGATORIA (Usa exactamente estos 4 títulos en negrita en {target_lang}. PROHIBIDO TOTALMENTE añadir ":" o "." o cualquier signo de puntuación inmediatamente tras el título o el cierre de las negritas):
+
+**{h['h1']}**
+[Un párrafo humano y cercano analizando su situación].
+
+PASO 1: Piensa y escribe una explicación personalizada (2-3 frases) conectando con el usuario.
+PASO 2: En la línea siguiente, escribe EL BOTÓN con la URL EXACTA que copiaste del inventario.
+
+EJEMPLO DE YOGA CORRECTO:
+**{h['h2']}**
+Te recomiendo probar nuestras clases de Hatha Yoga para equilibrar tu energía. Son ideales para reconectar con tu cuerpo y calmar la mente.
+[[BUTTON:{h['btn_more']}|/clases-de-yoga]]
+
+EJEMPLO DE MEDITACIÓN CORRECTO:
+**{h['h3']}**
+Esta meditación guiada "Paz Interior" te ayudará a soltar la tensión acumulada. Escúchala antes de dormir para un descanso reparador.
+[[BUTTON:{h['btn_content']}|/meditaciones/paz-interior]]
+
+REGLAS CRÍTICAS:
+1. SIEMPRE escribe la explicación antes del botón.
+2. NUNCA inventes URLs. Usa SOLO las que ves en el inventario.
+3. SI ES YOGA -> IMPORTANTE: La URL SIEMPRE es /clases-de-yoga (sin nada más).
+4. SI ES BLOG -> /blog/slug-real
+5. SI ES TERAPIA -> /terapias/terapias-holisticas?item=slug-real
+
+IDIOMA: Responde íntegramente en {target_lang}.
+"""
+
+
+def compile_prompt(config: dict, lang: str, is_quiz: bool) -> CompiledPrompt:
+    target_lang = LANGUAGE_NAMES.get(lang, "Español")
+    if is_quiz:
+        return CompiledPrompt(compile_quiz_prefix(target_lang), True, config.get("quiz_model"))
+    return CompiledPrompt(compile_chat_prefix(config, target_lang), False, config.get("chatbot_model"))
+
+
+async def load_agent_config(db: Session) -> dict:
+    """AgentConfig as a dict (Redis first, then DB), with defaults for missing values."""
+    config = await cache.get(key_agent_config())
+    if not config:
+        row = db.query(AgentConfig).first()
+        config = {key: getattr(row, key, None) for key in DEFAULT_AGENT_CONFIG} if row else {}
+    merged = dict(DEFAULT_AGENT_CONFIG)
+    merged.update({key: value for key, value in config.items() if value is not None})
+    return merged
+
+
+class PromptBuilder:
+    """Per-worker LRU of compiled prompts keyed by (config version, lang, mode)."""
+
+    def __init__(self, max_entries: int = PROMPT_CACHE_SIZE, ttl: int = PROMPT_CACHE_TTL):
+        self._compiled: "OrderedDict[Tuple[int, str, bool], CompiledPrompt]" = OrderedDict()
+        self._max_entries = max_entries
+        self._ttl = ttl
+
+    async def get(self, db: Session, config_version: int, lang: str, is_quiz: bool) -> CompiledPrompt:
+        key = (config_version, lang, is_quiz)
+        compiled = self._compiled.get(key)
+        if compiled is not None and time.monotonic() - compiled.compiled_at < self._ttl:
+            self._compiled.move_to_end(key)
+            return compiled
+
+        compiled = compile_prompt(await load_agent_config(db), lang, is_quiz)
+        self._compiled[key] = compiled
+        self._compiled.move_to_end(key)
+        while len(self._compiled) > self._max_entries:
+            self._compiled.popitem(last=False)
+        return compiled
+
+    def clear(self) -> None:
+        self._compiled.clear()
+
+
+# ---------------------------------------------------------------------------
+# Singleton instance — import this everywhere
+# ---------------------------------------------------------------------------
+prompt_builder = PromptBuilder()
@@ -0,0 +1,112 @@
+"""
+Quiz Result Cache — Arunachala Backend
+======================================
+Caches the wellness-quiz roadmap per answer profile.
+
+The quiz (`WellnessQuiz.tsx`) sends its path as "P: <pregunta> R: <respuesta>"
+lines. Those lines are parsed into a canonical answer vector (normalized
+question/answer pairs), so every user who walks the same path in the same
+language maps to the same Redis key:
+
+    quiz:{lang}:{inventory version}:{AgentConfig version}:{answers digest}
+
+Bumping either version (content change, AgentConfig update) makes older
+roadmaps unreachable. Each key stores up to QUIZ_CACHE_VARIANTS roadmaps:
+until that many exist a miss is reported (and the new answer appended),
+afterwards one of them is returned at random for some variety.
+
+Usage:
+    from app.services.quiz_cache import quiz_cache
+
+    roadmap = await quiz_cache.lookup(prompt, "es", inv_version, cfg_version)
+    await quiz_cache.store(prompt, "es", inv_version, cfg_version, roadmap)
+"""
+
+import os
+import re
+import random
+import hashlib
+import logging
+from typing import List, Optional, Tuple
+
+from app.core.redis_cache import cache, key_quiz, TTL_QUIZ
+
+logger = logging.getLogger(__name__)
+
+QUIZ_CACHE_ENABLED  = os.getenv("QUIZ_CACHE_ENABLED", "true").lower() == "true"
+QUIZ_CACHE_VARIANTS = int(os.getenv("QUIZ_CACHE_VARIANTS", 1))  # roadmaps kept per profile
+
+_ANSWER_LINE = re.compile(r"^\s*P:\s*(.*?)\s+R:\s*(.*?)\s*$")
+_PUNCTUATION_EDGES = "¿?¡!.,;: \"'"
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", text or "").strip().casefold().strip(_PUNCTUATION_EDGES)
+
+
+def answer_vector(prompt: str) -> Optional[Tuple[Tuple[str, str], ...]]:
+    """Canonical (question, answer) pairs of a quiz prompt, or None if it has none."""
+    pairs = []
+    for line in (prompt or "").splitlines():
+        match = _ANSWER_LINE.match(line)
+        if match:
+            pairs.append((_normalize(match.group(1)), _normalize(match.group(2))))
+    return tuple(pairs) or None
+
+
+class QuizCache:
+    """Redis-backed roadmap cache keyed by canonical quiz answers."""
+
+    def __init__(self, variants: int = QUIZ_CACHE_VARIANTS, enabled: bool = QUIZ_CACHE_ENABLED):
+        self.variants = max(1, variants)
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, prompt: str, lang: str, inventory_version: int, config_version: int) -> Optional[str]:
+        vector = answer_vector(prompt)
+        if vector is None:
+            return None
+        digest = hashlib.sha1(repr(vector).encode("utf-8")).hexdigest()
+        return key_quiz(lang, inventory_version, config_version, digest)
+
+    async def _variants(self, key: str) -> List[str]:
+        stored = await cache.get(key)
+        return stored if isinstance(stored, list) else []
+
+    async def lookup(self, prompt: str, lang: str, inventory_version: int, config_version: int) -> Optional[str]:
+        """A cached roadmap once the profile has all its variants, else None."""
+        key = self._key(prompt, lang, inventory_version, config_version) if self.enabled else None
+        if key is None:
+            return None
+        variants = await self._variants(key)
+        if len(variants) < self.variants:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return random.choice(variants)
+
+    async def store(self, prompt: str, lang: str, inventory_version: int, config_version: int, roadmap: str) -> None:
+        key = self._key(prompt, lang, inventory_version, config_version) if self.enabled else None
+        if key is None or not roadmap:
+            return
+        variants = await self._variants(key)
+        if roadmap not in variants:
+            variants = (variants + [roadmap])[-self.variants:]
+        await cache.set(key, variants, ttl=TTL_QUIZ)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "variants": self.variants,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+# ---------------------------------------------------------------------------
+# Singleton instance — import this everywhere
+# ---------------------------------------------------------------------------
+quiz_cache = QuizCache()
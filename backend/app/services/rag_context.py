@@ -0,0 +1,134 @@
+"""
+RAG Context Builder — Arunachala Backend
+========================================
+Turns Qdrant search results into the `CONTEXTO WEB` block of the chatbot
+prompt.
+
+Instead of keeping a single document cut at 1500 characters, the builder:
+    1. takes the top-k candidates returned by Qdrant,
+    2. keeps only the best-scoring chunk of each entity,
+    3. drops candidates scoring far below the best one,
+    4. packs documents in score order until the token budget is used,
+       truncating the last one when worthwhile.
+
+Token counts come from a local character-based estimate — the model is
+never called just to count tokens.
+
+Usage:
+    from app.services.rag_context import build_context
+
+    context_text = build_context(search_results, token_budget=1200)
+"""
+
+import os
+import math
+from typing import Any, List, Optional
+
+RAG_TOP_K               = int(os.getenv("RAG_TOP_K", 8))                     # candidates fetched from Qdrant
+RAG_CONTEXT_TOKEN_BUDGET = int(os.getenv("RAG_CONTEXT_TOKEN_BUDGET", 1200))  # tokens for CONTEXTO WEB
+RAG_MIN_SCORE           = float(os.getenv("RAG_MIN_SCORE", 0.2))             # absolute cosine floor
+RAG_RELATIVE_CUTOFF     = float(os.getenv("RAG_RELATIVE_CUTOFF", 0.75))      # keep docs >= 75% of best score
+RAG_MIN_TRUNCATED_TOKENS = 80                                                # don't add tiny fragments
+
+# Spanish/Catalan prose averages ~3.6 characters per BPE token
+CHARS_PER_TOKEN = 3.6
+
+TRUNCATION_MARK = "... (contenido truncado)"
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap, slightly pessimistic token estimate."""
+    if not text:
+        return 0
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _truncate_to_tokens(text: str, max_tokens: int) -> str:
+    max_chars = int(max_tokens * CHARS_PER_TOKEN) - len(TRUNCATION_MARK)
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max(max_chars, 0)]
+    # Prefer cutting at a word boundary
+    space = cut.rfind(" ")
+    if space > max_chars * 0.8:
+        cut = cut[:space]
+    return cut + TRUNCATION_MARK
+
+
+class ContextDocument:
+    """Normalized view of one search hit."""
+
+    def __init__(self, result: Any):
+        payload = getattr(result, "payload", None) or {}
+        meta = payload.get("metadata", {}) or {}
+
+        self.score: float = getattr(result, "score", None) or 0.0
+        self.title = payload.get("title") or meta.get("title") or meta.get("name") or "Sin Título"
+        self.content = payload.get("content", "") or payload.get("description") or meta.get("description", "") or ""
+        self.type = payload.get("type") or meta.get("type") or "general"
+        self.tags = payload.get("tags") or meta.get("tags") or ""
+        self.source = payload.get("source", "unknown")
+
+        entity_id = payload.get("entity_id") or payload.get("id") or meta.get("id") or payload.get("slug")
+        self.entity_key = (self.type, str(entity_id) if entity_id is not None else self.title)
+
+    def render(self, content: Optional[str] = None) -> str:
+        tags_str = f"ETIQUETAS: {self.tags}\n" if self.tags else ""
+        return f"""
+--- DOCUMENTO ENCONTRADO ({self.type}) ---
+TÍTULO: {self.title}
+{tags_str}CONTENIDO:
+{self.content if content is None else content}
+--------------------------------------
+"""
+
+
+def select_documents(search_results: List[Any], score_cutoffs: bool = True) -> List[ContextDocument]:
+    """
+    Dedupe by entity and drop low-scoring candidates, best first.
+    `score_cutoffs=False` keeps every entity (results already filtered and
+    re-scored, e.g. by rank fusion).
+    """
+    best_by_entity = {}
+    for res in search_results or []:
+        doc = ContextDocument(res)
+        if not doc.content.strip():
+            continue
+        current = best_by_entity.get(doc.entity_key)
+        if current is None or doc.score > current.score:
+            best_by_entity[doc.entity_key] = doc
+
+    docs = sorted(best_by_entity.values(), key=lambda d: d.score, reverse=True)
+    if not docs:
+        return []
+
+    top = docs[0].score
+    if top <= 0 or not score_cutoffs:
+        # Results without scores (e.g. scroll) — keep input order
+        return docs
+    return [d for d in docs if d.score >= RAG_MIN_SCORE and d.score >= top * RAG_RELATIVE_CUTOFF]
+
+
+def build_context(search_results: List[Any], token_budget: int = RAG_CONTEXT_TOKEN_BUDGET, score_cutoffs: bool = True) -> str:
+    """Pack as many relevant documents as fit in `token_budget` tokens."""
+    parts = []
+    remaining = token_budget
+
+    for doc in select_documents(search_results, score_cutoffs):
+        block = doc.render()
+        cost = estimate_tokens(block)
+        if cost <= remaining:
+            parts.append(block)
+            remaining -= cost
+            continue
+
+        # Doesn't fit whole: truncate if there is meaningful room left
+        overhead = estimate_tokens(doc.render(content=""))
+        room = remaining - overhead
+        if room >= RAG_MIN_TRUNCATED_TOKENS:
+            block = doc.render(content=_truncate_to_tokens(doc.content, room))
+            parts.append(block)
+            remaining -= estimate_tokens(block)
+        # Smaller, lower-ranked documents may still fit — keep trying
+
+    return "\n".join(parts)
@@ -0,0 +1,155 @@
+"""
+Semantic Response Cache — Arunachala Backend
+============================================
+Reuses chatbot answers for near-duplicate questions.
+
+Entries live in per-worker buckets keyed by
+(language, AgentConfig version, inventory version). Inside a bucket a
+new question is answered from the cache when the cosine distance between
+its embedding and a cached question's embedding is below
+SEMANTIC_CACHE_MAX_DISTANCE.
+
+Because both version counters are part of the bucket key, bumping them
+(see `RedisCache.bump_version`) makes every older answer unreachable in
+all workers; `notify_n8n_content_change` also clears the local buckets so
+stale prices and schedules are never served.
+
+Usage:
+    from app.services.semantic_cache import semantic_cache
+
+    answer = semantic_cache.lookup(vector, "es", cfg_version, inv_version)
+    semantic_cache.store(vector, "es", cfg_version, inv_version, answer)
+"""
+
+import os
+import time
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SEMANTIC_CACHE_ENABLED      = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+SEMANTIC_CACHE_MAX_DISTANCE = float(os.getenv("SEMANTIC_CACHE_MAX_DISTANCE", 0.08))  # cosine distance
+SEMANTIC_CACHE_TTL          = int(os.getenv("SEMANTIC_CACHE_TTL", 3600))              # 1 hour
+SEMANTIC_CACHE_SIZE         = int(os.getenv("SEMANTIC_CACHE_SIZE", 500))              # entries per bucket
+
+BucketKey = Tuple[str, int, int]
+
+
+class _Bucket:
+    """Bounded LRU of (unit vector, answer, stored_at) with a lazily stacked matrix."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[int, Tuple[np.ndarray, str, float]]" = OrderedDict()
+        self._next_id = 0
+        self._matrix: Optional[np.ndarray] = None
+        self._ids: List[int] = []
+
+    def _invalidate_matrix(self) -> None:
+        self._matrix = None
+
+    def purge_expired(self, ttl: int, now: float) -> None:
+        expired = [eid for eid, (_, _, stored_at) in self.entries.items() if now - stored_at > ttl]
+        for eid in expired:
+            del self.entries[eid]
+        if expired:
+            self._invalidate_matrix()
+
+    def nearest(self, unit: np.ndarray) -> Tuple[Optional[int], float]:
+        if not self.entries:
+            return None, 0.0
+        if self._matrix is None:
+            self._ids = list(self.entries.keys())
+            self._matrix = np.stack([self.entries[eid][0] for eid in self._ids])
+        scores = self._matrix @ unit
+        best = int(np.argmax(scores))
+        return self._ids[best], float(scores[best])
+
+    def add(self, unit: np.ndarray, answer: str, now: float) -> None:
+        self.entries[self._next_id] = (unit, answer, now)
+        self._next_id += 1
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        self._invalidate_matrix()
+
+
+class SemanticCache:
+    """Embedding-keyed answer cache with TTL and size-bounded LRU eviction."""
+
+    def __init__(
+        self,
+        max_distance: float = SEMANTIC_CACHE_MAX_DISTANCE,
+        ttl: int = SEMANTIC_CACHE_TTL,
+        max_entries: int = SEMANTIC_CACHE_SIZE,
+        enabled: bool = SEMANTIC_CACHE_ENABLED,
+    ):
+        self.max_distance = max_distance
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._buckets: Dict[BucketKey, _Bucket] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _unit(vector: List[float]) -> Optional[np.ndarray]:
+        arr = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(arr))
+        return arr / norm if norm else None
+
+    def lookup(self, vector: List[float], language: str, config_version: int, inventory_version: int) -> Optional[str]:
+        """Return a cached answer for a semantically equivalent question, if any."""
+        if not self.enabled or vector is None:
+            return None
+        bucket = self._buckets.get((language, config_version, inventory_version))
+        unit = self._unit(vector)
+        if bucket is None or unit is None:
+            self.misses += 1
+            return None
+
+        bucket.purge_expired(self.ttl, time.time())
+        entry_id, similarity = bucket.nearest(unit)
+        if entry_id is None or (1.0 - similarity) > self.max_distance:
+            self.misses += 1
+            return None
+
+        bucket.entries.move_to_end(entry_id)
+        self.hits += 1
+        return bucket.entries[entry_id][1]
+
+    def store(self, vector: List[float], language: str, config_version: int, inventory_version: int, answer: str) -> None:
+        if not self.enabled or vector is None or not answer:
+            return
+        unit = self._unit(vector)
+        if unit is None:
+            return
+
+        key = (language, config_version, inventory_version)
+        # Buckets for older versions of the same language can never be hit again
+        for stale in [k for k in self._buckets if k[0] == language and k != key]:
+            del self._buckets[stale]
+
+        bucket = self._buckets.setdefault(key, _Bucket(self.max_entries))
+        bucket.add(unit, answer, time.time())
+
+    def invalidate(self) -> None:
+        """Drop every cached answer in this worker."""
+        self._buckets.clear()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": sum(len(b.entries) for b in self._buckets.values()),
+        }
+
+
+# ---------------------------------------------------------------------------
+# Singleton instance — import this everywhere
+# ---------------------------------------------------------------------------
+semantic_cache = SemanticCache()
@@ -0,0 +1,152 @@
+"""
+Request Coalescing (single-flight) — Arunachala Backend
+=======================================================
+Identical chat/quiz requests that arrive while one is already being
+answered share that single upstream generation (retrieval + LLM call)
+instead of starting their own.
+
+    * Streaming: the leader's SSE chunks are buffered and fanned out to
+      every subscriber; late joiners first receive what was already sent.
+      The generation runs in its own task, so it survives the leader's
+      client disconnecting and is cancelled only when nobody listens.
+    * Non-streaming: callers await the same shared future.
+
+Flights are dropped as soon as they finish — this only coalesces
+*concurrent* requests, it is not a response cache.
+
+Usage:
+    from app.services.single_flight import single_flight
+
+    key = single_flight.make_key(lang, messages, is_quiz, stream, config_version)
+    return StreamingResponse(single_flight.stream(key, produce_sse), media_type="text/event-stream")
+    return await single_flight.run(key, produce_response)
+"""
+
+import json
+import asyncio
+import hashlib
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    """Buffered chunk stream shared by every subscriber of one request key."""
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def _notify(self) -> None:
+        # Wake current waiters and arm a fresh event for the next chunk
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def publish(self, chunk: str) -> None:
+        self.chunks.append(chunk)
+        self._notify()
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        self.done = True
+        self.error = error
+        self._notify()
+
+    async def subscribe(self) -> AsyncIterator[str]:
+        self.subscribers += 1
+        position = 0
+        try:
+            while True:
+                while position < len(self.chunks):
+                    yield self.chunks[position]
+                    position += 1
+                if self.done:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                await self._changed.wait()
+        finally:
+            self.subscribers -= 1
+            if self.subscribers == 0 and not self.done and self.task:
+                self.task.cancel()
+
+
+class SingleFlight:
+    """Registry of in-flight generations keyed by normalized request."""
+
+    def __init__(self):
+        self._streams: Dict[str, _Flight] = {}
+        self._results: Dict[str, asyncio.Future] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def stream(self, key: str, factory: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """Join the flight for `key`, starting `factory()` if there is none."""
+        flight = self._streams.get(key)
+        # A flight whose last listener left is being cancelled; start a new one
+        if flight is None or flight.task.cancelling():
+            flight = _Flight()
+            self._streams[key] = flight
+            flight.task = asyncio.create_task(self._pump(key, flight, factory()))
+            self.leaders += 1
+        else:
+            self.followers += 1
+            print(f"🔗 Coalesced streaming request onto in-flight generation ({flight.subscribers} listening)")
+        return flight.subscribe()
+
+    async def _pump(self, key: str, flight: _Flight, source: AsyncIterator[str]) -> None:
+        error: Optional[BaseException] = None
+        try:
+            async for chunk in source:
+                flight.publish(chunk)
+        except asyncio.CancelledError:
+            error = ConnectionAbortedError("generation cancelled")
+        except Exception as exc:
+            logger.warning(f"Single-flight generation failed: {exc}")
+            error = exc
+        finally:
+            aclose = getattr(source, "aclose", None)
+            if aclose:
+                try:
+                    await aclose()
+                except Exception:
+                    pass
+            if self._streams.get(key) is flight:
+                del self._streams[key]
+            flight.finish(error)
+
+    async def run(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Await the shared result for `key`, starting `factory()` if needed."""
+        future = self._results.get(key)
+        if future is None:
+            future = asyncio.ensure_future(factory())
+            self._results[key] = future
+            future.add_done_callback(lambda f: self._results.pop(key, None) if self._results.get(key) is f else None)
+            self.leaders += 1
+        else:
+            self.followers += 1
+            print("🔗 Coalesced request onto in-flight generation")
+        # One caller disconnecting must not cancel the generation for the others
+        return await asyncio.shield(future)
+
+    def stats(self) -> dict:
+        return {
+            "leaders": self.leaders,
+            "followers": self.followers,
+            "in_flight": len(self._streams) + len(self._results),
+        }
+
+
+# ---------------------------------------------------------------------------
+# Singleton instance — import this everywhere
+# ---------------------------------------------------------------------------
+single_flight = SingleFlight()
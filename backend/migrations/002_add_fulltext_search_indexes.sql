@@ -0,0 +1,78 @@
+-- ============================================================================
+-- Migration: Full-text search indexes for hybrid (lexical + vector) retrieval
+-- Description: GIN indexes over the tsvector expressions used by
+--              app/services/hybrid_search.py (one per table and language).
+--              The expressions must stay identical to `document_expression`.
+-- Date: 2026-10-17
+-- ============================================================================
+
+-- ============================================================================
+-- PART 1: Catalan text search configuration
+-- ============================================================================
+-- PostgreSQL >= 16 ships a Catalan stemmer; older servers fall back to 'simple'
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'arunachala_ca') THEN
+        IF EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'catalan') THEN
+            CREATE TEXT SEARCH CONFIGURATION arunachala_ca (COPY = pg_catalog.catalan);
+        ELSE
+            CREATE TEXT SEARCH CONFIGURATION arunachala_ca (COPY = pg_catalog.simple);
+        END IF;
+    END IF;
+END $$;
+
+
+-- ============================================================================
+-- PART 2: contents
+-- ============================================================================
+CREATE INDEX IF NOT EXISTS idx_contents_fts_es ON contents
+    USING GIN (to_tsvector('spanish'::regconfig, coalesce(title, '') || ' ' || coalesce(excerpt, '') || ' ' || coalesce(body, '')));
+CREATE INDEX IF NOT EXISTS idx_contents_fts_ca ON contents
+    USING GIN (to_tsvector('arunachala_ca'::regconfig, coalesce(title, '') || ' ' || coalesce(excerpt, '') || ' ' || coalesce(body, '') || ' ' || coalesce(translations->'ca'->>'title', '') || ' ' || coalesce(translations->'ca'->>'excerpt', '') || ' ' || coalesce(translations->'ca'->>'body', '')));
+CREATE INDEX IF NOT EXISTS idx_contents_fts_en ON contents
+    USING GIN (to_tsvector('english'::regconfig, coalesce(title, '') || ' ' || coalesce(excerpt, '') || ' ' || coalesce(body, '') || ' ' || coalesce(translations->'en'->>'title', '') || ' ' || coalesce(translations->'en'->>'excerpt', '') || ' ' || coalesce(translations->'en'->>'body', '')));
+
+-- ============================================================================
+-- PART 3: yoga_classes
+-- ============================================================================
+CREATE INDEX IF NOT EXISTS idx_yoga_classes_fts_es ON yoga_classes
+    USING GIN (to_tsvector('spanish'::regconfig, coalesce(name, '') || ' ' || coalesce(description, '')));
+CREATE INDEX IF NOT EXISTS idx_yoga_classes_fts_ca ON yoga_classes
+    USING GIN (to_tsvector('arunachala_ca'::regconfig, coalesce(name, '') || ' ' || coalesce(description, '') || ' ' || coalesce(translations->'ca'->>'name', '') || ' ' || coalesce(translations->'ca'->>'description', '')));
+CREATE INDEX IF NOT EXISTS idx_yoga_classes_fts_en ON yoga_classes
+    USING GIN (to_tsvector('english'::regconfig, coalesce(name, '') || ' ' || coalesce(description, '') || ' ' || coalesce(translations->'en'->>'name', '') || ' ' || coalesce(translations->'en'->>'description', '')));
+
+-- ============================================================================
+-- PART 4: massage_types
+-- ============================================================================
+CREATE INDEX IF NOT EXISTS idx_massage_fts_es ON massage_types
+    USING GIN (to_tsvector('spanish'::regconfig, coalesce(name, '') || ' ' || coalesce(excerpt, '') || ' ' || coalesce(description, '') || ' ' || coalesce(benefits, '')));
+CREATE INDEX IF NOT EXISTS idx_massage_fts_ca ON massage_types
+    USING GIN (to_tsvector('arunachala_ca'::regconfig, coalesce(name, '') || ' ' || coalesce(excerpt, '') || ' ' || coalesce(description, '') || ' ' || coalesce(benefits, '') || ' ' || coalesce(translations->'ca'->>'name', '') || ' ' || coalesce(translations->'ca'->>'excerpt', '') || ' ' || coalesce(translations->'ca'->>'description', '') || ' ' || coalesce(translations->'ca'->>'benefits', '')));
+CREATE INDEX IF NOT EXISTS idx_massage_fts_en ON massage_types
+    USING GIN (to_tsvector('english'::regconfig, coalesce(name, '') || ' ' || coalesce(excerpt, '') || ' ' || coalesce(description, '') || ' ' || coalesce(benefits, '') || ' ' || coalesce(translations->'en'->>'name', '') || ' ' || coalesce(translations->'en'->>'excerpt', '') || ' ' || coalesce(translations->'en'->>'description', '') || ' ' || coalesce(translations->'en'->>'benefits', '')));
+
+-- ============================================================================
+-- PART 5: therapy_types
+-- ============================================================================
+CREATE INDEX IF NOT EXISTS idx_therapy_fts_es ON therapy_types
+    USING GIN (to_tsvector('spanish'::regconfig, coalesce(name, '') || ' ' || coalesce(excerpt, '') || ' ' || coalesce(description, '') || ' ' || coalesce(benefits, '')));
+CREATE INDEX IF NOT EXISTS idx_therapy_fts_ca ON therapy_types
+    USING GIN (to_tsvector('arunachala_ca'::regconfig, coalesce(name, '') || ' ' || coalesce(excerpt, '') || ' ' || coalesce(description, '') || ' ' || coalesce(benefits, '') || ' ' || coalesce(translations->'ca'->>'name', '') || ' ' || coalesce(translations->'ca'->>'excerpt', '') || ' ' || coalesce(translations->'ca'->>'description', '') || ' ' || coalesce(translations->'ca'->>'benefits', '')));
+CREATE INDEX IF NOT EXISTS idx_therapy_fts_en ON therapy_types
+    USING GIN (to_tsvector('english'::regconfig, coalesce(name, '') || ' ' || coalesce(excerpt, '') || ' ' || coalesce(description, '') || ' ' || coalesce(benefits, '') || ' ' || coalesce(translations->'en'->>'name', '') || ' ' || coalesce(translations->'en'->>'excerpt', '') || ' ' || coalesce(translations->'en'->>'description', '') || ' ' || coalesce(translations->'en'->>'benefits', '')));
+
+-- ============================================================================
+-- PART 6: activities
+-- ============================================================================
+CREATE INDEX IF NOT EXISTS idx_activities_fts_es ON activities
+    USING GIN (to_tsvector('spanish'::regconfig, coalesce(title, '') || ' ' || coalesce(description, '') || ' ' || coalesce(location, '')));
+CREATE INDEX IF NOT EXISTS idx_activities_fts_ca ON activities
+    USING GIN (to_tsvector('arunachala_ca'::regconfig, coalesce(title, '') || ' ' || coalesce(description, '') || ' ' || coalesce(location, '') || ' ' || coalesce(translations->'ca'->>'title', '') || ' ' || coalesce(translations->'ca'->>'description', '') || ' ' || coalesce(translations->'ca'->>'location', '')));
+CREATE INDEX IF NOT EXISTS idx_activities_fts_en ON activities
+    USING GIN (to_tsvector('english'::regconfig, coalesce(title, '') || ' ' || coalesce(description, '') || ' ' || coalesce(location, '') || ' ' || coalesce(translations->'en'->>'title', '') || ' ' || coalesce(translations->'en'->>'description', '') || ' ' || coalesce(translations->'en'->>'location', '')));
+
+-- ============================================================================
+-- Verification
+-- ============================================================================
+-- SELECT indexname FROM pg_indexes WHERE indexname LIKE 'idx_%_fts_%';
@@ -0,0 +1,108 @@
+"""
+Tests unitarios para app.services.admission
+"""
+import asyncio
+
+import pytest
+
+from app.services import admission as admission_module
+from app.services.admission import AdmissionRejected, ChatAdmission, degraded_answer
+
+
+@pytest.fixture(autouse=True)
+def no_redis(monkeypatch):
+    async def unavailable(key, rate, burst):
+        return None
+
+    monkeypatch.setattr(admission_module.cache, "take_token", unavailable)
+
+
+class TestRateLimit:
+    """Tests para los token buckets (modo local, sin Redis)."""
+
+    async def test_per_ip_burst(self):
+        """Verifica que una IP agota su ráfaga y las demás no se ven afectadas."""
+        admission = ChatAdmission(ip_rate=0.001, ip_burst=2, global_rate=100, global_burst=100)
+
+        assert await admission.check_rate("1.1.1.1") is None
+        assert await admission.check_rate("1.1.1.1") is None
+        assert await admission.check_rate("1.1.1.1") == "rate_ip"
+        assert await admission.check_rate("2.2.2.2") is None
+
+    async def test_global_limit(self):
+        """Verifica el límite global compartido por todas las IPs."""
+        admission = ChatAdmission(ip_rate=100, ip_burst=100, global_rate=0.001, global_burst=1)
+
+        assert await admission.check_rate("1.1.1.1") is None
+        assert await admission.check_rate("2.2.2.2") == "rate_global"
+        assert admission.stats()["rejected"] == {"rate_global": 1}
+
+    async def test_redis_bucket_is_used_when_available(self, monkeypatch):
+        """Verifica que con Redis disponible manda su decisión."""
+        async def deny(key, rate, burst):
+            return False
+
+        monkeypatch.setattr(admission_module.cache, "take_token", deny)
+        admission = ChatAdmission()
+
+        assert await admission.check_rate("1.1.1.1") == "rate_ip"
+
+
+class TestConcurrency:
+    """Tests para los slots por worker y la cola FIFO acotada."""
+
+    async def test_queue_positions_and_fifo_handoff(self):
+        """Verifica que las peticiones en cola reciben su posición y entran por orden."""
+        admission = ChatAdmission(max_concurrent=1, queue_size=2)
+        first = admission.enter()
+        second = admission.enter()
+        third = admission.enter()
+
+        positions = []
+
+        async def wait(ticket, name):
+            async for position in ticket.wait(timeout=1):
+                positions.append((name, position))
+            return name
+
+        waiting = [asyncio.create_task(wait(second, "second")), asyncio.create_task(wait(third, "third"))]
+        await asyncio.sleep(0)
+        first.release()
+        assert await waiting[0] == "second"
+        await asyncio.sleep(0)
+        second.release()
+        assert await waiting[1] == "third"
+        third.release()
+
+        assert ("second", 1) in positions and ("third", 2) in positions and ("third", 1) in positions
+        assert admission.stats()["active"] == 0
+
+    async def test_queue_full_fails_fast(self):
+        """Verifica que con la cola llena se rechaza sin esperar."""
+        admission = ChatAdmission(max_concurrent=1, queue_size=1)
+        admission.enter()
+        admission.enter()
+
+        with pytest.raises(AdmissionRejected) as exc:
+            admission.enter()
+        assert exc.value.reason == "queue_full"
+
+    async def test_queue_timeout_frees_place(self):
+        """Verifica que una espera demasiado larga abandona la cola."""
+        admission = ChatAdmission(max_concurrent=1, queue_size=1)
+        running = admission.enter()
+        queued = admission.enter()
+
+        with pytest.raises(AdmissionRejected):
+            async for _ in queued.wait(timeout=0.05):
+                pass
+        queued.release()
+
+        assert admission.stats()["queued"] == 0
+        running.release()
+        assert admission.stats()["active"] == 0
+
+    def test_degraded_answer_language(self):
+        """Verifica la respuesta de emergencia por idioma (español por defecto)."""
+        assert "queries" not in degraded_answer("en")
+        assert degraded_answer("fr") == degraded_answer("es")
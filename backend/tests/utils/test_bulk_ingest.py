@@ -0,0 +1,78 @@
+"""
+Tests unitarios para app.services.bulk_ingest
+"""
+import json
+
+from app.services import bulk_ingest as bulk_ingest_module
+from app.services.bulk_ingest import BulkIngestEngine, Checkpoint, IngestItem
+
+
+def make_item(item_id, n_chunks, chunk_chars=10):
+    item = IngestItem("article", item_id, "texto", source="blog")
+    item.chunks = ["x" * chunk_chars] * n_chunks
+    return item
+
+
+class TestCheckpoint:
+    """Tests para el checkpoint de entidades terminadas."""
+
+    def test_mark_persists_and_load_restores(self, tmp_path):
+        """Verifica que las claves marcadas sobreviven a un reinicio."""
+        path = str(tmp_path / "checkpoint.json")
+        Checkpoint(path).mark(["article:1", "massage:2"])
+
+        restored = Checkpoint(path)
+        restored.load()
+
+        assert restored.done == {"article:1", "massage:2"}
+        assert json.loads((tmp_path / "checkpoint.json").read_text())["done"] == ["article:1", "massage:2"]
+        assert not (tmp_path / "checkpoint.json.tmp").exists()  # written atomically
+
+    def test_clear_removes_file(self, tmp_path):
+        """Verifica que clear() vacía el conjunto y borra el fichero."""
+        path = tmp_path / "checkpoint.json"
+        checkpoint = Checkpoint(str(path))
+        checkpoint.mark(["article:1"])
+
+        checkpoint.clear()
+
+        assert checkpoint.done == set()
+        assert not path.exists()
+
+    def test_without_path_keeps_memory_only(self):
+        """Verifica que sin ruta el checkpoint solo vive en memoria."""
+        checkpoint = Checkpoint(None)
+        checkpoint.mark(["article:1"])
+        checkpoint.load()
+
+        assert checkpoint.done == {"article:1"}
+
+
+class TestBatches:
+    """Tests para la agrupación de fragmentos en llamadas de embeddings."""
+
+    def test_batches_respect_chunk_limit(self):
+        """Verifica que ningún lote supera embed_batch_size fragmentos."""
+        engine = BulkIngestEngine(None, None, "test", embed_batch_size=5)
+        items = [make_item(i, 2) for i in range(5)]
+
+        batches = engine._batches(items)
+
+        assert [[item.item_id for item in batch] for batch in batches] == [[0, 1], [2, 3], [4]]
+
+    def test_batches_respect_char_limit(self, monkeypatch):
+        """Verifica que el límite de caracteres también corta el lote."""
+        monkeypatch.setattr(bulk_ingest_module, "EMBED_BATCH_MAX_CHARS", 25)
+        engine = BulkIngestEngine(None, None, "test", embed_batch_size=100)
+
+        batches = engine._batches([make_item(i, 1) for i in range(5)])
+
+        assert [len(batch) for batch in batches] == [2, 2, 1]
+
+    def test_oversize_item_gets_its_own_batch(self):
+        """Verifica que una entidad mayor que el límite no se pierde ni se parte."""
+        engine = BulkIngestEngine(None, None, "test", embed_batch_size=3)
+
+        batches = engine._batches([make_item(0, 1), make_item(1, 7), make_item(2, 1)])
+
+        assert [[item.item_id for item in batch] for batch in batches] == [[0], [1], [2]]
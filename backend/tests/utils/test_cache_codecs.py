@@ -0,0 +1,86 @@
+"""
+Tests unitarios para app.core.cache_codecs
+"""
+import json
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+import pytest
+
+from app.core import cache_codecs
+from app.core.cache_codecs import CodecError, decode_value, encode_value
+
+VALUE = {
+    "title": "Hatha Yoga",
+    "updated_at": datetime(2025, 3, 1, 9, 30, tzinfo=timezone.utc),
+    "day": date(2025, 3, 3),
+    "price": Decimal("45.50"),
+    "items": [{"id": 1, "created": datetime(2024, 12, 31, 23, 59)}],
+}
+
+
+class TestCacheCodecs:
+    """Tests para la serialización de valores de caché."""
+
+    def test_json_round_trips_datetimes(self):
+        """Verifica que fechas y datetimes vuelven con su tipo (sin default=str)."""
+        decoded = decode_value(encode_value(VALUE, codec="json", compression="none"))
+
+        assert decoded["updated_at"] == VALUE["updated_at"]
+        assert decoded["day"] == date(2025, 3, 3)
+        assert decoded["items"][0]["created"] == datetime(2024, 12, 31, 23, 59)
+        assert decoded["price"] == "45.50"  # other objects keep the str() fallback
+
+    def test_header_byte_describes_format(self):
+        """Verifica que el primer byte indica codec y compresión."""
+        raw = encode_value({"a": 1}, codec="json", compression="zlib")
+
+        assert raw[0] == 0x80 | cache_codecs.CODEC_JSON << 3 | cache_codecs.COMPRESSION_NONE  # below threshold
+
+    @pytest.mark.parametrize("compression", ["zlib", "zstd"])
+    def test_large_values_are_compressed(self, compression):
+        """Verifica que los valores grandes se comprimen y se recuperan intactos."""
+        if compression == "zstd" and not cache_codecs.ZSTD_AVAILABLE:
+            pytest.skip("zstandard not installed")
+        inventory = {"text": "YOGA: 12 clases. " * 500}
+
+        raw = encode_value(inventory, codec="json", compression=compression)
+
+        assert raw[0] & 0x07 == cache_codecs.COMPRESSIONS[compression]
+        assert len(raw) < len(json.dumps(inventory)) / 10
+        assert decode_value(raw) == inventory
+
+    def test_legacy_json_values_still_decode(self):
+        """Verifica que los valores escritos antes (json.dumps sin cabecera) se leen."""
+        legacy = json.dumps({"tone": "calm", "n": [1, 2]}, default=str).encode("utf-8")
+
+        assert decode_value(legacy) == {"tone": "calm", "n": [1, 2]}
+
+    def test_msgpack_round_trip(self):
+        """Verifica que msgpack conserva fechas y claves no textuales."""
+        if not cache_codecs.MSGPACK_AVAILABLE:
+            pytest.skip("msgpack not installed")
+        value = {"when": VALUE["updated_at"], 1: b"bytes"}
+
+        assert decode_value(encode_value(value, codec="msgpack")) == value
+
+    def test_unknown_header_raises_codec_error(self):
+        """Verifica que un formato desconocido se rechaza con CodecError."""
+        with pytest.raises(CodecError):
+            decode_value(bytes([0x80 | 7 << 3]) + b"x")
+        with pytest.raises(CodecError):
+            decode_value(bytes([0x80 | cache_codecs.CODEC_JSON << 3 | cache_codecs.COMPRESSION_ZLIB]) + b"bad")
+
+    def test_corrupt_legacy_json_raises_codec_error(self):
+        """Verifica que un JSON antiguo corrupto se rechaza con CodecError (no abre el breaker)."""
+        with pytest.raises(CodecError):
+            decode_value(b'{"tone": "cal')
+
+    def test_legacy_writes_are_plain_json(self, monkeypatch):
+        """Verifica que con CACHE_LEGACY_WRITES los workers antiguos pueden leer lo escrito."""
+        monkeypatch.setattr(cache_codecs, "CACHE_LEGACY_WRITES", True)
+
+        raw = encode_value({"tone": "calm", "day": date(2025, 3, 3)})
+
+        assert json.loads(raw) == {"tone": "calm", "day": "2025-03-03"}
+        assert decode_value(raw) == {"tone": "calm", "day": "2025-03-03"}
@@ -0,0 +1,133 @@
+"""
+Tests unitarios para app.services.chat_sessions
+"""
+import pytest
+
+from app.services import chat_sessions as chat_sessions_module
+from app.services.chat_sessions import ChatSessionStore
+
+
+@pytest.fixture
+def redis_dict(monkeypatch):
+    store = {}
+
+    async def fake_get(key):
+        return store.get(key)
+
+    async def fake_set(key, value, ttl=300):
+        store[key] = value
+        return True
+
+    monkeypatch.setattr(chat_sessions_module.cache, "get", fake_get)
+    monkeypatch.setattr(chat_sessions_module.cache, "set", fake_set)
+    return store
+
+
+def user(text):
+    return {"role": "user", "content": text}
+
+
+def assistant(text):
+    return {"role": "assistant", "content": text}
+
+
+class TestSessionIds:
+    """Tests para la validación de identificadores de sesión."""
+
+    def test_new_ids_are_valid(self):
+        """Verifica que los ids generados pasan la validación."""
+        assert ChatSessionStore.valid_id(ChatSessionStore.new_id())
+
+    def test_rejects_malformed_ids(self):
+        """Verifica que no se aceptan ids que podrían alterar la clave de Redis."""
+        assert not ChatSessionStore.valid_id(None)
+        assert not ChatSessionStore.valid_id("corto")
+        assert not ChatSessionStore.valid_id("a" * 20 + ":*")
+
+
+class TestChatSessionStore:
+    """Tests para el historial en servidor (Redis simulado en memoria)."""
+
+    async def test_new_session_uses_client_history(self, redis_dict):
+        """Verifica que una sesión nueva usa el historial enviado por el cliente."""
+        store = ChatSessionStore(max_turns=4)
+        session = await store.load("s" * 20)
+        messages = [assistant("Namasté"), user("¿Tenéis yoga?")]
+
+        assert store.history(session, messages) == messages
+
+    async def test_existing_session_replaces_client_history(self, redis_dict):
+        """Verifica que con sesión solo se usa el último mensaje del cliente."""
+        store = ChatSessionStore(max_turns=4)
+        session_id = "s" * 20
+        await store.record(session_id, await store.load(session_id), [user("¿Tenéis yoga?")], "Sí, Hatha.")
+
+        session = await store.load(session_id)
+        history = store.history(session, [user("¿A qué hora?")])
+
+        assert history == [user("¿Tenéis yoga?"), assistant("Sí, Hatha."), user("¿A qué hora?")]
+
+    async def test_lost_session_falls_back_to_client_history(self, redis_dict):
+        """Verifica que si la sesión caducó o se expulsó se usa (y se vuelve a guardar) el historial del cliente."""
+        store = ChatSessionStore(max_turns=4)
+        session_id = "s" * 20
+        await store.record(session_id, await store.load(session_id), [user("¿Tenéis yoga?")], "Sí, Hatha.")
+        redis_dict.clear()  # evicted / TTL expired
+        messages = [user("¿Tenéis yoga?"), assistant("Sí, Hatha."), user("¿A qué hora?")]
+
+        session = await store.load(session_id)
+        assert store.history(session, messages) == messages
+
+        await store.record(session_id, session, messages, "A las 10.")
+        assert (await store.load(session_id))["turns"] == messages + [assistant("A las 10.")]
+
+    async def test_summary_is_sent_as_system_message(self, redis_dict):
+        """Verifica que el resumen acumulado precede a los turnos recientes."""
+        store = ChatSessionStore(max_turns=4)
+        session = {"summary": "Busca clases para la espalda.", "turns": [user("hola"), assistant("hola")]}
+
+        history = store.history(session, [user("¿Y masajes?")])
+
+        assert history[0]["role"] == "system"
+        assert "Busca clases para la espalda." in history[0]["content"]
+        assert history[-1] == user("¿Y masajes?")
+
+    async def test_overflow_is_folded_into_summary(self, redis_dict, monkeypatch):
+        """Verifica que los turnos sobrantes se resumen y se eliminan de la sesión."""
+        prompts = []
+
+        async def fake_complete(messages, preferred=None, temperature=0.7):
+            prompts.append(messages[-1]["content"])
+            return "Le interesa el yoga suave."
+
+        monkeypatch.setattr(chat_sessions_module.llm_router, "complete", fake_complete)
+        store = ChatSessionStore(max_turns=2)
+        session_id = "s" * 20
+
+        await store.record(session_id, await store.load(session_id), [user("¿Yoga suave?")], "Sí, Yin.")
+        await store.record(session_id, await store.load(session_id), [user("¿Precio?")], "10€.")
+        for task in list(store._tasks):
+            await task
+
+        session = await store.load(session_id)
+        assert session["summary"] == "Le interesa el yoga suave."
+        assert session["turns"] == [user("¿Precio?"), assistant("10€.")]
+        assert "¿Yoga suave?" in prompts[0]
+
+    async def test_failed_summary_keeps_turns(self, redis_dict, monkeypatch):
+        """Verifica que si falla el resumen no se pierde el historial."""
+        async def failing_complete(messages, preferred=None, temperature=0.7):
+            raise RuntimeError("sin proveedor")
+
+        monkeypatch.setattr(chat_sessions_module.llm_router, "complete", failing_complete)
+        store = ChatSessionStore(max_turns=2)
+        session_id = "s" * 20
+
+        await store.record(session_id, await store.load(session_id), [user("uno")], "a")
+        await store.record(session_id, await store.load(session_id), [user("dos")], "b")
+        for task in list(store._tasks):
+            await task
+
+        session = await store.load(session_id)
+        assert len(session["turns"]) == 4
+        assert store.summary_failures == 1
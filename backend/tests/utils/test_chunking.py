@@ -0,0 +1,98 @@
+"""
+Tests unitarios para app.services.chunking
+"""
+from app.services.chunking import (
+    build_chunk_points,
+    get_chunk_id,
+    get_qdrant_id,
+    html_to_text,
+    indexed_entity_types,
+    reindex_operations,
+    replace_operations,
+    split_into_chunks,
+)
+
+
+class TestChunkIds:
+    """Tests para los IDs deterministas de los fragmentos."""
+
+    def test_first_chunk_keeps_legacy_id(self):
+        """Verifica que el fragmento 0 usa el mismo ID que n8n."""
+        assert get_chunk_id("article", 5, 0) == get_qdrant_id("article", 5)
+
+    def test_chunk_ids_are_stable_and_unique(self):
+        """Verifica que los IDs son reproducibles y distintos por fragmento."""
+        ids = [get_chunk_id("article", 5, n) for n in range(3)]
+
+        assert ids == [get_chunk_id("article", 5, n) for n in range(3)]
+        assert len(set(ids)) == 3
+
+
+class TestSplitIntoChunks:
+    """Tests para la división por encabezados con solapamiento."""
+
+    def test_html_headings_become_sections(self):
+        """Verifica que los <h2> se convierten en encabezados markdown."""
+        assert "## Beneficios" in html_to_text("<h2>Beneficios</h2><p>Relaja</p>")
+
+    def test_short_text_is_single_chunk(self):
+        """Verifica que un texto corto no se divide."""
+        assert split_into_chunks("Texto corto.", title="Título") == ["# Título\n\nTexto corto."]
+
+    def test_long_text_respects_size_and_overlaps(self):
+        """Verifica el tamaño máximo y el solapamiento entre fragmentos."""
+        body = "<h2>Beneficios</h2><p>" + "Respira profundo y suelta. " * 100 + "</p>"
+        chunks = split_into_chunks(body, title="Paz", size=500, overlap=80)
+
+        assert len(chunks) > 1
+        assert all(len(c) <= 500 for c in chunks)
+        assert all(c.startswith("# Paz\n## Beneficios") for c in chunks)
+        # The start of each chunk repeats the end of the previous one
+        previous_tail = chunks[0][-40:]
+        assert previous_tail in chunks[1]
+
+    def test_sections_are_not_mixed(self):
+        """Verifica que un fragmento no cruza encabezados."""
+        chunks = split_into_chunks("<h2>Uno</h2><p>A</p><h2>Dos</h2><p>B</p>")
+
+        assert len(chunks) == 2
+        assert "Dos" not in chunks[0]
+
+
+class TestChunkPoints:
+    """Tests para los puntos de Qdrant generados."""
+
+    def test_payload_has_entity_metadata(self):
+        """Verifica los campos entity_type/entity_id/chunk_no del payload."""
+        points = build_chunk_points("meditation", 9, ["a", "b"], [[0.1], [0.2]], {"source": "blog"})
+
+        assert [p.payload["chunk_no"] for p in points] == [0, 1]
+        assert all(p.payload["entity_type"] == "meditation" for p in points)
+        assert all(p.payload["entity_id"] == 9 for p in points)
+        assert all(p.payload["chunk_count"] == 2 for p in points)
+
+    def test_replace_deletes_before_upsert(self):
+        """Verifica que el reemplazo borra todos los fragmentos antes de insertar."""
+        points = build_chunk_points("article", 1, ["a"], [[0.1]])
+        operations = replace_operations("article", 1, points)
+
+        assert [type(op).__name__ for op in operations] == ["DeleteOperation", "UpsertOperation"]
+
+    def test_dashboard_content_also_clears_ingest_chunks(self):
+        """Verifica que un artículo editado borra también los fragmentos indexados como 'content'."""
+        assert indexed_entity_types("article") == ["article", "content"]
+        assert indexed_entity_types("massage") == ["massage"]
+
+    def test_reindex_removes_every_previous_chunk(self):
+        """Verifica que la reindexación borra los fragmentos antiguos de todos los tipos antes de insertar."""
+        points = build_chunk_points("article", 3, ["a", "b"], [[0.1], [0.2]])
+        operations = reindex_operations("article", 3, points)
+
+        filters = [
+            {c.key: c.match.value for c in op.delete.filter.must}
+            for op in operations if type(op).__name__ == "DeleteOperation" and hasattr(op.delete, "filter")
+        ]
+        assert {"entity_type": "article", "entity_id": 3} in filters
+        assert {"entity_type": "content", "entity_id": 3} in filters
+        assert type(operations[-1]).__name__ == "UpsertOperation"
+        assert len(operations[-1].upsert.points) == 2
@@ -0,0 +1,78 @@
+"""
+Tests unitarios para app.services.embeddings
+"""
+import pytest
+from app.services import embeddings
+from app.services.embeddings import (
+    EmbeddingCache,
+    normalize_query,
+    pack_vector,
+    unpack_vector,
+)
+
+
+class TestQueryNormalization:
+    """Tests para la normalización de consultas."""
+
+    def test_normalize_query_ignores_case_spaces_and_punctuation(self):
+        """Verifica que variantes de la misma pregunta producen la misma clave."""
+        assert normalize_query("¿Horarios de  Yoga?") == "horarios de yoga"
+        assert normalize_query("  horarios de yoga ") == "horarios de yoga"
+
+    def test_normalize_query_keeps_inner_punctuation(self):
+        """Verifica que solo se eliminan los signos de los extremos."""
+        assert normalize_query("precio masaje, 60 min?") == "precio masaje, 60 min"
+
+
+class TestVectorPacking:
+    """Tests para el formato binario float32."""
+
+    def test_pack_unpack_roundtrip(self):
+        """Verifica que un vector sobrevive al empaquetado."""
+        vector = [0.5, -0.25, 1.0, 0.0]
+        packed = pack_vector(vector)
+
+        assert isinstance(packed, bytes)
+        assert len(packed) == 4 * len(vector)
+        assert unpack_vector(packed) == vector
+
+
+class TestEmbeddingCache:
+    """Tests para la caché LRU de embeddings (sin Redis)."""
+
+    @pytest.fixture
+    def fake_provider(self, monkeypatch):
+        """Proveedor falso que cuenta las llamadas a la API."""
+        class FakeProvider:
+            calls = 0
+
+            async def embed(self, texts, model=None):
+                FakeProvider.calls += 1
+                return [[0.5, 0.25] for _ in texts]
+
+        provider = FakeProvider()
+        monkeypatch.setattr(embeddings.llm_providers, "get", lambda name: provider)
+        return provider
+
+    async def test_repeated_query_hits_local_cache(self, fake_provider):
+        """Verifica que la segunda consulta equivalente no llama a la API."""
+        cache = EmbeddingCache(max_entries=4)
+
+        first = await cache.get_embedding("Precio masaje")
+        second = await cache.get_embedding("precio masaje?")
+
+        assert first == second
+        assert fake_provider.calls == 1
+        assert cache.stats()["hits_local"] == 1
+        assert cache.stats()["misses"] == 1
+
+    async def test_lru_evicts_oldest_entry(self, fake_provider):
+        """Verifica que la LRU respeta su tamaño máximo."""
+        cache = EmbeddingCache(max_entries=1)
+
+        await cache.get_embedding("uno")
+        await cache.get_embedding("dos")
+        await cache.get_embedding("uno")
+
+        assert fake_provider.calls == 3
+        assert cache.stats()["local_entries"] == 1
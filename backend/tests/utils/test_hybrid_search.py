@@ -0,0 +1,101 @@
+"""
+Tests unitarios para app.services.hybrid_search
+"""
+from pathlib import Path
+from types import SimpleNamespace
+
+from app.services.hybrid_search import (
+    SEARCH_TABLES,
+    TEXT_SEARCH_CONFIGS,
+    build_search_sql,
+    document_expression,
+    query_terms,
+    rrf_fuse,
+    search_language,
+)
+
+MIGRATION = Path(__file__).resolve().parents[2] / "migrations" / "002_add_fulltext_search_indexes.sql"
+
+
+def hit(entity_type, entity_id, score, source="qdrant", chunk_no=0):
+    return SimpleNamespace(
+        id=f"{entity_type}-{entity_id}-{chunk_no}",
+        score=score,
+        payload={"type": entity_type, "entity_id": entity_id, "title": f"{entity_type} {entity_id}",
+                 "content": "texto", "source": source, "chunk_no": chunk_no},
+    )
+
+
+class TestRRFFusion:
+    """Tests para la fusión por rango recíproco."""
+
+    def test_entities_in_both_lists_rank_first(self):
+        """Verifica que una entidad encontrada por ambas búsquedas sube al primer puesto."""
+        vector = [hit("content", 1, 0.8), hit("therapy", 2, 0.7)]
+        lexical = [hit("therapy", 2, 0.1, source="fulltext"), hit("yoga_class", 3, 0.05, source="fulltext")]
+
+        fused = rrf_fuse(vector, lexical)
+
+        assert [p.payload["entity_id"] for p in fused] == [2, 1, 3]
+        assert fused[0].payload["source"] == "qdrant"  # keeps the vector chunk payload
+
+    def test_chunks_of_one_entity_count_once(self):
+        """Verifica que varios fragmentos de la misma entidad no ocupan varios rangos."""
+        vector = [hit("content", 1, 0.9), hit("content", 1, 0.85, chunk_no=1), hit("content", 4, 0.8)]
+
+        fused = rrf_fuse(vector, [], k=60)
+
+        assert [p.payload["entity_id"] for p in fused] == [1, 4]
+        assert fused[1].score == 1 / 62
+
+    def test_low_vector_scores_are_dropped(self):
+        """Verifica que los resultados vectoriales por debajo del umbral no se fusionan."""
+        fused = rrf_fuse([hit("content", 1, 0.05)], [hit("yoga_class", 3, 0.01, source="fulltext")], min_score=0.2)
+
+        assert [p.payload["entity_id"] for p in fused] == [3]
+
+    def test_article_hits_from_both_searches_fuse(self):
+        """Verifica que un artículo de Qdrant y la misma fila de `contents` se fusionan en una entrada."""
+        vector = [hit("article", 7, 0.8), hit("massage", 2, 0.7)]
+        lexical = [hit("article", 7, 0.3, source="fulltext")]
+
+        fused = rrf_fuse(vector, lexical)
+
+        assert [(p.payload["type"], p.payload["entity_id"]) for p in fused] == [("article", 7), ("massage", 2)]
+
+
+class TestLexicalQuery:
+    """Tests para la construcción de la consulta de texto completo."""
+
+    def test_query_terms_are_or_joined_and_sanitized(self):
+        """Verifica que la consulta solo contiene palabras unidas con OR."""
+        assert query_terms("¿Hatha o Kundalini? 'x' & !") == "hatha | kundalini"
+
+    def test_contents_rows_keep_their_own_type(self):
+        """Verifica que las filas de `contents` devuelven su columna type (article, meditation...)."""
+        sql = build_search_sql("es")
+
+        assert "SELECT contents.type AS type, id" in sql
+        assert "SELECT 'massage' AS type, id" in sql
+
+    def test_unknown_language_falls_back_to_spanish(self):
+        """Verifica que un idioma no indexado (o malicioso) nunca llega al texto SQL."""
+        assert search_language("x'") == "es"
+        assert search_language(None) == "es"
+        assert build_search_sql("x'") == build_search_sql("es")
+        assert build_search_sql("fr") == build_search_sql("es")
+
+    def test_sql_uses_indexed_expressions(self):
+        """Verifica que la SQL usa exactamente las expresiones indexadas."""
+        for lang in TEXT_SEARCH_CONFIGS:
+            sql = build_search_sql(lang)
+            for _, _, fields, _ in SEARCH_TABLES.values():
+                assert f"{document_expression(fields, lang)} @@ q" in sql
+
+    def test_migration_indexes_every_expression(self):
+        """Verifica que la migración crea un índice GIN por tabla e idioma."""
+        migration = MIGRATION.read_text(encoding="utf-8")
+
+        for table, _, fields, _ in SEARCH_TABLES.values():
+            for lang in TEXT_SEARCH_CONFIGS:
+                assert f"USING GIN ({document_expression(fields, lang)});" in migration
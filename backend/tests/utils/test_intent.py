@@ -0,0 +1,56 @@
+"""
+Tests unitarios para app.services.intent y los filtros de payload de app.core.vector_store
+"""
+from qdrant_client.http import models
+
+from app.core.vector_store import payload_filter, payload_matches
+from app.services.intent import classify_intent, detect_intents
+
+
+class TestIntentClassifier:
+    """Tests para la clasificación de intención por reglas."""
+
+    def test_single_intent(self):
+        """Verifica que una pregunta sobre masajes solo busca masajes."""
+        assert classify_intent("¿Qué masajes tenéis?") == {"type": ["massage"]}
+
+    def test_accents_and_languages(self):
+        """Verifica que las palabras clave se reconocen sin acentos y en catalán/inglés."""
+        assert detect_intents("Voldria fer una teràpia") == ["therapy"]
+        assert detect_intents("MEDITACIÓN guiada") == ["meditation"]
+        assert detect_intents("yoga schedule") == ["yoga"]
+
+    def test_multiple_intents_union_types(self):
+        """Verifica que varias intenciones combinan sus tipos sin duplicados."""
+        filters = classify_intent("Artículos sobre meditación y reiki")
+
+        assert filters == {"type": ["therapy", "content", "meditation", "article"]}
+
+    def test_no_intent_means_no_filter(self):
+        """Verifica que una pregunta genérica no filtra la búsqueda."""
+        assert classify_intent("¿Dónde estáis?") is None
+        assert classify_intent("") is None
+
+
+class TestPayloadFilters:
+    """Tests para la traducción de filtros a Qdrant y su evaluación local."""
+
+    def test_payload_filter_builds_qdrant_conditions(self):
+        """Verifica que las listas usan MatchAny y los escalares MatchValue."""
+        query_filter = payload_filter({"type": ["massage", "therapy"], "language": "es"})
+
+        assert isinstance(query_filter, models.Filter)
+        assert query_filter.must[0].match == models.MatchAny(any=["massage", "therapy"])
+        assert query_filter.must[1].match == models.MatchValue(value="es")
+        assert payload_filter(None) is None
+        assert payload_filter({}) is None
+
+    def test_payload_matches_same_rules(self):
+        """Verifica que la evaluación local aplica las mismas reglas que Qdrant."""
+        payload = {"type": "massage", "language": "es"}
+
+        assert payload_matches(payload, {"type": ["massage", "therapy"]})
+        assert payload_matches(payload, {"type": "massage", "language": "es"})
+        assert not payload_matches(payload, {"type": ["therapy"]})
+        assert not payload_matches({}, {"language": "es"})
+        assert payload_matches(payload, None)
@@ -0,0 +1,119 @@
+"""
+Tests unitarios para app.services.inventory
+"""
+from app.services import inventory as inventory_module
+from app.services.inventory import (
+    SECTION_ORDER,
+    _index_items,
+    _snapshot_signature,
+    render_inventory,
+    render_relevant_inventory,
+    render_section,
+    sections_for,
+)
+from app.services.inventory_index import InventoryIndex, keywords
+
+
+class TestSectionsFor:
+    """Tests para el mapeo tipo de contenido -> secciones afectadas."""
+
+    def test_known_type_maps_to_one_section(self):
+        """Verifica que un masaje solo reconstruye la sección de masajes."""
+        assert sections_for("massage") == ["massage"]
+
+    def test_unknown_type_rebuilds_everything(self):
+        """Verifica que un tipo desconocido reconstruye todas las secciones."""
+        assert sections_for("desconocido") == SECTION_ORDER
+
+
+class TestRenderInventory:
+    """Tests para el texto del inventario generado a partir del snapshot."""
+
+    def test_section_with_items(self):
+        """Verifica el formato de una sección con horario."""
+        data = {"count": 2, "items": [{"title": "Hatha", "url": "/clases-de-yoga", "schedule": "Lunes 10:00"}]}
+
+        assert render_section("yoga", data) == (
+            "YOGA: 2 clases (ITEMS DISPONIBLES: 'Hatha' (URL: /clases-de-yoga) [Horario: Lunes 10:00])"
+        )
+
+    def test_empty_sections_are_skipped(self):
+        """Verifica que las secciones vacías o ausentes no aparecen."""
+        snapshot = {
+            "massage": {"count": 1, "items": [{"title": "Shiatsu", "url": "/terapias/masajes?item=shiatsu"}]},
+            "yoga": {"count": 0, "items": []},
+        }
+
+        assert render_inventory(snapshot) == (
+            "INVENTARIO DETALLADO: MASAJES: 1 tipos (ITEMS DISPONIBLES: 'Shiatsu' (URL: /terapias/masajes?item=shiatsu))."
+        )
+
+
+class TestLocalizedInventory:
+    """Tests para el inventario en el idioma solicitado."""
+
+    SNAPSHOT = {
+        "promotions": {"count": 1, "items": [{
+            "title": "Verano", "url": "/", "detail": "Info: 10% dto",
+            "i18n": {"en": {"title": "Summer", "detail": "Info: 10% off"}},
+        }]},
+    }
+
+    def test_translated_title_and_detail(self):
+        """Verifica que se usan el título y el detalle traducidos."""
+        text = render_inventory(self.SNAPSHOT, "en")
+
+        assert "'Summer' (URL: /) [Info: 10% off]" in text
+
+    def test_missing_language_falls_back_to_spanish(self):
+        """Verifica que sin traducción se usa el texto en castellano."""
+        text = render_inventory(self.SNAPSHOT, "ca")
+
+        assert "'Verano' (URL: /) [Info: 10% dto]" in text
+
+
+class TestRelevantInventory:
+    """Tests para la selección de items relevantes para la pregunta."""
+
+    SNAPSHOT = {
+        "yoga": {"count": 4, "items": [{"title": "Hatha Yoga", "url": "/clases-de-yoga"}]},
+        "massage": {"count": 2, "items": [
+            {"title": "Masaje Tailandés", "url": "/terapias/masajes?item=tailandes"},
+            {"title": "Shiatsu", "url": "/terapias/masajes?item=shiatsu"},
+        ]},
+    }
+
+    def test_keyword_overlap_selects_items(self):
+        """Verifica que sin embeddings se eligen los items por palabras clave."""
+        index = InventoryIndex()
+        index.sync("v1", _index_items(self.SNAPSHOT))
+
+        assert index.select("¿Cuánto cuesta el masaje tailandes?")[0] == ("massage", 0)
+
+    def test_header_keeps_counts_and_only_selected_items(self):
+        """Verifica que la cabecera mantiene los totales y solo lista lo elegido."""
+        text = render_relevant_inventory(self.SNAPSHOT, [("massage", 1)])
+
+        assert text == (
+            "INVENTARIO (totales): YOGA: 4 clases; MASAJES: 2 tipos. "
+            "ITEMS RELEVANTES: MASAJES: 'Shiatsu' (URL: /terapias/masajes?item=shiatsu)."
+        )
+
+    def test_keywords_ignore_accents_and_plurals(self):
+        """Verifica la normalización de acentos y plurales."""
+        assert keywords("Masajes TAILANDÉS") == keywords("masaje tailandes")
+
+    def test_signature_follows_inventory_version(self, monkeypatch):
+        """Verifica que con Redis la firma del índice usa el contador de versión, sin serializar el snapshot."""
+        monkeypatch.setattr(inventory_module.cache, "_healthy", True)
+
+        assert _snapshot_signature(self.SNAPSHOT, 3) == "v3:massage,yoga"
+        assert _snapshot_signature(self.SNAPSHOT, 4) != _snapshot_signature(self.SNAPSHOT, 3)
+        assert _snapshot_signature({"yoga": self.SNAPSHOT["yoga"]}, 3) != _snapshot_signature(self.SNAPSHOT, 3)
+
+    def test_signature_hashes_content_without_redis(self, monkeypatch):
+        """Verifica que sin Redis (versiones por proceso) la firma depende del contenido."""
+        monkeypatch.setattr(inventory_module.cache, "_healthy", False)
+        changed = {**self.SNAPSHOT, "yoga": {"count": 5, "items": []}}
+
+        assert _snapshot_signature(self.SNAPSHOT, 0) != _snapshot_signature(changed, 0)
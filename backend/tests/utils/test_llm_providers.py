@@ -0,0 +1,100 @@
+"""
+Tests unitarios para app.services.llm_providers (registro y selección de proveedor)
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import llm_providers as llm_providers_module
+from app.services.llm_providers import ProviderRegistry, build_registry
+
+API_KEYS = {"openai": "OPENAI_API_KEY", "groq": "GROQ_API_KEY", "gemini": "GEMINI_API_KEY"}
+
+
+class FakeClient:
+    """Cliente SDK falso: guarda los argumentos, no abre conexiones."""
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+
+
+@pytest.fixture
+def sdks(monkeypatch):
+    """Sustituye los SDK por clientes falsos y limpia las claves de entorno."""
+    monkeypatch.setattr(llm_providers_module, "AsyncOpenAI", FakeClient)
+    monkeypatch.setattr(llm_providers_module, "AsyncGroq", FakeClient)
+    monkeypatch.setattr(
+        llm_providers_module, "genai",
+        SimpleNamespace(configure=lambda api_key: None, GenerativeModel=lambda model: SimpleNamespace(model=model)),
+    )
+    for env in API_KEYS.values():
+        monkeypatch.delenv(env, raising=False)
+    return monkeypatch
+
+
+def registry_with(sdks, *names):
+    for name in names:
+        sdks.setenv(API_KEYS[name], f"key-{name}")
+    return build_registry()
+
+
+class TestBuildRegistry:
+    """Tests para el registro de proveedores según las claves configuradas."""
+
+    def test_without_keys_has_no_provider(self, sdks):
+        """Verifica que sin claves no hay proveedores y has_any es False."""
+        registry = registry_with(sdks)
+
+        assert not registry.has_any
+        assert registry.first_available("groq") is None
+
+    @pytest.mark.parametrize("name", ["openai", "groq", "gemini"])
+    def test_each_key_registers_its_provider(self, sdks, name):
+        """Verifica que cada clave registra solo su proveedor."""
+        registry = registry_with(sdks, name)
+
+        assert registry.has_any
+        assert [p.name for p in registry.resolve_order()] == [name]
+
+    def test_missing_sdk_disables_provider(self, sdks):
+        """Verifica que sin el paquete del SDK el proveedor no se registra aunque haya clave."""
+        sdks.setattr(llm_providers_module, "AsyncGroq", None)
+
+        registry = registry_with(sdks, "groq")
+
+        assert not registry.has_any
+
+    def test_gemini_init_error_is_not_fatal(self, sdks):
+        """Verifica que un fallo al configurar Gemini solo desactiva ese proveedor."""
+        def broken(api_key):
+            raise RuntimeError("bad key")
+        sdks.setattr(llm_providers_module.genai, "configure", broken)
+
+        registry = registry_with(sdks, "openai", "gemini")
+
+        assert [p.name for p in registry.resolve_order()] == ["openai"]
+
+
+class TestProviderSelection:
+    """Tests para el orden preferido + fallbacks."""
+
+    def test_preferred_provider_goes_first(self, sdks):
+        """Verifica que el modelo elegido en AgentConfig va primero y luego el orden por defecto."""
+        registry = registry_with(sdks, "openai", "groq", "gemini")
+
+        assert [p.name for p in registry.resolve_order("gemini")] == ["gemini", "groq", "openai"]
+        assert registry.first_available(None).name == "groq"
+
+    def test_unconfigured_preference_falls_back(self, sdks):
+        """Verifica que si el preferido no tiene clave se usa el siguiente configurado."""
+        registry = registry_with(sdks, "openai")
+
+        assert registry.first_available("groq").name == "openai"
+        assert registry.first_available("desconocido").name == "openai"
+
+    def test_get_ignores_empty_names(self):
+        """Verifica que get() devuelve None para nombres vacíos o no registrados."""
+        registry = ProviderRegistry()
+
+        assert registry.get(None) is None
+        assert registry.get("openai") is None
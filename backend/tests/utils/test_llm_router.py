@@ -0,0 +1,181 @@
+"""
+Tests unitarios para app.services.llm_router
+"""
+import asyncio
+
+import pytest
+
+from app.services.llm_providers import LLMProvider, ProviderRegistry
+from app.services.llm_router import (
+    CLOSED, HALF_OPEN, OPEN, ROUTER_FAILURE_THRESHOLD, ROUTER_OPEN_SECONDS,
+    LLMRouter, NoHealthyProvider, ProviderHealth, _Attempt,
+)
+
+
+class FakeProvider(LLMProvider):
+    """Proveedor falso con respuesta, fallo o espera configurables."""
+
+    def __init__(self, name, text="hola", fail=False, delay=0.0):
+        self.name = name
+        self.text = text
+        self.fail = fail
+        self.delay = delay
+        self.calls = 0
+
+    async def complete(self, messages, temperature=0.7):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError(f"{self.name} caído")
+        return self.text
+
+    async def stream(self, messages, temperature=0.7):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError(f"{self.name} caído")
+        for piece in self.text.split():
+            yield piece
+
+
+def make_router(*providers):
+    registry = ProviderRegistry()
+    for provider in providers:
+        registry.register(provider)
+    return LLMRouter(registry)
+
+
+class TestProviderHealth:
+    """Tests para el circuit breaker de un proveedor."""
+
+    def test_opens_after_consecutive_failures(self):
+        """Verifica que el circuito se abre tras N fallos seguidos."""
+        health = ProviderHealth()
+        for _ in range(ROUTER_FAILURE_THRESHOLD):
+            health.record_failure(now=0.0)
+
+        assert health.state == OPEN
+        assert not health.allow_request(now=1.0)
+
+    def test_half_open_allows_one_probe(self):
+        """Verifica que tras el enfriamiento se permite una sola prueba."""
+        health = ProviderHealth()
+        for _ in range(ROUTER_FAILURE_THRESHOLD):
+            health.record_failure(now=0.0)
+
+        assert health.allow_request(now=ROUTER_OPEN_SECONDS)
+        assert health.state == HALF_OPEN
+        assert not health.allow_request(now=ROUTER_OPEN_SECONDS)
+
+        health.record_success(0.5)
+        assert health.state == CLOSED
+
+
+class TestLLMRouter:
+    """Tests para el enrutado con failover."""
+
+    async def test_complete_fails_over(self):
+        """Verifica que si el preferido falla se usa el siguiente."""
+        router = make_router(FakeProvider("groq", fail=True), FakeProvider("openai", text="ok"))
+
+        assert await router.complete([], preferred="groq") == "ok"
+        assert router.stats()["groq"]["error_rate"] == 1.0
+
+    async def test_open_circuit_is_skipped(self):
+        """Verifica que un proveedor con el circuito abierto no se llama."""
+        groq = FakeProvider("groq", fail=True)
+        router = make_router(groq, FakeProvider("openai"))
+        for _ in range(ROUTER_FAILURE_THRESHOLD):
+            await router.complete([], preferred="groq")
+        calls = groq.calls
+
+        await router.complete([], preferred="groq")
+
+        assert groq.calls == calls
+
+    async def test_stream_fails_over_when_first_token_is_late(self):
+        """Verifica el cambio de proveedor si el primer token no llega a tiempo."""
+        router = make_router(FakeProvider("groq", delay=1.0), FakeProvider("openai", text="hola mundo"))
+
+        pieces = [p async for p in router.stream([], preferred="groq", first_token_timeout=0.05)]
+
+        assert pieces == ["hola", "mundo"]
+        assert router.stats()["openai"]["ttft_p50"] is not None
+
+    async def test_no_provider_raises(self):
+        """Verifica el error cuando todos los proveedores fallan."""
+        router = make_router(FakeProvider("groq", fail=True))
+
+        with pytest.raises(NoHealthyProvider):
+            await router.complete([], preferred="groq")
+
+
+class TestHedgedStream:
+    """Tests para las peticiones cubiertas (hedging) en streaming."""
+
+    async def test_hedge_wins_when_primary_stalls(self):
+        """Verifica que el segundo proveedor gana si el primario se atasca."""
+        groq = FakeProvider("groq", text="lento", delay=1.0)
+        router = make_router(groq, FakeProvider("openai", text="rápido"))
+        router.hedge_delay = lambda name, timeout=None: 0.05
+
+        pieces = [p async for p in router.stream([], preferred="groq", hedge=True)]
+
+        assert pieces == ["rápido"]
+        stats = router.stats()
+        assert stats["groq"]["hedges_fired"] == 1
+        assert stats["openai"]["hedge_wins"] == 1
+        # The cancelled primary is not counted as a failure
+        assert stats["groq"]["error_rate"] == 0.0
+
+    async def test_fast_primary_is_not_hedged(self):
+        """Verifica que no se lanza la segunda petición si el primario responde a tiempo."""
+        openai = FakeProvider("openai")
+        router = make_router(FakeProvider("groq", text="hola"), openai)
+        router.hedge_delay = lambda name, timeout=None: 0.5
+
+        pieces = [p async for p in router.stream([], preferred="groq", hedge=True)]
+
+        assert pieces == ["hola"]
+        assert openai.calls == 0
+
+    def test_hedge_delay_uses_ttft_percentile(self):
+        """Verifica que el retraso sale del percentil de TTFT del proveedor."""
+        router = make_router(FakeProvider("groq"))
+        for ttft in [0.4] * 10 + [1.5] * 2:
+            router.health("groq").record_success(2.0, ttft=ttft)
+
+        assert router.hedge_delay("groq", first_token_timeout=8) == 1.5
+
+
+class TestAttemptCancel:
+    """Tests para la cancelación de un intento de stream."""
+
+    @staticmethod
+    async def slow_stream(cleanup=0.0):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            await asyncio.sleep(cleanup)
+            raise
+        yield "tarde"
+
+    async def test_cancel_drops_pending_first_token(self):
+        """Verifica que cancelar un intento pendiente no propaga su CancelledError."""
+        attempt = _Attempt(FakeProvider("a"), ProviderHealth(), self.slow_stream())
+        await asyncio.sleep(0)
+
+        await attempt.cancel()
+
+        assert attempt.task.cancelled()
+
+    async def test_caller_cancellation_is_not_swallowed(self):
+        """Verifica que si se cancela a quien espera el intento, la cancelación se propaga."""
+        attempt = _Attempt(FakeProvider("a"), ProviderHealth(), self.slow_stream(cleanup=0.05))
+        await asyncio.sleep(0)
+        caller = asyncio.create_task(attempt.cancel())
+        await asyncio.sleep(0.01)
+
+        caller.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await caller
@@ -0,0 +1,105 @@
+"""
+Tests unitarios para app.core.local_vector_index
+"""
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.core import local_vector_index as local_index_module
+from app.core.local_vector_index import LocalVectorIndex
+
+
+class FakeQdrant:
+    """Cliente mínimo que pagina los puntos como `scroll` de Qdrant."""
+
+    def __init__(self, points):
+        self.points = points
+
+    def scroll(self, collection_name, limit, offset=None, with_payload=True, with_vectors=True):
+        start = offset or 0
+        page = self.points[start:start + limit]
+        next_offset = start + limit if start + limit < len(self.points) else None
+        return page, next_offset
+
+
+def point(pid, vector, title, payload_type="blog"):
+    return SimpleNamespace(id=pid, vector=vector, payload={"title": title, "type": payload_type})
+
+
+@pytest.fixture
+def collection_exists(monkeypatch):
+    monkeypatch.setattr(local_index_module.collection_registry, "exists", lambda: True)
+    monkeypatch.setattr(local_index_module, "LOCAL_INDEX_SCROLL_BATCH", 2)
+
+
+class TestLocalVectorIndex:
+    """Tests para la réplica local del índice vectorial."""
+
+    async def test_sync_and_search(self, tmp_path, collection_exists):
+        """Verifica que la réplica copia los puntos y devuelve los más similares primero."""
+        client = FakeQdrant([
+            point(1, [1.0, 0.0, 0.0], "Yoga"),
+            point(2, [0.0, 1.0, 0.0], "Masaje"),
+            point(3, [0.7, 0.7, 0.0], "Yoga y masaje"),
+        ])
+        index = LocalVectorIndex("kb", str(tmp_path), client)
+
+        await index.sync()
+        hits = index.search([1.0, 0.1, 0.0], limit=2)
+
+        assert [hit.payload["title"] for hit in hits] == ["Yoga", "Yoga y masaje"]
+        assert hits[0].score == pytest.approx(1.0, abs=0.01)
+
+    async def test_persisted_replica_is_memory_mapped(self, tmp_path, collection_exists):
+        """Verifica que otro proceso puede cargar la réplica desde disco (mmap)."""
+        index = LocalVectorIndex("kb", str(tmp_path), FakeQdrant([point("a", [3.0, 4.0], "Meditación")]))
+        await index.sync()
+
+        reloaded = LocalVectorIndex("kb", str(tmp_path), None)
+
+        assert reloaded.load()
+        assert isinstance(reloaded._matrix, np.memmap)
+        assert reloaded.search([0.6, 0.8])[0].id == "a"
+
+    def test_not_ready_returns_empty(self, tmp_path):
+        """Verifica que sin réplica cargada la búsqueda devuelve una lista vacía."""
+        index = LocalVectorIndex("kb", str(tmp_path), None)
+
+        assert not index.load()
+        assert index.search([1.0, 0.0]) == []
+
+    async def test_dimension_mismatch_returns_empty(self, tmp_path, collection_exists):
+        """Verifica que un vector de otra dimensión no rompe la búsqueda."""
+        index = LocalVectorIndex("kb", str(tmp_path), FakeQdrant([point(1, [1.0, 0.0], "Yoga")]))
+        await index.sync()
+
+        assert index.search([1.0, 0.0, 0.0]) == []
+
+    async def test_filtered_search_skips_other_types(self, tmp_path, collection_exists):
+        """Verifica que el filtro de payload excluye los puntos de otros tipos."""
+        client = FakeQdrant([
+            point(1, [1.0, 0.0], "Yoga", "yoga_class"),
+            point(2, [0.6, 0.8], "Masaje", "massage"),
+            point(3, [0.0, 1.0], "Reiki", "therapy"),
+        ])
+        index = LocalVectorIndex("kb", str(tmp_path), client)
+        await index.sync()
+
+        hits = index.search([1.0, 0.0], limit=3, filters={"type": ["massage", "therapy"]})
+
+        assert [hit.id for hit in hits] == [2, 3]
+        assert index.search([1.0, 0.0], filters={"type": "activity"}) == []
+
+    async def test_request_sync_keeps_task_reference(self, tmp_path, collection_exists):
+        """Verifica que la sincronización bajo demanda guarda la tarea y no lanza duplicados."""
+        index = LocalVectorIndex("kb", str(tmp_path), FakeQdrant([point(1, [1.0, 0.0], "Yoga")]))
+
+        index.request_sync()
+        task = index._sync_task
+        index.request_sync()
+        await task
+
+        assert index._sync_task is task
+        assert index.ready
+        assert not index.prefer_local  # fallback-only by default
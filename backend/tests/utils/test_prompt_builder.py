@@ -0,0 +1,102 @@
+"""
+Tests unitarios para app.services.prompt_builder
+"""
+import pytest
+
+from app.services import prompt_builder as prompt_builder_module
+from app.services.prompt_builder import PromptBuilder, compile_prompt, focus_instruction
+
+CONFIG = {
+    "tone": "Maestro Zen",
+    "response_length": "concise",
+    "emoji_style": "none",
+    "focus_area": "info,booking",
+    "system_instructions": "Menciona la clase de prueba gratuita.",
+    "quiz_model": "groq",
+    "chatbot_model": "openai",
+}
+
+
+class TestCompilePrompt:
+    """Tests para la compilación del prompt de sistema."""
+
+    def test_prefix_contains_configuration(self):
+        """Verifica que el prefijo incluye tono, longitud, emojis e instrucciones extra."""
+        compiled = compile_prompt(CONFIG, "es", is_quiz=False)
+
+        assert "TONO: Maestro Zen / Tus respuestas deben ser breves" in compiled.prefix
+        assert "NO uses ningún emoji" in compiled.prefix
+        assert "Menciona la clase de prueba gratuita." in compiled.prefix
+        assert compiled.preferred_model == "openai"
+
+    def test_prefix_is_byte_stable_across_requests(self):
+        """Verifica que el contenido dinámico solo aparece después del prefijo estático."""
+        compiled = compile_prompt(CONFIG, "ca", is_quiz=False)
+
+        first = compiled.render("Yoga: 3 clases", "Horario: lunes")
+        second = compiled.render("Yoga: 4 clases", "Precio: 10€")
+
+        assert first.startswith(compiled.prefix) and second.startswith(compiled.prefix)
+        assert "Yoga: 3 clases" not in compiled.prefix
+        assert "Horario: lunes" in first and "Precio: 10€" in second
+
+    def test_quiz_prompt_uses_language_headers(self):
+        """Verifica que el prompt del cuestionario usa los títulos del idioma y el modelo del quiz."""
+        compiled = compile_prompt(CONFIG, "en", is_quiz=True)
+
+        assert "**About what you shared**" in compiled.prefix
+        assert compiled.preferred_model == "groq"
+        assert compiled.render("INVENTARIO X").endswith("INVENTARIO REAL:\nINVENTARIO X\n")
+
+    def test_focus_instruction_multi_select(self):
+        """Verifica los objetivos múltiples y los personalizados."""
+        text = focus_instruction("info, meditación")
+
+        assert text == "Tus objetivos son: INFORMAR y resolver dudas con precisión. Y TAMBIÉN Centrarse en: meditación."
+
+
+class TestPromptBuilder:
+    """Tests para la caché de prompts compilados por versión de configuración."""
+
+    @pytest.fixture
+    def loads(self, monkeypatch):
+        calls = []
+
+        async def fake_load(db):
+            calls.append(db)
+            return dict(CONFIG)
+
+        monkeypatch.setattr(prompt_builder_module, "load_agent_config", fake_load)
+        return calls
+
+    async def test_compiles_once_per_version_and_language(self, loads):
+        """Verifica que la configuración solo se carga en un fallo de caché."""
+        builder = PromptBuilder()
+
+        first = await builder.get(None, 1, "es", False)
+        second = await builder.get(None, 1, "es", False)
+        await builder.get(None, 1, "en", False)
+
+        assert first is second
+        assert len(loads) == 2
+
+    async def test_new_config_version_recompiles(self, loads):
+        """Verifica que un cambio de versión de AgentConfig recompila el prompt."""
+        builder = PromptBuilder()
+
+        first = await builder.get(None, 1, "es", False)
+        second = await builder.get(None, 2, "es", False)
+
+        assert first is not second
+        assert len(loads) == 2
+
+    async def test_lru_bound(self, loads):
+        """Verifica que la caché respeta el número máximo de entradas."""
+        builder = PromptBuilder(max_entries=2)
+
+        await builder.get(None, 1, "es", False)
+        await builder.get(None, 1, "en", False)
+        await builder.get(None, 1, "ca", False)
+        await builder.get(None, 1, "es", False)
+
+        assert len(loads) == 4
@@ -0,0 +1,82 @@
+"""
+Tests unitarios para app.services.quiz_cache
+"""
+import pytest
+
+from app.services import quiz_cache as quiz_cache_module
+from app.services.quiz_cache import QuizCache, answer_vector
+
+PROMPT = """
+Analiza mi camino de respuestas en el cuestionario "Un Momento para Escucharte":
+P: ¿Cómo te sientes hoy? R: Cansada
+P: ¿Dónde lo notas? R: En la espalda.
+Genera mi hoja de ruta de bienestar personalizada en exactamente 4 bloques.
+"""
+
+
+class TestAnswerVector:
+    """Tests para la canonicalización de las respuestas del cuestionario."""
+
+    def test_extracts_question_answer_pairs(self):
+        """Verifica que se extraen las parejas pregunta/respuesta normalizadas."""
+        assert answer_vector(PROMPT) == (
+            ("cómo te sientes hoy", "cansada"),
+            ("dónde lo notas", "en la espalda"),
+        )
+
+    def test_formatting_differences_do_not_matter(self):
+        """Verifica que mayúsculas y espacios no cambian el vector."""
+        other = PROMPT.replace("Cansada", "  cansada ").replace("En la espalda.", "en la ESPALDA")
+
+        assert answer_vector(other) == answer_vector(PROMPT)
+
+    def test_prompt_without_answers(self):
+        """Verifica que un texto sin respuestas no es cacheable."""
+        assert answer_vector("Hola, ¿qué tal?") is None
+
+
+class TestQuizCache:
+    """Tests para la caché de hojas de ruta (Redis simulado en memoria)."""
+
+    @pytest.fixture(autouse=True)
+    def memory_cache(self, monkeypatch):
+        """Sustituye Redis por un diccionario."""
+        store = {}
+
+        async def get(key):
+            return store.get(key)
+
+        async def set(key, value, ttl=300):
+            store[key] = value
+            return True
+
+        monkeypatch.setattr(quiz_cache_module.cache, "get", get)
+        monkeypatch.setattr(quiz_cache_module.cache, "set", set)
+        return store
+
+    async def test_repeat_profile_hits(self):
+        """Verifica que el mismo perfil se sirve desde la caché."""
+        cache = QuizCache(variants=1, enabled=True)
+
+        assert await cache.lookup(PROMPT, "es", 1, 1) is None
+        await cache.store(PROMPT, "es", 1, 1, "Hoja de ruta")
+
+        assert await cache.lookup(PROMPT, "es", 1, 1) == "Hoja de ruta"
+
+    async def test_inventory_version_isolates_entries(self):
+        """Verifica que un cambio de inventario invalida la hoja de ruta."""
+        cache = QuizCache(variants=1, enabled=True)
+        await cache.store(PROMPT, "es", 1, 1, "Hoja de ruta")
+
+        assert await cache.lookup(PROMPT, "es", 2, 1) is None
+        assert await cache.lookup(PROMPT, "en", 1, 1) is None
+
+    async def test_variants_are_collected_before_serving(self):
+        """Verifica que con N variantes se generan N antes de servir desde caché."""
+        cache = QuizCache(variants=2, enabled=True)
+        await cache.store(PROMPT, "es", 1, 1, "Variante A")
+
+        assert await cache.lookup(PROMPT, "es", 1, 1) is None
+
+        await cache.store(PROMPT, "es", 1, 1, "Variante B")
+        assert await cache.lookup(PROMPT, "es", 1, 1) in {"Variante A", "Variante B"}
@@ -0,0 +1,81 @@
+"""
+Tests unitarios para app.services.rag_context
+"""
+from types import SimpleNamespace
+from app.services.rag_context import (
+    build_context,
+    estimate_tokens,
+    select_documents,
+)
+
+
+def hit(score, content, type_="article", entity_id=1, title="Doc"):
+    """Crea un resultado de búsqueda similar a los de Qdrant."""
+    return SimpleNamespace(
+        score=score,
+        payload={"content": content, "type": type_, "id": entity_id, "title": title},
+    )
+
+
+class TestEstimateTokens:
+    """Tests para el estimador local de tokens."""
+
+    def test_empty_text_has_no_tokens(self):
+        """Verifica que un texto vacío cuenta 0 tokens."""
+        assert estimate_tokens("") == 0
+
+    def test_estimate_grows_with_length(self):
+        """Verifica que el estimador es monótono con la longitud."""
+        assert estimate_tokens("a" * 100) < estimate_tokens("a" * 1000)
+
+
+class TestSelectDocuments:
+    """Tests para la selección y deduplicación de documentos."""
+
+    def test_keeps_best_chunk_per_entity(self):
+        """Verifica que solo queda el mejor fragmento de cada entidad."""
+        docs = select_documents([
+            hit(0.80, "fragmento A", entity_id=7),
+            hit(0.90, "fragmento B", entity_id=7),
+            hit(0.85, "otra entidad", entity_id=8),
+        ])
+
+        assert [d.content for d in docs] == ["fragmento B", "otra entidad"]
+
+    def test_drops_low_scores(self):
+        """Verifica que se descartan candidatos muy por debajo del mejor."""
+        docs = select_documents([
+            hit(0.90, "relevante", entity_id=1),
+            hit(0.30, "irrelevante", entity_id=2),
+        ])
+
+        assert [d.content for d in docs] == ["relevante"]
+
+
+class TestBuildContext:
+    """Tests para el empaquetado con presupuesto de tokens."""
+
+    def test_packs_several_documents(self):
+        """Verifica que caben varios documentos si el presupuesto lo permite."""
+        context = build_context([
+            hit(0.90, "Hatha Yoga lunes 18:00", entity_id=1, title="Hatha"),
+            hit(0.88, "Masaje ayurvédico 60 min 50€", type_="massage", entity_id=2, title="Ayurvédico"),
+        ], token_budget=500)
+
+        assert "Hatha" in context
+        assert "Ayurvédico" in context
+
+    def test_respects_token_budget(self):
+        """Verifica que el contexto nunca supera el presupuesto de forma notable."""
+        long_text = "palabra " * 2000
+        context = build_context([
+            hit(0.90, long_text, entity_id=1),
+            hit(0.89, long_text, entity_id=2),
+        ], token_budget=300)
+
+        assert estimate_tokens(context) <= 310
+        assert "contenido truncado" in context
+
+    def test_empty_results(self):
+        """Verifica que sin resultados el contexto está vacío."""
+        assert build_context([]) == ""
@@ -0,0 +1,530 @@
+"""
+Tests unitarios para app.core.redis_cache
+"""
+import asyncio
+import fnmatch
+import json
+import time
+
+import pytest
+
+from app.core import redis_cache as redis_cache_module
+from app.core.redis_cache import (
+    LocalTier, RedisCache, key_lock, key_tag, should_refresh, _MISSING, _wrap,
+)
+
+
+class FakePipeline:
+    """Pipeline mínimo: encola llamadas y las ejecuta en orden."""
+
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        method = getattr(self.client, "_" + name)
+        return lambda *args, **kwargs: self.calls.append((method, args, kwargs))
+
+    async def execute(self):
+        self.client.round_trips += 1
+        return [method(*args, **kwargs) for method, args, kwargs in self.calls]
+
+
+class FakeRedis:
+    """Redis en memoria con lo que usa la invalidación (sin KEYS)."""
+
+    def __init__(self):
+        self.data = {}
+        self.sets = {}
+        self.ttls = {}
+        self.round_trips = 0
+        self.published = []
+
+    def pipeline(self, transaction=False):
+        return FakePipeline(self)
+
+    def keys(self, pattern):
+        raise AssertionError("KEYS must not be used")
+
+    def _setex(self, key, ttl, value):
+        self.data[key] = value
+        self.ttls[key] = ttl
+        return True
+
+    def _eval(self, script, numkeys, *args):
+        if script == redis_cache_module._RELEASE_LOCK_LUA:
+            key, token = args
+            return 1 if self.data.get(key) == token and self.data.pop(key) else 0
+        if script == redis_cache_module._SET_IF_OWNER_LUA:
+            lock, key, token, ttl, value = args
+            if self.data.get(lock) != token:
+                return 0
+            return self._setex(key, ttl, value) and 1
+        assert script == redis_cache_module._TAG_REGISTER_LUA
+        tag_keys, ttl, members = args[:numkeys], args[numkeys], args[numkeys + 1:]
+        for tag_key in tag_keys:
+            tagged = self.sets.setdefault(tag_key, set())
+            tagged.intersection_update(self.data)  # prune expired members
+            tagged.update(members)
+            self.ttls[tag_key] = max(self.ttls.get(tag_key, -1), ttl)
+        return len(tag_keys)
+
+    def _unlink(self, *keys):
+        return sum(1 for key in keys if self.data.pop(key, None) is not None)
+
+    def _srem(self, key, *members):
+        self.sets.get(key, set()).difference_update(members)
+        return len(members)
+
+    async def setex(self, key, ttl, value):
+        return self._setex(key, ttl, value)
+
+    async def set(self, key, value, nx=False, px=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def eval(self, script, numkeys, *args):
+        return self._eval(script, numkeys, *args)
+
+    async def get(self, key):
+        self.round_trips += 1
+        return self.data.get(key)
+
+    async def mget(self, keys):
+        self.round_trips += 1
+        return [self.data.get(key) for key in keys]
+
+    async def delete(self, key):
+        return self._unlink(key)
+
+    async def publish(self, channel, message):
+        self.published.append(json.loads(message))
+
+    async def sscan_iter(self, key, count=None):
+        for member in list(self.sets.get(key, ())):
+            yield member
+
+    async def scan_iter(self, match=None, count=None):
+        for key in list(self.data):
+            if fnmatch.fnmatchcase(key, match):
+                yield key
+
+
+def make_cache(l1_live=False):
+    cache = RedisCache()
+    cache._client = FakeRedis()
+    cache._healthy = True
+    cache._l1_live = l1_live
+    return cache
+
+
+class TestTagInvalidation:
+    """Tests para la invalidación por etiquetas."""
+
+    async def test_set_registers_tags_in_one_round_trip(self):
+        """Verifica que el valor y su registro en la etiqueta viajan en un solo pipeline."""
+        cache = make_cache()
+
+        await cache.set("agent:config", {"tone": "calma"}, ttl=120, tags=["config"])
+
+        assert cache._client.round_trips == 1
+        assert cache._client.sets[key_tag("config")] == {"agent:config"}
+        assert cache._client.ttls[key_tag("config")] == 120
+
+    async def test_register_prunes_expired_members(self):
+        """Verifica que registrar una clave elimina de la etiqueta las que ya caducaron."""
+        cache = make_cache()
+        await cache.set("viejo", 1, ttl=60, tags=["config"])
+        del cache._client.data["viejo"]  # expired in Redis
+
+        await cache.set("nuevo", 2, ttl=60, tags=["config"])
+
+        assert cache._client.sets[key_tag("config")] == {"nuevo"}
+
+    async def test_invalidate_tags_only_removes_tagged_keys(self):
+        """Verifica que solo se borran las claves registradas en la etiqueta."""
+        cache = make_cache()
+        await cache.set_many({"a": 1, "b": 2}, ttl=60, tags=["inventory"])
+        await cache.set("c", 3, ttl=60, tags=["config"])
+        await cache.set("d", 4, ttl=60)
+
+        deleted = await cache.invalidate_tags("inventory")
+
+        assert deleted == 2
+        assert set(cache._client.data) == {"c", "d"}
+        assert cache._client.sets[key_tag("inventory")] == set()
+
+    async def test_invalidate_tags_batches_unlink(self, monkeypatch):
+        """Verifica que los UNLINK se agrupan por lotes."""
+        monkeypatch.setattr(redis_cache_module, "CACHE_UNLINK_BATCH", 2)
+        cache = make_cache()
+        await cache.set_many({f"k{i}": i for i in range(5)}, ttl=60, tags=["schedules"])
+        before = cache._client.round_trips
+
+        assert await cache.invalidate_tags("schedules") == 5
+        assert cache._client.round_trips - before == 3
+
+    async def test_invalidate_pattern_uses_scan(self):
+        """Verifica que el borrado por patrón recorre el keyspace con SCAN (nunca KEYS)."""
+        cache = make_cache()
+        await cache.set_many({"inventory:section:yoga": 1, "inventory:section:massage": 2, "config:agent": 3})
+
+        assert await cache.invalidate_pattern("inventory:*") == 2
+        assert list(cache._client.data) == ["config:agent"]
+
+    async def test_unhealthy_cache_is_noop(self):
+        """Verifica que sin Redis la invalidación no falla."""
+        cache = RedisCache()
+
+        assert await cache.invalidate_tags("inventory") == 0
+        assert await cache.invalidate_pattern("*") == 0
+
+
+class TestLocalTier:
+    """Tests para el nivel L1 en memoria."""
+
+    def test_lru_eviction(self):
+        """Verifica que se expulsa la entrada menos usada recientemente."""
+        tier = LocalTier(max_items=2, ttl=60)
+        tier.put("a", 1, 60)
+        tier.put("b", 2, 60)
+        tier.get("a")
+        tier.put("c", 3, 60)
+
+        assert tier.get("b") is _MISSING
+        assert tier.get("a") == 1 and tier.get("c") == 3
+        assert tier.evictions == 1
+
+    def test_ttl_expiry(self, monkeypatch):
+        """Verifica que una entrada caducada ya no se sirve."""
+        now = [1000.0]
+        monkeypatch.setattr(redis_cache_module.time, "monotonic", lambda: now[0])
+        tier = LocalTier(max_items=10, ttl=30)
+        tier.put("a", 1, 300)  # capped at the tier TTL
+
+        now[0] += 31
+        assert tier.get("a") is _MISSING
+
+    def test_put_after_invalidation_is_ignored(self):
+        """Verifica que un valor leído antes de una invalidación no se guarda."""
+        tier = LocalTier()
+        generation = tier.generation
+        tier.discard(["config:agent"])
+        tier.put("config:agent", {"tone": "old"}, 60, generation)
+
+        assert tier.get("config:agent") is _MISSING
+
+
+class TestTwoTierCache:
+    """Tests para la caché de dos niveles y su coherencia entre workers."""
+
+    async def test_hot_keys_are_served_from_l1(self):
+        """Verifica que la segunda lectura de una clave caliente no va a Redis."""
+        cache = make_cache(l1_live=True)
+        cache._client.data["config:agent"] = json.dumps({"tone": "calm"})
+
+        first = await cache.get("config:agent")
+        trips = cache._client.round_trips
+        second = await cache.get("config:agent")
+
+        assert first == second == {"tone": "calm"}
+        assert cache._client.round_trips == trips
+
+    async def test_other_keys_skip_l1(self):
+        """Verifica que las claves fuera de CACHE_L1_PREFIXES siempre van a Redis."""
+        cache = make_cache(l1_live=True)
+        cache._client.data["chat:session:x"] = json.dumps({"turns": []})
+
+        await cache.get("chat:session:x")
+        await cache.get("chat:session:x")
+
+        assert cache._client.round_trips == 2
+
+    async def test_l1_unused_without_subscription(self):
+        """Verifica que sin suscripción activa no se confía en el L1."""
+        cache = make_cache(l1_live=False)
+        cache._client.data["config:agent"] = json.dumps({"tone": "calm"})
+
+        await cache.get("config:agent")
+        await cache.get("config:agent")
+
+        assert cache._client.round_trips == 2
+
+    async def test_get_many_mixes_l1_and_redis(self):
+        """Verifica que MGET solo pide las claves que no están en el L1."""
+        cache = make_cache(l1_live=True)
+        cache._client.data.update({"inventory:section:yoga": "1", "inventory:section:massage": "2"})
+        await cache.get("inventory:section:yoga")
+
+        values = await cache.get_many(["inventory:section:yoga", "inventory:section:massage", "inventory:section:x"])
+
+        assert values == [1, 2, None]
+        assert cache._l1.get("inventory:section:massage") == 2
+
+    async def test_writes_publish_invalidations(self):
+        """Verifica que una escritura invalida el L1 local y lo anuncia a los demás workers."""
+        cache = make_cache(l1_live=True)
+        cache._client.data["config:agent"] = json.dumps({"tone": "calm"})
+        await cache.get("config:agent")
+
+        await cache.set("config:agent", {"tone": "warm"}, ttl=60)
+
+        assert cache._client.published == [{"origin": cache._instance_id, "keys": ["config:agent"]}]
+        assert await cache.get("config:agent") == {"tone": "warm"}
+
+    async def test_values_are_stored_with_codec_header(self):
+        """Verifica que los valores se guardan con cabecera de codec y se leen igual."""
+        cache = make_cache()
+        await cache.set("config:agent", {"tone": "warm"}, ttl=60)
+
+        assert cache._client.data["config:agent"][0] & 0x80
+        assert await cache.get("config:agent") == {"tone": "warm"}
+
+    async def test_corrupt_value_is_a_miss_not_an_outage(self):
+        """Verifica que un valor ilegible cuenta como fallo de caché sin abrir el breaker."""
+        cache = make_cache()
+        cache._client.data["config:agent"] = bytes([0x80 | 7 << 3]) + b"??"
+
+        assert await cache.get("config:agent") is None
+        assert cache.is_healthy
+
+    async def test_remote_invalidation_drops_l1_entry(self):
+        """Verifica que un mensaje de otro worker borra la entrada local."""
+        cache = make_cache(l1_live=True)
+        cache._l1.put("config:agent", {"tone": "calm"}, 60)
+
+        cache._apply_invalidation(json.dumps({"origin": "other", "keys": ["config:agent"]}))
+        cache._l1.put("inventory:section:yoga", 1, 60)
+        cache._apply_invalidation(json.dumps({"origin": "other", "pattern": "inventory:*"}))
+
+        assert cache._l1.get("config:agent") is _MISSING
+        assert cache._l1.get("inventory:section:yoga") is _MISSING
+
+
+class Counter:
+    """compute() lento que cuenta sus ejecuciones."""
+
+    def __init__(self, value="nuevo", delay=0.05):
+        self.calls = 0
+        self.value = value
+        self.delay = delay
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return self.value
+
+
+def worker(shared):
+    """Otro worker (otra instancia de RedisCache) sobre el mismo Redis."""
+    cache = RedisCache()
+    cache._client = shared
+    cache._healthy = True
+    return cache
+
+
+class TestGetOrCompute:
+    """Tests para la protección contra estampidas y stale-while-revalidate."""
+
+    async def test_concurrent_misses_compute_once(self):
+        """Verifica que muchas peticiones simultáneas en un worker calculan una sola vez."""
+        cache = make_cache()
+        compute = Counter()
+
+        values = await asyncio.gather(*(cache.get_or_compute("inventory:section:yoga", compute, ttl=60) for _ in range(10)))
+
+        assert values == ["nuevo"] * 10
+        assert compute.calls == 1
+        assert key_lock("inventory:section:yoga") not in cache._client.data  # lease released
+
+    async def test_other_worker_waits_for_lock_holder(self, monkeypatch):
+        """Verifica que otro worker espera el resultado del que tiene el lock en vez de recalcular."""
+        monkeypatch.setattr(redis_cache_module, "CACHE_LOCK_POLL", 0.01)
+        first = make_cache()
+        second = worker(first._client)
+        compute_a, compute_b = Counter(delay=0.05), Counter(value="otro")
+
+        values = await asyncio.gather(
+            first.get_or_compute("inventory:section:yoga", compute_a, ttl=60),
+            second.get_or_compute("inventory:section:yoga", compute_b, ttl=60),
+        )
+
+        assert values == ["nuevo", "nuevo"]
+        assert (compute_a.calls, compute_b.calls) == (1, 0)
+
+    async def test_stale_value_served_while_refreshing(self):
+        """Verifica que un valor caducado se sirve al instante y se refresca en segundo plano una vez."""
+        cache = make_cache()
+        stale = _wrap("viejo", 60, 0.0)
+        stale["exp"] = time.time() - 1
+        cache._client.data["inventory:section:yoga"] = json.dumps(stale)
+        compute = Counter()
+
+        values = await asyncio.gather(*(cache.get_or_compute("inventory:section:yoga", compute, ttl=60) for _ in range(5)))
+        await asyncio.gather(*cache._refreshing.values())
+
+        assert values == ["viejo"] * 5
+        assert compute.calls == 1
+        assert await cache.get_or_compute("inventory:section:yoga", compute, ttl=60) == "nuevo"
+
+    async def test_refresh_skipped_when_another_worker_holds_lock(self):
+        """Verifica que no se refresca si otro worker ya tiene el lock."""
+        cache = make_cache()
+        stale = _wrap("viejo", 60, 0.0)
+        stale["exp"] = time.time() - 1
+        cache._client.data["inventory:section:yoga"] = json.dumps(stale)
+        cache._client.data[key_lock("inventory:section:yoga")] = "otro-worker"
+        compute = Counter()
+
+        assert await cache.get_or_compute("inventory:section:yoga", compute, ttl=60) == "viejo"
+        await asyncio.gather(*cache._refreshing.values())
+        assert compute.calls == 0
+
+    async def test_many_reads_every_envelope_in_one_round_trip(self):
+        """Verifica que get_or_compute_many lee todas las claves con un solo MGET y solo calcula las ausentes."""
+        cache = make_cache()
+        await cache.recompute(["a", "b"], Counter(value={"a": 1, "b": 2}), ttl=60)
+        cache._client.round_trips = 0
+        computes = {"a": Counter(), "b": Counter(), "c": Counter(value=3)}
+
+        values = await cache.get_or_compute_many(computes, ttl=60)
+
+        assert values == {"a": 1, "b": 2, "c": 3}
+        assert [computes[k].calls for k in "abc"] == [0, 0, 1]
+        assert cache._client.round_trips == 2  # MGET + the write of "c"
+
+    async def test_recompute_waits_for_refresh_in_flight(self, monkeypatch):
+        """Verifica que la reconstrucción espera el lease del refresco en curso antes de leer la BD."""
+        monkeypatch.setattr(redis_cache_module, "CACHE_LOCK_POLL", 0.01)
+        cache = make_cache()
+        lock = key_lock("inventory:section:yoga")
+        cache._client.data[lock] = "otro-worker"
+        seen_lock = []
+
+        async def rebuild():
+            seen_lock.append(cache._client.data.get(lock))
+            return {"inventory:section:yoga": "nuevo"}
+
+        async def finish_refresh():
+            await asyncio.sleep(0.03)
+            del cache._client.data[lock]
+
+        await asyncio.gather(cache.recompute(["inventory:section:yoga"], rebuild, ttl=60), finish_refresh())
+
+        assert seen_lock and seen_lock[0] not in (None, "otro-worker")  # rebuilt under its own lease
+        assert lock not in cache._client.data
+        assert (await cache.get("inventory:section:yoga"))["v"] == "nuevo"
+
+    async def test_stale_refresh_cannot_overwrite_recompute(self):
+        """Verifica que un refresco cuyo lease caducó no pisa la sección reconstruida después."""
+        first = make_cache()
+        second = worker(first._client)
+        key = "inventory:section:yoga"
+        slow = asyncio.create_task(first.get_or_compute(key, Counter(value="viejo", delay=0.05), ttl=60))
+        await asyncio.sleep(0.01)
+        del first._client.data[key_lock(key)]  # lease expired mid-build
+
+        await second.recompute([key], Counter(value={key: "nuevo"}, delay=0), ttl=60)
+        assert await slow == "viejo"
+
+        assert (await second.get(key))["v"] == "nuevo"
+
+    async def test_without_redis_still_computes(self):
+        """Verifica que sin Redis se calcula siempre (sin errores)."""
+        compute = Counter(delay=0)
+
+        assert await RedisCache().get_or_compute("k", compute, ttl=60) == "nuevo"
+
+    def test_early_expiration_probability(self, monkeypatch):
+        """Verifica que XFetch refresca antes de tiempo solo cerca de la caducidad."""
+        monkeypatch.setattr(redis_cache_module.random, "random", lambda: 0.01)  # -ln = 4.6
+        envelope = {"swr": 1, "v": 1, "exp": time.time() + 1.0, "delta": 0.5}
+
+        assert should_refresh(envelope)
+        envelope["exp"] = time.time() + 60
+        assert not should_refresh(envelope)
+        assert not should_refresh({"swr": 1, "v": 1, "exp": time.time() + 1.0, "delta": 0.0})
+
+
+class FlakyRedis(FakeRedis):
+    """Redis que falla los primeros `failures` PING y las operaciones mientras está caído."""
+
+    def __init__(self, failures):
+        super().__init__()
+        self.failures = failures
+        self.down = failures > 0
+
+    async def ping(self):
+        if self.failures > 0:
+            self.failures -= 1
+            raise ConnectionError("Connection refused")
+        self.down = False
+        return True
+
+    async def get(self, key):
+        if self.down:
+            raise ConnectionError("Connection reset by peer")
+        return await super().get(key)
+
+
+class TestSelfHealing:
+    """Tests para el circuit breaker y la reconexión automática."""
+
+    @pytest.fixture(autouse=True)
+    def fast_backoff(self, monkeypatch):
+        monkeypatch.setattr(redis_cache_module, "CACHE_RECONNECT_MIN", 0.01)
+        monkeypatch.setattr(redis_cache_module, "CACHE_RECONNECT_MAX", 0.04)
+        monkeypatch.setattr(redis_cache_module, "CACHE_L1_ENABLED", False)
+        monkeypatch.setattr(redis_cache_module, "REDIS_AVAILABLE", True)
+
+    async def wait_closed(self, cache, timeout=1.0):
+        deadline = time.monotonic() + timeout
+        while cache.stats()["breaker"] != "closed" and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+
+    async def test_startup_failure_recovers_with_backoff(self, monkeypatch):
+        """Verifica que si Redis no está al arrancar, la caché se conecta cuando vuelve."""
+        client = FlakyRedis(failures=3)
+        cache = RedisCache()
+        monkeypatch.setattr(cache, "_create_client", lambda: client)
+
+        await cache.connect()
+        assert not cache.is_healthy and cache.stats()["breaker"] == "open"
+
+        await self.wait_closed(cache)
+        await cache.disconnect()
+
+        assert cache.stats()["recoveries"] == 0  # never tripped while closed
+        assert cache.degraded_seconds > 0
+
+    async def test_transient_error_is_not_permanent(self, monkeypatch):
+        """Verifica que un error puntual abre el breaker y el monitor lo vuelve a cerrar."""
+        client = FlakyRedis(failures=0)
+        cache = RedisCache()
+        monkeypatch.setattr(cache, "_create_client", lambda: client)
+        await cache.connect()
+        client.data["config:agent"] = json.dumps({"tone": "calm"})
+
+        client.down, client.failures = True, 1
+        assert await cache.get("config:agent") is None
+        assert cache.stats()["breaker"] == "open" and cache.stats()["trips"] == 1
+
+        await self.wait_closed(cache)
+        assert await cache.get("config:agent") == {"tone": "calm"}
+        assert cache.stats()["recoveries"] == 1
+        assert cache.stats()["last_error"] == "Connection refused"  # the failed probe
+        await cache.disconnect()
+
+    async def test_backoff_grows_until_ceiling(self, monkeypatch):
+        """Verifica que el tiempo entre reintentos crece exponencialmente hasta el máximo."""
+        client = FlakyRedis(failures=100)
+        cache = RedisCache()
+        monkeypatch.setattr(cache, "_create_client", lambda: client)
+
+        await cache.connect()
+        await asyncio.sleep(0.2)
+        await cache.disconnect()
+
+        assert cache.stats()["retry_backoff"] == 0.04
@@ -0,0 +1,100 @@
+"""
+Tests unitarios para app.services.semantic_cache
+"""
+from app.services import semantic_cache as semantic_cache_module
+from app.services.semantic_cache import SemanticCache
+
+
+def make_cache(**kwargs):
+    options = {"max_distance": 0.08, "ttl": 3600, "max_entries": 10, "enabled": True}
+    options.update(kwargs)
+    return SemanticCache(**options)
+
+
+class TestLookupThreshold:
+    """Tests para el umbral de distancia coseno."""
+
+    def test_near_duplicate_question_hits(self):
+        """Verifica que una pregunta casi idéntica reutiliza la respuesta."""
+        cache = make_cache()
+        cache.store([1.0, 0.0, 0.0], "es", 1, 1, "Hatha los lunes")
+
+        assert cache.lookup([0.99, 0.05, 0.0], "es", 1, 1) == "Hatha los lunes"
+        assert cache.hits == 1
+
+    def test_distant_question_misses(self):
+        """Verifica que una pregunta por encima del umbral no se responde desde caché."""
+        cache = make_cache()
+        cache.store([1.0, 0.0, 0.0], "es", 1, 1, "Hatha los lunes")
+
+        assert cache.lookup([0.7, 0.7, 0.0], "es", 1, 1) is None  # distance ≈ 0.29
+        assert cache.misses == 1
+
+    def test_empty_answers_and_zero_vectors_are_not_stored(self):
+        """Verifica que no se guardan respuestas vacías ni vectores nulos."""
+        cache = make_cache()
+        cache.store([1.0, 0.0], "es", 1, 1, "")
+        cache.store([0.0, 0.0], "es", 1, 1, "respuesta")
+
+        assert cache.stats()["entries"] == 0
+
+
+class TestVersionKeys:
+    """Tests para los buckets por idioma y versiones."""
+
+    def test_other_language_or_version_misses(self):
+        """Verifica que el idioma y ambas versiones forman parte de la clave."""
+        cache = make_cache()
+        cache.store([1.0, 0.0], "es", 1, 1, "respuesta")
+
+        assert cache.lookup([1.0, 0.0], "ca", 1, 1) is None
+        assert cache.lookup([1.0, 0.0], "es", 2, 1) is None
+        assert cache.lookup([1.0, 0.0], "es", 1, 2) is None
+        assert cache.lookup([1.0, 0.0], "es", 1, 1) == "respuesta"
+
+    def test_new_version_drops_older_buckets_of_that_language(self):
+        """Verifica que guardar con una versión nueva libera los buckets antiguos del mismo idioma."""
+        cache = make_cache()
+        cache.store([1.0, 0.0], "es", 1, 1, "vieja")
+        cache.store([1.0, 0.0], "en", 1, 1, "old")
+
+        cache.store([1.0, 0.0], "es", 1, 2, "nueva")
+
+        assert set(cache._buckets) == {("es", 1, 2), ("en", 1, 1)}
+
+    def test_invalidate_clears_everything(self):
+        """Verifica que invalidate() vacía todos los buckets."""
+        cache = make_cache()
+        cache.store([1.0, 0.0], "es", 1, 1, "respuesta")
+
+        cache.invalidate()
+
+        assert cache.lookup([1.0, 0.0], "es", 1, 1) is None
+
+
+class TestEviction:
+    """Tests para la expiración y el LRU acotado."""
+
+    def test_lru_evicts_least_recently_used(self):
+        """Verifica que al superar el tamaño se expulsa la entrada menos usada."""
+        cache = make_cache(max_entries=2)
+        cache.store([1.0, 0.0, 0.0], "es", 1, 1, "a")
+        cache.store([0.0, 1.0, 0.0], "es", 1, 1, "b")
+        assert cache.lookup([1.0, 0.0, 0.0], "es", 1, 1) == "a"  # "a" becomes most recent
+
+        cache.store([0.0, 0.0, 1.0], "es", 1, 1, "c")
+
+        assert cache.lookup([0.0, 1.0, 0.0], "es", 1, 1) is None
+        assert cache.lookup([1.0, 0.0, 0.0], "es", 1, 1) == "a"
+        assert cache.lookup([0.0, 0.0, 1.0], "es", 1, 1) == "c"
+
+    def test_expired_entries_are_not_served(self, monkeypatch):
+        """Verifica que las respuestas más antiguas que el TTL se descartan."""
+        cache = make_cache(ttl=60)
+        monkeypatch.setattr(semantic_cache_module.time, "time", lambda: 1000.0)
+        cache.store([1.0, 0.0], "es", 1, 1, "respuesta")
+
+        monkeypatch.setattr(semantic_cache_module.time, "time", lambda: 1061.0)
+
+        assert cache.lookup([1.0, 0.0], "es", 1, 1) is None
+        assert cache.stats()["entries"] == 0
@@ -0,0 +1,78 @@
+"""
+Tests unitarios para app.services.single_flight
+"""
+import asyncio
+
+from app.services.single_flight import SingleFlight
+
+
+class TestSingleFlightStream:
+    """Tests para el reparto de un mismo stream entre varios clientes."""
+
+    async def test_concurrent_subscribers_share_one_generation(self):
+        """Verifica que dos peticiones iguales generan una sola vez."""
+        flights = SingleFlight()
+        started = []
+
+        async def produce():
+            started.append(1)
+            for chunk in ["a", "b", "c"]:
+                await asyncio.sleep(0.01)
+                yield chunk
+
+        async def consume():
+            return [c async for c in flights.stream("k", produce)]
+
+        first, second = await asyncio.gather(consume(), consume())
+
+        assert first == second == ["a", "b", "c"]
+        assert len(started) == 1
+        assert flights.stats()["followers"] == 1
+
+    async def test_late_joiner_gets_buffered_chunks(self):
+        """Verifica que quien llega tarde recibe también lo ya emitido."""
+        flights = SingleFlight()
+        gate = asyncio.Event()
+
+        async def produce():
+            yield "a"
+            await gate.wait()
+            yield "b"
+
+        leader = flights.stream("k", produce)
+        assert await leader.__anext__() == "a"
+        follower = flights.stream("k", produce)
+        gate.set()
+
+        assert [c async for c in follower] == ["a", "b"]
+        assert [c async for c in leader] == ["b"]
+
+    async def test_finished_flight_is_not_reused(self):
+        """Verifica que una petición posterior genera de nuevo."""
+        flights = SingleFlight()
+
+        async def produce():
+            yield "x"
+
+        assert [c async for c in flights.stream("k", produce)] == ["x"]
+        assert [c async for c in flights.stream("k", produce)] == ["x"]
+        assert flights.stats()["leaders"] == 2
+
+
+class TestSingleFlightRun:
+    """Tests para las respuestas no-streaming compartidas."""
+
+    async def test_concurrent_calls_share_result(self):
+        """Verifica que las llamadas concurrentes comparten el resultado."""
+        flights = SingleFlight()
+        calls = []
+
+        async def generate():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "respuesta"
+
+        results = await asyncio.gather(*(flights.run("k", generate) for _ in range(3)))
+
+        assert results == ["respuesta"] * 3
+        assert len(calls) == 1
@@ -0,0 +1,118 @@
+"""
+Tests unitarios para app.core.vector_store.CollectionRegistry
+"""
+from types import SimpleNamespace
+
+from app.core import vector_store as vector_store_module
+from app.core.vector_store import PAYLOAD_INDEXES, CollectionRegistry
+
+
+class FakeQdrant:
+    """Qdrant mínimo que cuenta las llamadas de metadatos."""
+
+    def __init__(self, exists=True, indexes=()):
+        self.collections = {"kb": set(indexes)} if exists else {}
+        self.calls = []
+
+    def collection_exists(self, name):
+        self.calls.append("collection_exists")
+        return name in self.collections
+
+    def get_collection(self, name):
+        self.calls.append("get_collection")
+        return SimpleNamespace(
+            config=SimpleNamespace(params=SimpleNamespace(vectors=SimpleNamespace(size=1536))),
+            payload_schema={field: "keyword" for field in self.collections[name]},
+        )
+
+    def create_collection(self, collection_name, vectors_config):
+        self.calls.append("create_collection")
+        self.collections[collection_name] = set()
+
+    def delete_collection(self, name):
+        self.calls.append("delete_collection")
+        self.collections.pop(name, None)
+
+    def create_payload_index(self, collection_name, field_name, field_schema):
+        self.calls.append("create_payload_index")
+        self.collections[collection_name].add(field_name)
+
+
+class TestExistenceCache:
+    """Tests para la caché de existencia de la colección."""
+
+    def test_positive_result_is_cached(self):
+        """Verifica que tras la primera comprobación no se vuelve a llamar a Qdrant."""
+        client = FakeQdrant()
+        registry = CollectionRegistry(client, "kb")
+
+        assert registry.exists() and registry.exists()
+        assert client.calls == ["collection_exists", "get_collection"]
+        assert registry.vector_size == 1536
+
+    def test_negative_result_is_rechecked_after_interval(self, monkeypatch):
+        """Verifica que una colección ausente se vuelve a comprobar pasado el intervalo."""
+        client = FakeQdrant(exists=False)
+        registry = CollectionRegistry(client, "kb")
+        assert not registry.exists()
+        client.collections["kb"] = set()  # created by n8n meanwhile
+
+        assert not registry.exists()  # still within the interval
+        monkeypatch.setattr(vector_store_module, "COLLECTION_RECHECK_SECONDS", -1)
+        assert registry.exists()
+
+    def test_refresh_does_not_create_indexes(self):
+        """Verifica que el refresco del hot path solo lee metadatos."""
+        client = FakeQdrant(indexes=())
+        registry = CollectionRegistry(client, "kb")
+
+        registry.exists()
+
+        assert "create_payload_index" not in client.calls
+
+    def test_invalidate_forces_refresh(self):
+        """Verifica que invalidate() hace que la siguiente consulta vuelva a Qdrant."""
+        client = FakeQdrant()
+        registry = CollectionRegistry(client, "kb")
+        registry.exists()
+
+        registry.invalidate()
+        registry.exists()
+
+        assert client.calls.count("collection_exists") == 2
+
+
+class TestEnsureAndRecreate:
+    """Tests para la creación de la colección y sus índices."""
+
+    def test_ensure_creates_collection_with_indexes(self):
+        """Verifica que ensure() crea la colección y todos los índices de payload."""
+        client = FakeQdrant(exists=False)
+        registry = CollectionRegistry(client, "kb")
+
+        registry.ensure()
+
+        assert client.collections["kb"] == set(PAYLOAD_INDEXES)
+        assert registry.exists()
+
+    def test_ensure_payload_indexes_only_adds_missing(self):
+        """Verifica que solo se crean los índices que faltan."""
+        client = FakeQdrant(indexes=[field for field in PAYLOAD_INDEXES if field != "category"])
+        registry = CollectionRegistry(client, "kb")
+
+        registry.ensure_payload_indexes()
+
+        assert client.calls.count("create_payload_index") == 1
+        assert "category" in registry.payload_indexes
+
+    def test_recreate_drops_and_creates(self):
+        """Verifica que recreate() borra la colección y la vuelve a crear con índices."""
+        client = FakeQdrant(indexes=PAYLOAD_INDEXES)
+        registry = CollectionRegistry(client, "kb")
+        registry.exists()
+
+        registry.recreate()
+
+        assert client.calls.index("delete_collection") < client.calls.index("create_collection")
+        assert client.collections["kb"] == set(PAYLOAD_INDEXES)
+        assert registry.exists()
@@ -56,6 +56,8 @@ const ChatBot: React.FC = () => {
     const [inputValue, setInputValue] = useState("");
     const [isTyping, setIsTyping] = useState(false);
     const messagesEndRef = useRef<HTMLDivElement>(null);
+    // Server-side conversation session: once known, only the new message is sent
+    const sessionIdRef = useRef<string | null>(null);
     const inputRef = useRef<HTMLInputElement>(null);
 
     const scrollToBottom = () => {
@@ -130,6 +132,8 @@ const ChatBot: React.FC = () => {
         setMessages(prev => [...prev, initialBotMsg]);
 
         try {
+            // Recent turns are always sent: the server ignores them while it still has
+            // the session, and falls back to them if the session was lost
             const apiMessages = messages.slice(-5).map(m => ({
                 role: m.role || (m.isUser ? 'user' : 'assistant'),
                 content: m.text
@@ -141,10 +145,12 @@ const ChatBot: React.FC = () => {
             const response = await fetch(`${API_BASE_URL}/api/chat`, {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
+                credentials: 'include',
                 body: JSON.stringify({
                     messages: apiMessages,
                     stream: true,
-                    language: i18n.language
+                    language: i18n.language,
+                    session_id: sessionIdRef.current
                 }),
             });
 
@@ -154,6 +160,7 @@ const ChatBot: React.FC = () => {
             const contentType = response.headers.get('content-type') || '';
             if (!contentType.includes('text/event-stream')) {
                 const data = await response.json();
+                if (data.session_id) sessionIdRef.current = data.session_id;
                 const text = data.response || data.detail || 'Lo siento, el servicio no está disponible en este momento. 🙏';
                 setMessages(prev => prev.map(m =>
                     m.id === botMsgId ? { ...m, text, isStreaming: false } : m
@@ -181,6 +188,13 @@ const ChatBot: React.FC = () => {
 
                         try {
                             const data = JSON.parse(jsonStr);
+                            if (data.session_id) sessionIdRef.current = data.session_id;
+                            if (data.queued && !accumulatedText) {
+                                const queuedText = t('chatbot.queued', 'Hay mucha demanda ahora mismo 🙏 Estás en la posición {{position}} de la cola...', { position: data.position });
+                                setMessages(prev => prev.map(m =>
+                                    m.id === botMsgId ? { ...m, text: queuedText } : m
+                                ));
+                            }
                             if (data.content) {
                                 accumulatedText += data.content;
                                 const contentToUpdate = accumulatedText;